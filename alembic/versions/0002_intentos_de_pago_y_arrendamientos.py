@@ -0,0 +1,60 @@
+"""Intentos de pago, version de pago y arrendamiento de worker ids
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-06-02 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('idworkerlease',
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('holder', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('worker_id')
+    )
+    op.create_table('paymentattempt',
+    sa.Column('payment_id', sa.Integer(), nullable=False),
+    sa.Column('reference', sa.String(), nullable=False),
+    sa.Column('bank', sa.String(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['payment_id'], ['payment.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reference', 'payment_id', name='uq_payment_attempt_reference')
+    )
+    op.create_index('idx_payment_attempt_payment', 'paymentattempt', ['payment_id'], unique=False)
+    # Los pagos iniciados antes de esta revisión quedan con su referencia vigente como intento
+    op.execute(
+        "INSERT INTO paymentattempt (payment_id, reference, bank, amount) "
+        "SELECT id, pse_transaction_id, bank, amount FROM payment "
+        "WHERE pse_transaction_id IS NOT NULL"
+    )
+    op.add_column('payment', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_index('idx_payment_vehicle_date', 'payment', ['vehicle_id', 'payment_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_payment_vehicle_date', table_name='payment')
+    op.drop_column('payment', 'version')
+    op.drop_index('idx_payment_attempt_payment', table_name='paymentattempt')
+    op.drop_table('paymentattempt')
+    op.drop_table('idworkerlease')
@@ -1,11 +1,14 @@
 # app/api/deps.py
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from functools import partial
+from typing import AsyncContextManager, AsyncGenerator, Callable, Generator
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.replicas import PRIMARY_PIN_COOKIE, PRIMARY_PIN_HEADER, async_read_session, is_pin_active, read_session
+from app.db.session import SessionLocal, AsyncSessionLocal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(
@@ -21,6 +24,44 @@ def get_db() -> Generator:
         yield db
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia para obtener sesión asíncrona de base de datos
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """El cliente escribió hace poco: la cookie del pin sigue vigente o reenvió el encabezado"""
+    return PRIMARY_PIN_COOKIE in request.cookies or is_pin_active(request.headers.get(PRIMARY_PIN_HEADER))
+
+
+def get_read_db(request: Request) -> Generator:
+    """
+    Dependencia de solo lectura: usa una réplica en round-robin, o el primario
+    si no hay réplicas disponibles o el cliente acaba de escribir
+    """
+    with read_session(use_primary=is_pinned_to_primary(request)) as db:
+        yield db
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Versión asíncrona de get_read_db
+    """
+    async with async_read_session(use_primary=is_pinned_to_primary(request)) as db:
+        yield db
+
+
+def get_async_read_session_factory(request: Request) -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """
+    Para endpoints que pueden responder sin base de datos (p. ej. desde cache): la conexión
+    de lectura se toma solo si el endpoint abre la sesión
+    """
+    return partial(async_read_session, use_primary=is_pinned_to_primary(request))
+
+
 def get_current_user(
         db: Session = Depends(get_db),
         token: str = Depends(oauth2_scheme)
@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.core.config import settings
@@ -17,14 +19,14 @@ router = APIRouter()
 
 @router.post("/login", response_model=dict)
 async def login(
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_async_db),
         form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     Iniciar sesión para obtener token de acceso
     """
     # Buscar usuario por email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = (await db.scalars(select(User).where(User.email == form_data.username).limit(1))).first()
 
     if not user:
         raise HTTPException(
@@ -33,8 +35,8 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Verificar contraseña
-    if not verify_password(form_data.password, user.hashed_password):
+    # Verificar contraseña (bcrypt es CPU intensivo: se ejecuta fuera del event loop)
+    if not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -58,7 +60,7 @@ async def login(
     # Actualizar último login
     user.last_login = datetime.utcnow()
     user.failed_login_attempts = 0
-    db.commit()
+    await db.commit()
 
     return {
         "access_token": access_token,
@@ -83,13 +85,15 @@ async def test_token(
 @router.post("/logout")
 async def logout(
         current_user: User = Depends(deps.get_current_user),
-        db: Session = Depends(deps.get_db)
+        db: AsyncSession = Depends(deps.get_async_db)
 ) -> dict:
     """
     Cerrar sesión (para fines de registro, ya que JWT no puede ser invalidado)
     """
     # Actualizar última actividad del usuario
-    current_user.last_login = datetime.utcnow()
-    db.commit()
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(last_login=datetime.utcnow())
+    )
+    await db.commit()
 
     return {"message": "Sesión cerrada exitosamente"}
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_active_superuser
+from app.db.pool_metrics import pool_status
+from app.db.replicas import read_router, async_read_router
+from app.db.session import engine, async_engine
+from app.models.user import User
+from app.services.consult_cache import consult_cache
+from app.services.payment_events import payment_events
+from app.services.payment_expiry_service import payment_expiry_sweeper
+from app.services.pdf_cache import pdf_cache
+from app.services.pdf_render_pool import pdf_render_pool
+from app.services.pse_client import pse_client
+from app.services.statement_batch_service import statement_export_pool
+from app.services.tax_period_cache import tax_period_cache
+
+router = APIRouter()
+
+
+@router.get("/cache", response_model=dict)
+def get_cache_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Métricas de los caches en proceso"""
+    return {
+        "tax_period": tax_period_cache.stats(),
+        "consult": consult_cache.stats(),
+        "pdf": pdf_cache.stats()
+    }
+
+
+@router.get("/db-pool", response_model=dict)
+def get_db_pool_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Estado de los pools de conexiones y tiempos de espera por conexión"""
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.pool),
+        "replicas": {
+            "sync": read_router.stats(),
+            "async": async_read_router.stats(),
+            "sync_pools": [pool_status(replica.pool) for replica in read_router.replicas],
+            "async_pools": [pool_status(replica.pool) for replica in async_read_router.replicas]
+        }
+    }
+
+
+@router.get("/payment-expiry", response_model=dict)
+def get_payment_expiry_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Pagos expirados por barrido y duración de cada ejecución"""
+    return payment_expiry_sweeper.stats()
+
+
+@router.get("/payment-events", response_model=dict)
+def get_payment_events_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Eventos de estado publicados, entregados y suscriptores en espera"""
+    return payment_events.stats()
+
+
+@router.get("/pse", response_model=dict)
+def get_pse_client_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Solicitudes, reintentos y fallos del cliente de la pasarela PSE"""
+    return pse_client.stats()
+
+
+@router.get("/pdf-render", response_model=dict)
+def get_pdf_render_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """PDFs generados, rechazados por cola llena y tiempos de generación"""
+    return pdf_render_pool.stats()
+
+
+@router.get("/statement-export", response_model=dict)
+def get_statement_export_metrics(
+        current_user: User = Depends(get_current_active_superuser)
+):
+    """Exportaciones de estados de cuenta realizadas, rechazadas por estar otra en curso y PDFs generados"""
+    return statement_export_pool.stats()
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from sqlalchemy.orm import Session
-from app.api.deps import get_db
+from app.api.deps import get_db, get_current_user
+from app.models.user import User
 from app.services.payment_service import PaymentService
+from app.services.reconciliation_service import ReconciliationService
 from app.services.vehicle_service import VehicleService
 from app.schemas.payment_schema import (
     PaymentResponse,
     PSEPaymentRequest,
     PSERedirectResponse,
+    ReconciliationReport,
 )
 
 router = APIRouter()
@@ -68,3 +74,23 @@ def pse_callback(
         return payment
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/reconciliation", response_model=ReconciliationReport)
+def reconcile_settlement_file(
+        file: UploadFile = File(..., description="CSV de liquidación PSE"),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Concilia un archivo de liquidación PSE y completa los pagos aprobados"""
+    if not current_user.is_superadmin:
+        raise HTTPException(status_code=403, detail="Acceso no autorizado")
+
+    # El archivo se lee en streaming desde el temporal del upload
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return ReconciliationService.reconcile_file(db, text)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Archivo de conciliación inválido: {e}")
+    finally:
+        text.detach()
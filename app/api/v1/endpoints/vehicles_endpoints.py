@@ -1,22 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date, timedelta, datetime
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Iterator, List, Optional
+import asyncio
+import csv
+import io
+import json
 import re
-from app.api.deps import get_db, get_current_user
-from app.models import Payment, TaxRate, TaxPeriod
+from app.api.deps import get_db, get_read_db, get_async_read_db, get_async_read_session_factory, get_current_user
+from app.core.config import settings
+from app.core.pagination import decode_cursor
 from app.models.user import User
+from app.db.session import AsyncSessionLocal
+from app.models.payment import PaymentProcessStatus, PaymentStatus
 from app.models.vehicle import Vehicle, VehicleType, TaxStatus
 from app.schemas.vehicle_schema import VehicleCreate, VehicleResponse, VehicleTaxResponse, ProcessDetailResponse, \
-    EmailRequestSchema, AccountStatementResponse
+    EmailRequestSchema, AccountStatementResponse, VehicleTaxDashboardResponse, VehicleBulkConsultRequest, \
+    OwnerPortfolioResponse
+from app.services.payment_cart_service import PaymentCartService
 from app.services.payment_service import PaymentService
-from app.services.pdf_service import PDFService
+from app.services.consult_cache import consult_cache
+from app.services.payment_events import payment_events
+from app.services.pdf_cache import pdf_cache
+from app.services.pdf_render_pool import PDFRenderBusy, pdf_render_pool
+from app.services.pse_client import PSEGatewayError, pse_client
+from app.services.statement_batch_service import StatementBatchService, StatementExportBusy, statement_export_pool
+from app.services.tax_period_cache import tax_period_cache
 from app.services.vehicle_service import VehicleService
 from app.schemas.vehicle_schema import VehicleConsultResponse
 from app.schemas.payment_schema import (
     PSEPaymentRequest,
     PSERedirectResponse,
+    PSECartPaymentRequest,
+    PSECartRedirectResponse,
     PSEBankResponse,
     PaymentCompletionResponse, PaymentStatusResponse, VehiclePaymentHistoryResponse
 )
@@ -25,21 +46,87 @@ router = APIRouter()
 
 
 @router.get("/consult", response_model=VehicleConsultResponse)
-def consult_vehicle_tax(
+async def consult_vehicle_tax(
         plate: str = Query(..., min_length=6, max_length=6, regex="^[A-Z0-9]{6}$"),
         document_type: str = Query(...),
         document_number: str = Query(...),
-        db: Session = Depends(get_db)
+        read_session=Depends(get_async_read_session_factory)
 ):
-    """Consulta los detalles de impuesto de un vehículo"""
-    details, error = VehicleService.get_vehicle_tax_details(
-        db, plate, document_type, document_number
-    )
+    """Consulta los detalles de impuesto de un vehículo; si está en cache no toma conexión de lectura"""
+    cache_key = consult_cache.make_key(plate, document_type, document_number, tax_period_cache.version)
+    cached = consult_cache.get(cache_key)
+    if cached is not None:
+        details, error = cached
+    else:
+        generation = consult_cache.generation
+        async with read_session() as db:
+            details, error = await VehicleService.get_vehicle_tax_details_async(
+                db, plate, document_type, document_number
+            )
+        consult_cache.set(
+            cache_key,
+            (details, error),
+            vehicle_id=details["vehicle_details"]["id"] if details else None,
+            generation=generation
+        )
     if error:
         raise HTTPException(status_code=404, detail=error)
     return details
 
 
+def _bulk_consult_lines(plates: list[str], details: dict[str, dict]) -> Iterator[str]:
+    """Serializa la consulta masiva como NDJSON, una línea por placa en el orden solicitado"""
+    for plate in dict.fromkeys(plate.upper() for plate in plates):
+        if plate in details:
+            item = {"plate": plate, **details[plate]}
+        else:
+            item = {"plate": plate, "error": "No se encontró el vehículo con los datos proporcionados"}
+        yield json.dumps(item, default=str) + "\n"
+
+
+@router.post("/consult/bulk")
+async def consult_vehicles_tax_bulk(
+        request: VehicleBulkConsultRequest,
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Consulta los detalles de impuesto de varias placas de un mismo propietario (NDJSON en streaming)"""
+    if not request.plates:
+        raise HTTPException(status_code=400, detail="Debe indicar al menos una placa")
+    if len(request.plates) > settings.CONSULT_BULK_MAX_PLATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se permiten máximo {settings.CONSULT_BULK_MAX_PLATES} placas por consulta"
+        )
+
+    details, error = await VehicleService.get_vehicles_tax_details_async(
+        db, request.plates, request.document_type, request.document_number
+    )
+    if error:
+        raise HTTPException(status_code=404, detail=error)
+
+    return StreamingResponse(
+        _bulk_consult_lines(request.plates, details),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/owner-portfolio", response_model=OwnerPortfolioResponse)
+async def get_owner_portfolio(
+        document_type: str = Query(...),
+        document_number: str = Query(...),
+        after_id: Optional[int] = Query(None, description="Id del último vehículo de la página anterior"),
+        limit: int = Query(100, ge=1, le=1000),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Vehículos, impuesto y pagos pendientes de un propietario, con totales de toda su flota"""
+    portfolio, error = await VehicleService.get_owner_portfolio_async(
+        db, document_type, document_number, after_id=after_id, limit=limit
+    )
+    if error:
+        raise HTTPException(status_code=404, detail=error)
+    return portfolio
+
+
 @router.post("/", response_model=VehicleResponse)
 def create_vehicle(
         vehicle: VehicleCreate,
@@ -118,6 +205,8 @@ def create_vehicle(
         db.add(db_vehicle)
         db.commit()
         db.refresh(db_vehicle)
+        # Una consulta previa pudo dejar cacheado "vehículo no encontrado" para esta placa
+        consult_cache.invalidate_vehicle(plate=db_vehicle.plate)
         return db_vehicle
     except SQLAlchemyError as e:
         db.rollback()
@@ -130,19 +219,17 @@ def create_vehicle(
 @router.get("/tax-calculation/{plate}", response_model=VehicleTaxResponse)
 def calculate_vehicle_tax(
         plate: str,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Calcula el impuesto para un vehículo específico"""
     vehicle = db.query(Vehicle).filter(Vehicle.plate == plate).first()
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
 
-    tax_period = db.query(TaxPeriod).filter(TaxPeriod.is_active == True).first()
+    tax_period, tax_rates = tax_period_cache.get(db)
     if not tax_period:
         raise HTTPException(status_code=404, detail="No hay período fiscal activo")
 
-    tax_rates = db.query(TaxRate).filter(TaxRate.tax_period_id == tax_period.id).all()
-
     tax_calculation = VehicleService.calculate_total_tax_amount(vehicle, tax_period, tax_rates)
 
     # Obtener el owner
@@ -164,73 +251,138 @@ def calculate_vehicle_tax(
     return response
 
 
-@router.get("/admin/dashboard", response_model=List[VehicleTaxResponse])
+@router.get("/admin/dashboard", response_model=VehicleTaxDashboardResponse)
 def get_tax_dashboard(
-        db: Session = Depends(get_db),
+        vehicle_type: Optional[VehicleType] = Query(None),
+        city: Optional[str] = Query(None),
+        after_id: Optional[int] = Query(None, description="Id del último vehículo de la página anterior"),
+        limit: int = Query(100, ge=1, le=1000),
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user)
 ):
-    """Dashboard para administradores con información de impuestos"""
+    """Dashboard para administradores con información de impuestos, paginado por id de vehículo"""
     if not current_user.is_superadmin:
         raise HTTPException(status_code=403, detail="Acceso no autorizado")
 
-    # Obtener el período fiscal activo
-    active_tax_period = db.query(TaxPeriod).filter(TaxPeriod.is_active == True).first()
+    # Obtener el período fiscal activo y sus tasas compiladas
+    active_tax_period, tax_rates = tax_period_cache.get(db)
     if not active_tax_period:
         raise HTTPException(status_code=404, detail="No hay período fiscal activo")
 
-    # Obtener tasas de impuesto vigentes
-    tax_rates = db.query(TaxRate).filter(TaxRate.tax_period_id == active_tax_period.id).all()
+    return VehicleService.get_tax_dashboard(
+        db,
+        active_tax_period,
+        tax_rates,
+        vehicle_type=vehicle_type,
+        city=city,
+        after_id=after_id,
+        limit=limit
+    )
+
+
+DASHBOARD_EXPORT_FIELDS = [
+    "vehicle_id", "plate", "owner_name", "vehicle_type", "city", "base_tax",
+    "traffic_light_fee", "total_amount", "tax_status", "due_date", "last_payment_date"
+]
+
+
+def _dashboard_csv_lines(chunks: Iterator[list[dict]]) -> Iterator[str]:
+    """Serializa los bloques del tablero como CSV, un bloque a la vez"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=DASHBOARD_EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
 
-    # Obtener todos los vehículos con sus propietarios
-    vehicles = (
-        db.query(Vehicle, User)
-        .join(User, Vehicle.owner_id == User.id)
-        .all()
+
+def _dashboard_ndjson_lines(chunks: Iterator[list[dict]]) -> Iterator[str]:
+    """Serializa los bloques del tablero como NDJSON (un objeto JSON por línea)"""
+    for chunk in chunks:
+        yield "".join(json.dumps(item, default=str) + "\n" for item in chunk)
+
+
+@router.get("/admin/dashboard/export")
+def export_tax_dashboard(
+        export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+        vehicle_type: Optional[VehicleType] = Query(None),
+        city: Optional[str] = Query(None),
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Exporta el tablero de impuestos completo en streaming (CSV o NDJSON)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(status_code=403, detail="Acceso no autorizado")
+
+    active_tax_period, tax_rates = tax_period_cache.get(db)
+    if not active_tax_period:
+        raise HTTPException(status_code=404, detail="No hay período fiscal activo")
+
+    chunks = VehicleService.iter_tax_dashboard(
+        db, active_tax_period, tax_rates, vehicle_type=vehicle_type, city=city
     )
 
-    dashboard_data = []
-    for vehicle, owner in vehicles:
-        # Calcular impuestos para cada vehículo
-        tax_calculation = VehicleService.calculate_total_tax_amount(
-            vehicle, active_tax_period, tax_rates
+    if export_format == "ndjson":
+        return StreamingResponse(
+            _dashboard_ndjson_lines(chunks),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=dashboard_impuestos.ndjson"}
         )
 
-        # Obtener último pago
-        last_payment = (
-            db.query(Payment)
-            .filter(Payment.vehicle_id == vehicle.id)
-            .order_by(Payment.payment_date.desc())
-            .first()
-        )
+    return StreamingResponse(
+        _dashboard_csv_lines(chunks),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=dashboard_impuestos.csv"}
+    )
 
-        # Crear respuesta para el dashboard
-        dashboard_entry = VehicleTaxResponse(
-            vehicle_id=vehicle.id,
-            plate=vehicle.plate,
-            owner_name=owner.full_name,
-            base_tax=tax_calculation["base_tax"],
-            traffic_light_fee=tax_calculation["traffic_light_fee"],
-            total_amount=tax_calculation["total_amount"],
-            tax_status=vehicle.current_tax_status,
-            due_date=active_tax_period.due_date,
-            last_payment_date=last_payment.payment_date if last_payment else None
-        )
 
-        dashboard_data.append(dashboard_entry)
+@router.get("/admin/statements.zip")
+def export_account_statements(
+        vehicle_type: Optional[VehicleType] = Query(None),
+        city: Optional[str] = Query(None),
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Genera en streaming un ZIP con los estados de cuenta en PDF de los vehículos filtrados.
+    Usa el pool de exportación del proceso; si ya hay una exportación en curso responde 409.
+    """
+    if not current_user.is_superadmin:
+        raise HTTPException(status_code=403, detail="Acceso no autorizado")
+
+    active_tax_period, tax_rates = tax_period_cache.get(db)
+    if not active_tax_period:
+        raise HTTPException(status_code=404, detail="No hay período fiscal activo")
 
-    return dashboard_data
+    chunks = StatementBatchService.iter_statement_chunks(
+        db, active_tax_period, tax_rates, vehicle_type=vehicle_type, city=city,
+        chunk_size=settings.STATEMENT_BATCH_CHUNK_SIZE
+    )
+    try:
+        rendered_chunks = statement_export_pool.reserve(chunks)
+    except StatementExportBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return StreamingResponse(
+        StatementBatchService.stream_zip(rendered_chunks),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=estados_cuenta.zip"}
+    )
 
 
 @router.get("/account-statement-data/{plate}", response_model=AccountStatementResponse)
-def get_account_statement_data(
+async def get_account_statement_data(
         plate: str,
         document_type: str,
         document_number: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_read_db)
 ):
     """Obtiene los datos para el estado de cuenta"""
-    details, error = VehicleService.get_vehicle_tax_details(
-        db, plate, document_type, document_number
+    details, error = await VehicleService.get_vehicle_tax_details_async(
+        db, plate, document_type, document_number, include_payments=True
     )
     if error:
         raise HTTPException(status_code=404, detail=error)
@@ -243,8 +395,57 @@ def get_account_statement_data(
         },
         "vehicle_details": details["vehicle_details"],
         "tax_details": details["tax_details"],
-        "payment_history": VehicleService.get_payment_history(db, details["vehicle_details"]["id"])
+        "payment_history": details["payment_history"]
+    }
+
+
+@router.get("/account-statement/{plate}.pdf")
+async def download_account_statement(
+        plate: str,
+        document_type: str,
+        document_number: str,
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Envía el estado de cuenta en PDF. Se sirve desde el cache si los datos no cambiaron;
+    si no, se genera fuera del proceso de la API
+    """
+    details, error = await VehicleService.get_vehicle_tax_details_async(
+        db, plate, document_type, document_number
+    )
+    if error:
+        raise HTTPException(status_code=404, detail=error)
+
+    vehicle_info = details["vehicle_details"]
+    tax_info = {
+        "tax_year": details["tax_details"]["due_date"].year,
+        "total_amount": details["tax_details"]["total_amount"],
+        "tax_status": details["tax_details"]["tax_status"],
+        "due_date": details["tax_details"]["due_date"],
+        # Solo la fecha: forma parte de la llave del cache, así un PDF cacheado nunca muestra otro día
+        "statement_date": date.today()
     }
+    history_version = await PaymentService.get_history_version_async(db, vehicle_info["id"])
+    cache_key = pdf_cache.make_key(vehicle_info, tax_info, history_version)
+    content = await run_in_threadpool(pdf_cache.get, vehicle_info["id"], cache_key)
+    cache_status = "hit"
+    if content is None:
+        cache_status = "miss"
+        try:
+            content = await pdf_render_pool.render_account_statement(vehicle_info, tax_info)
+        except PDFRenderBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        await run_in_threadpool(pdf_cache.set, vehicle_info["id"], cache_key, content)
+
+    return StreamingResponse(
+        io.BytesIO(content),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename=estado_cuenta_{vehicle_info['plate']}.pdf",
+            "Content-Length": str(len(content)),
+            "X-PDF-Cache": cache_status
+        }
+    )
 
 
 @router.post("/send-statement", response_model=dict)
@@ -267,29 +468,35 @@ def send_account_statement(
 
 
 @router.get("/process-detail/{plate}", response_model=ProcessDetailResponse)
-def get_process_detail(
+async def get_process_detail(
         plate: str,
         document_type: str,
         document_number: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_read_db)
 ):
     """Obtiene el detalle del proceso fiscal"""
-    details, error = VehicleService.get_vehicle_tax_details(
-        db, plate, document_type, document_number
+    details, error = await VehicleService.get_vehicle_tax_details_async(
+        db, plate, document_type, document_number, include_payments=True
     )
     if error:
         raise HTTPException(status_code=404, detail=error)
 
     return {
         "vehicle_info": details["vehicle_details"],
-        "pending_payments": VehicleService.get_pending_payments(db, details["vehicle_details"]["id"]),
-        "payment_history": VehicleService.get_payment_history(db, details["vehicle_details"]["id"])
+        "pending_payments": details["pending_payments"],
+        "payment_history": details["payment_history"]
     }
 
 
 @router.get("/banks", response_model=List[PSEBankResponse])
-def get_bank_list():
+async def get_bank_list():
     """Obtiene lista de bancos disponibles para PSE"""
+    if pse_client.enabled:
+        try:
+            return await pse_client.get_banks()
+        except PSEGatewayError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
     # Simulación de lista de bancos
     return [
         {"bank_code": "1001", "bank_name": "Bancolombia", "status": "active"},
@@ -300,41 +507,95 @@ def get_bank_list():
 
 
 @router.post("/initiate-payment", response_model=PSERedirectResponse)
-def initiate_payment(
+async def initiate_payment(
         payment: PSEPaymentRequest,
         db: Session = Depends(get_db)
 ):
     """Inicia el proceso de pago PSE"""
     # Verificar vehículo y calcular monto
-    details, error = VehicleService.get_vehicle_tax_details(
+    details, error = await run_in_threadpool(
+        VehicleService.get_vehicle_tax_details,
         db, payment.plate, payment.document_type, payment.document_number
     )
     if error:
         raise HTTPException(status_code=404, detail=error)
 
     try:
-        pse_info = PaymentService.initiate_pse_payment(
+        pse_info = await run_in_threadpool(
+            PaymentService.initiate_pse_payment,
             db=db,
             vehicle_id=details["vehicle_details"]["id"],
             amount=details["tax_details"]["total_amount"],
             bank_code=payment.bank_code,
             email=payment.email
         )
-        return pse_info
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    # Registrar la transacción en la pasarela para obtener la URL del banco
+    if pse_client.enabled and pse_info["status"] == PaymentProcessStatus.PENDING_PSE.value:
+        try:
+            transaction = await pse_client.create_transaction(
+                reference=pse_info["reference_number"],
+                amount=pse_info["amount"],
+                bank_code=payment.bank_code,
+                email=payment.email,
+                callback_url=settings.PSE_CALLBACK_URL
+            )
+        except PSEGatewayError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        pse_info["bank_redirect_url"] = transaction.get("bank_redirect_url")
+
+    return pse_info
+
+
+@router.post("/initiate-cart-payment", response_model=PSECartRedirectResponse)
+async def initiate_cart_payment(
+        cart: PSECartPaymentRequest,
+        db: Session = Depends(get_db)
+):
+    """Inicia un único pago PSE por varias vigencias y vehículos del mismo propietario"""
+    try:
+        pse_info = await run_in_threadpool(
+            PaymentCartService.initiate_cart_payment,
+            db=db,
+            document_type=cart.document_type,
+            document_number=cart.document_number,
+            items=[(item.plate, item.tax_year) for item in cart.items],
+            bank_code=cart.bank_code,
+            email=cart.email
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if pse_client.enabled:
+        try:
+            transaction = await pse_client.create_transaction(
+                reference=pse_info["reference_number"],
+                amount=pse_info["amount"],
+                bank_code=cart.bank_code,
+                email=cart.email,
+                callback_url=settings.PSE_CALLBACK_URL
+            )
+        except PSEGatewayError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        pse_info["bank_redirect_url"] = transaction.get("bank_redirect_url")
+
+    return pse_info
+
 
 @router.post("/complete-payment/{transaction_id}", response_model=PaymentCompletionResponse)
 def complete_payment(
         transaction_id: str,
+        status: str = Query("SUCCESS", description="Resultado reportado por PSE"),
         db: Session = Depends(get_db)
 ):
     """Completa el proceso de pago PSE"""
     try:
         result = PaymentService.complete_pse_payment(
             db=db,
-            transaction_id=transaction_id
+            transaction_id=transaction_id,
+            status=status
         )
         return result
     except Exception as e:
@@ -342,26 +603,116 @@ def complete_payment(
 
 
 @router.get("/payment-status/{transaction_id}", response_model=PaymentStatusResponse)
-def check_payment_status(
+async def check_payment_status(
         transaction_id: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_read_db)
 ):
     """Verifica el estado de un pago"""
     try:
-        return PaymentService.get_payment_status(db, transaction_id)
+        return await PaymentService.get_payment_status_async(db, transaction_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+TERMINAL_PAYMENT_STATUSES = {PaymentStatus.COMPLETED.value, PaymentStatus.FAILED.value}
+
+
+async def _read_payment_status(transaction_id: str) -> dict:
+    """Lee el estado en una sesión corta contra el primario, sin retener la conexión durante la espera"""
+    async with AsyncSessionLocal() as db:
+        return await PaymentService.get_payment_status_async(db, transaction_id)
+
+
+def _sse_event(data: dict) -> str:
+    return f"event: status\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/payment-status/{transaction_id}/events")
+async def stream_payment_status(
+        transaction_id: str,
+        request: Request
+):
+    """
+    Envía el estado del pago como Server-Sent Events: el estado actual y luego cada cambio,
+    hasta que el pago termina. No consulta la base de datos mientras no haya cambios.
+    """
+    subscription = AsyncExitStack()
+    queue = await subscription.enter_async_context(payment_events.subscribe(transaction_id))
+    try:
+        status = await _read_payment_status(transaction_id)
+    except ValueError as e:
+        await subscription.aclose()
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def events() -> AsyncIterator[str]:
+        nonlocal status
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.PAYMENT_EVENTS_MAX_WAIT_SECONDS
+        try:
+            yield _sse_event(status)
+            while status["status"] not in TERMINAL_PAYMENT_STATUSES and loop.time() < deadline:
+                if await request.is_disconnected():
+                    break
+                event = await payment_events.next_event(queue, settings.PAYMENT_EVENTS_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                status = await _read_payment_status(transaction_id)
+                yield _sse_event(status)
+        finally:
+            await subscription.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/payment-status/{transaction_id}/wait", response_model=PaymentStatusResponse)
+async def wait_payment_status(
+        transaction_id: str,
+        known_status: Optional[str] = Query(None, description="Último estado conocido por el cliente"),
+        timeout: int = Query(25, ge=1, le=60, description="Segundos máximos de espera")
+):
+    """
+    Long-poll del estado del pago: responde de inmediato si el estado difiere de known_status
+    o el pago ya terminó; si no, espera hasta timeout segundos a que cambie.
+    """
+    async with payment_events.subscribe(transaction_id) as queue:
+        try:
+            status = await _read_payment_status(transaction_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        if status["status"] in TERMINAL_PAYMENT_STATUSES or \
+                (known_status is not None and status["status"] != known_status):
+            return status
+
+        if await payment_events.next_event(queue, timeout) is None:
+            return status
+        return await _read_payment_status(transaction_id)
+
+
 @router.get("/history/{plate}", response_model=VehiclePaymentHistoryResponse)
-def get_vehicle_history(
+async def get_vehicle_history(
         plate: str,
         document_type: str,
         document_number: str,
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+        limit: int = Query(50, ge=1, le=500),
+        db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Obtiene el historial completo de un vehículo y sus pagos"""
+    """Obtiene el historial de un vehículo y sus pagos, paginado por cursor"""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        return VehicleService.get_vehicle_payment_history(db, plate, document_type, document_number)
+        return await VehicleService.get_vehicle_payment_history_async(
+            db, plate, document_type, document_number, cursor=cursor, limit=limit
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
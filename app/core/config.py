@@ -3,7 +3,7 @@ from typing import List
 from pydantic.v1 import validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,25 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     DATABASE_URL: str
+    # Opcional: por defecto se deriva de DATABASE_URL (asyncpg / aiosqlite)
+    ASYNC_DATABASE_URL: str | None = None
+
+    # Pool de conexiones (aplica a los motores síncrono y asíncrono, cada uno con su propio pool)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True
+
+    # Réplicas de lectura: URLs separadas por coma (vacío = todo va al primario)
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: int = 30  # tiempo que se omite una réplica caída
+    DB_PRIMARY_PIN_SECONDS: int = 5  # lecturas al primario tras una escritura del mismo cliente
+
+    # Generador de ids (0-1023): sin valor, cada proceso arrienda un worker_id en la base de datos al
+    # arrancar. Un valor fijo solo sirve si un único proceso lo usa (p. ej. pruebas o scripts)
+    ID_GENERATOR_WORKER_ID: Optional[int] = None
+    ID_GENERATOR_LEASE_SECONDS: int = 300
 
     # JWT
     SECRET_KEY: str
@@ -24,6 +43,58 @@ class Settings(BaseSettings):
 
     FRONTEND_URL: str
 
+    # Cache del período fiscal activo (respaldo si no llega una invalidación explícita)
+    TAX_PERIOD_CACHE_TTL_SECONDS: int = 300
+
+    # Cache de resultados de la consulta pública de vehículos
+    CONSULT_CACHE_ENABLED: bool = True
+    CONSULT_CACHE_MAX_ENTRIES: int = 10000
+    CONSULT_CACHE_TTL_SECONDS: int = 60
+    CONSULT_BULK_MAX_PLATES: int = 1000
+
+    # Barrido de pagos PSE abandonados (intervalo 0 = sin barrido en segundo plano)
+    PAYMENT_EXPIRY_MINUTES: int = 60
+    PAYMENT_EXPIRY_BATCH_SIZE: int = 500
+    PAYMENT_EXPIRY_SWEEP_INTERVAL_SECONDS: int = 300
+
+    # Pago de varias vigencias y vehículos en una sola transacción PSE
+    PAYMENT_CART_MAX_ITEMS: int = 50
+
+    # Pasarela PSE (sin URL se usa la simulación local de bancos y sin redirección)
+    PSE_GATEWAY_URL: Optional[str] = None
+    PSE_API_KEY: Optional[str] = None
+    PSE_CALLBACK_URL: Optional[str] = None  # p. ej. https://api.example.com/api/v1/vehicles/complete-payment
+    PSE_TIMEOUT_SECONDS: float = 10.0
+    PSE_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    PSE_MAX_CONNECTIONS: int = 100
+    PSE_MAX_CONCURRENCY: int = 50
+    PSE_MAX_RETRIES: int = 3
+    PSE_RETRY_BACKOFF_SECONDS: float = 0.2
+
+    # Notificación de estados de pago: "memory" (un proceso) o "postgres" (LISTEN/NOTIFY)
+    PAYMENT_EVENTS_BACKEND: str = "memory"
+    PAYMENT_EVENTS_MAX_WAIT_SECONDS: int = 300
+    PAYMENT_EVENTS_HEARTBEAT_SECONDS: int = 15
+
+    # Generación de PDFs en procesos aparte; con la cola llena se responde 503
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_MAX_PENDING: int = 32
+    PDF_RENDER_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # Cache en disco de estados de cuenta en PDF (LRU acotado por tamaño, con TTL). El límite aplica al
+    # directorio completo, compartido por los procesos, que se vuelve a medir cada PDF_CACHE_RESCAN_SECONDS
+    PDF_CACHE_ENABLED: bool = True
+    PDF_CACHE_DIR: str = "app/static/pdf_cache"
+    PDF_CACHE_MAX_MB: int = 512
+    PDF_CACHE_TTL_SECONDS: int = 86400
+    PDF_CACHE_RESCAN_SECONDS: int = 30
+
+    # Generación masiva de estados de cuenta desde la CLI (sin valor se usa un worker por CPU)
+    STATEMENT_BATCH_WORKERS: Optional[int] = None
+    STATEMENT_BATCH_CHUNK_SIZE: int = 500
+    # Exportación desde la API: un pool fijo por proceso y una exportación a la vez (las demás reciben 409)
+    STATEMENT_EXPORT_WORKERS: int = 2
+
     # Configuración de correo
     SMTP_TLS: bool = True
     SMTP_PORT: int | None = None
@@ -37,6 +108,10 @@ class Settings(BaseSettings):
     def CORS_ORIGINS(self) -> List[str]:
         return [self.FRONTEND_URL]
 
+    @property
+    def REPLICA_URLS(self) -> List[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     @validator("DATABASE_URL", pre=True)
     def assemble_db_connection(cls, v: str | None, values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
@@ -0,0 +1,101 @@
+# app/core/id_generator.py
+import os
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+# Estructura tipo Snowflake: 41 bits de milisegundos, 10 bits de worker y 12 bits de secuencia
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_DIGITS = 19  # ancho fijo para que el orden lexicográfico coincida con el numérico
+
+
+class IdGenerator:
+    """
+    Genera identificadores enteros únicos, monotónicos y ordenables por tiempo.
+    Cada proceso debe usar un worker_id distinto; dentro del proceso es seguro entre hilos.
+    Si el reloj retrocede se sigue usando el último milisegundo emitido, y si la secuencia
+    se agota se avanza al siguiente, de modo que nunca se repite un id.
+    """
+
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id debe estar entre 0 y {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000 - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | \
+                (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_reference(self, prefix: str) -> str:
+        """Id con prefijo y ancho fijo, p. ej. PSE-0001234567890123456"""
+        return f"{prefix}-{self.next_id():0{ID_DIGITS}d}"
+
+
+class WorkerNotAssignedError(RuntimeError):
+    """El proceso no tiene un worker_id vigente y no puede emitir ids"""
+
+
+# Generador del proceso: con ID_GENERATOR_WORKER_ID se crea al importar; si no, lo asigna
+# el arrendamiento de app.services.id_worker_lease al arrancar la aplicación
+id_generator: Optional[IdGenerator] = None
+_valid_until: Optional[float] = None
+
+
+def assign_worker(worker_id: int, valid_for_seconds: Optional[float] = None) -> None:
+    """Asigna el worker del proceso; con valid_for_seconds deja de emitir ids si no se renueva a tiempo"""
+    global id_generator, _valid_until
+    if id_generator is None or id_generator.worker_id != worker_id:
+        id_generator = IdGenerator(worker_id)
+    _valid_until = time.monotonic() + valid_for_seconds if valid_for_seconds is not None else None
+
+
+def unassign_worker() -> None:
+    global id_generator, _valid_until
+    id_generator = None
+    _valid_until = None
+
+
+def _configured_worker() -> None:
+    if settings.ID_GENERATOR_WORKER_ID is not None:
+        assign_worker(settings.ID_GENERATOR_WORKER_ID)
+    else:
+        unassign_worker()
+
+
+_configured_worker()
+
+if hasattr(os, "register_at_fork"):
+    # Un proceso hijo (p. ej. workers de gunicorn) no hereda el arrendamiento ni el estado del padre
+    os.register_at_fork(after_in_child=_configured_worker)
+
+
+def next_reference(prefix: str) -> str:
+    """Atajo sobre el generador del proceso actual; falla en lugar de adivinar un worker"""
+    generator = id_generator
+    if generator is None:
+        raise WorkerNotAssignedError(
+            "El generador de ids no tiene worker_id: configure ID_GENERATOR_WORKER_ID o arriende uno al arrancar"
+        )
+    if _valid_until is not None and time.monotonic() > _valid_until:
+        raise WorkerNotAssignedError("El arrendamiento del worker_id venció sin renovarse")
+    return generator.next_reference(prefix)
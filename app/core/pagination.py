@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Cursor opaco para paginación keyset sobre (fecha, id)"""
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica un cursor generado por encode_cursor; ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginación inválido")
+
+
+def before_cursor(timestamp_column, id_column, cursor: str):
+    """Condición keyset para recorrer en orden descendente desde el cursor"""
+    timestamp, row_id = decode_cursor(cursor)
+    return tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id)
+
+
+def next_cursor(rows: list, limit: int, timestamp_attr: str = "payment_date") -> Optional[str]:
+    """Cursor de la siguiente página, o None si la página no se llenó"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, timestamp_attr), last.id)
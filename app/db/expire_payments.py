@@ -0,0 +1,31 @@
+"""
+Expira los pagos PSE abandonados; pensado para ejecutarse desde cron.
+
+Uso:
+    python -m app.db.expire_payments [--max-age-minutes 60] [--batch-size 500]
+"""
+import argparse
+import json
+import logging
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.payment_expiry_service import PaymentExpirySweeper
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Expira pagos PSE pendientes sin respuesta")
+    parser.add_argument("--max-age-minutes", type=int, default=settings.PAYMENT_EXPIRY_MINUTES)
+    parser.add_argument("--batch-size", type=int, default=settings.PAYMENT_EXPIRY_BATCH_SIZE)
+    args = parser.parse_args()
+
+    sweeper = PaymentExpirySweeper(max_age_minutes=args.max_age_minutes, batch_size=args.batch_size)
+    with SessionLocal() as session:
+        result = sweeper.run(session)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Genera los estados de cuenta en PDF de una ciudad o tipo de vehículo, empaquetados en ZIP.
+Si se interrumpe, volver a ejecutar con el mismo directorio retoma desde el último checkpoint.
+
+Uso:
+    python -m app.db.generate_statements salida/ [--city Cali] [--vehicle-type particular]
+        [--chunk-size 500] [--part-size 20000] [--workers 16]
+"""
+import argparse
+import json
+import logging
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.vehicle import VehicleType
+from app.services.statement_batch_service import StatementBatchService
+from app.services.tax_period_cache import tax_period_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera estados de cuenta en PDF empaquetados en ZIP")
+    parser.add_argument("output_dir", help="Directorio de los ZIP y del checkpoint")
+    parser.add_argument("--city", help="Filtrar por ciudad")
+    parser.add_argument("--vehicle-type", choices=[vehicle_type.value for vehicle_type in VehicleType],
+                        help="Filtrar por tipo de vehículo")
+    parser.add_argument("--chunk-size", type=int, default=settings.STATEMENT_BATCH_CHUNK_SIZE,
+                        help="Vehículos por bloque de lectura y de renderizado")
+    parser.add_argument("--part-size", type=int, default=20000, help="PDFs por archivo ZIP")
+    parser.add_argument("--workers", type=int, default=settings.STATEMENT_BATCH_WORKERS,
+                        help="Procesos de renderizado (por defecto uno por CPU)")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        tax_period, tax_rates = tax_period_cache.get(session)
+        if not tax_period:
+            raise SystemExit("No hay período fiscal activo")
+
+        report = StatementBatchService.write_zip_parts(
+            session,
+            tax_period,
+            tax_rates,
+            args.output_dir,
+            vehicle_type=VehicleType(args.vehicle_type) if args.vehicle_type else None,
+            city=args.city,
+            chunk_size=args.chunk_size,
+            part_size=args.part_size,
+            workers=args.workers
+        )
+        logger.info("Generación terminada")
+        print(json.dumps(report, indent=2))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
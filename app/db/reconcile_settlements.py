@@ -0,0 +1,35 @@
+"""
+Concilia un archivo de liquidación PSE desde la línea de comandos.
+
+Uso:
+    python -m app.db.reconcile_settlements liquidacion.csv [--chunk-size 5000]
+"""
+import argparse
+import json
+import logging
+
+from app.db.session import SessionLocal
+from app.services.reconciliation_service import ReconciliationService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concilia un archivo de liquidación PSE")
+    parser.add_argument("file", help="Archivo CSV con transaction_id, bank_reference, status y paid_at")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Filas procesadas por transacción")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as file:
+            report = ReconciliationService.reconcile_file(session, file, chunk_size=args.chunk_size)
+        logger.info("Conciliación terminada")
+        print(json.dumps(report, indent=2))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
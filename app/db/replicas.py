@@ -0,0 +1,196 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from app.db.session import engine, async_engine, get_async_database_url, get_pool_options
+
+logger = logging.getLogger(__name__)
+
+# Cookie y encabezado con los que se fija al cliente en el primario justo después de escribir.
+# El encabezado sirve a clientes de API que no guardan cookies: lo reenvían tal cual lo recibieron
+PRIMARY_PIN_COOKIE = "db_primary_pin"
+PRIMARY_PIN_HEADER = "X-DB-Primary-Pin"
+
+
+def primary_pin_value() -> str:
+    """Valor del pin: instante (epoch, segundos) hasta el que las lecturas van al primario"""
+    return str(int(time.time()) + settings.DB_PRIMARY_PIN_SECONDS)
+
+
+def is_pin_active(value: Optional[str]) -> bool:
+    """
+    True si el pin no ha vencido. Se acota a DB_PRIMARY_PIN_SECONDS desde ahora para que un
+    cliente no pueda fijarse al primario indefinidamente enviando un instante lejano
+    """
+    try:
+        pinned_until = int(value)
+    except (TypeError, ValueError):
+        return False
+    now = time.time()
+    return now < pinned_until <= now + settings.DB_PRIMARY_PIN_SECONDS + 1
+
+
+class ReplicaRouter:
+    """
+    Reparte las lecturas entre réplicas en round-robin.
+    Una réplica que falla al conectar se omite durante retry_seconds;
+    si no queda ninguna disponible se usa el primario.
+    """
+
+    def __init__(self, primary, replicas: list, retry_seconds: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._down_until: dict[int, float] = {}
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+
+    def candidates(self) -> list[tuple[Optional[int], object]]:
+        """Réplicas disponibles en orden round-robin, seguidas del primario"""
+        ordered = []
+        if self._cycle is not None:
+            now = time.monotonic()
+            with self._lock:
+                start = next(self._cycle)
+            for offset in range(len(self.replicas)):
+                position = (start + offset) % len(self.replicas)
+                if self._down_until.get(position, 0) <= now:
+                    ordered.append((position, self.replicas[position]))
+        ordered.append((None, self.primary))
+        return ordered
+
+    def mark_down(self, position: int, error: Exception) -> None:
+        logger.warning("Réplica %s no disponible, se usará otra fuente: %s", position, error)
+        with self._lock:
+            self._down_until[position] = time.monotonic() + self.retry_seconds
+            self.failovers += 1
+
+    def record_read(self, position: Optional[int]) -> None:
+        if position is None:
+            self.primary_reads += 1
+        else:
+            self.replica_reads += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.replicas),
+            "replicas_down": sum(1 for until in self._down_until.values() if until > now),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers
+        }
+
+    def connect(self, use_primary: bool = False) -> Connection:
+        """Abre una conexión de lectura (réplica o primario)"""
+        candidates = [(None, self.primary)] if use_primary else self.candidates()
+        for position, candidate in candidates:
+            try:
+                connection = candidate.connect()
+            except DBAPIError as error:
+                if position is None:
+                    raise
+                self.mark_down(position, error)
+                continue
+            self.record_read(position)
+            return connection
+
+    async def connect_async(self, use_primary: bool = False) -> AsyncConnection:
+        """Versión asíncrona de connect"""
+        candidates = [(None, self.primary)] if use_primary else self.candidates()
+        for position, candidate in candidates:
+            try:
+                connection = await candidate.connect()
+            except DBAPIError as error:
+                if position is None:
+                    raise
+                self.mark_down(position, error)
+                continue
+            self.record_read(position)
+            return connection
+
+
+def _create_replica_engine(url: str) -> Engine:
+    return create_engine(
+        url,
+        connect_args={"options": "-c timezone=America/Bogota"} if url.startswith("postgresql") else {},
+        **get_pool_options(url, TimedQueuePool)
+    )
+
+
+def _create_async_replica_engine(url: str) -> AsyncEngine:
+    async_url = get_async_database_url(url)
+    return create_async_engine(
+        async_url,
+        connect_args=(
+            {"server_settings": {"timezone": "America/Bogota"}}
+            if async_url.startswith("postgresql+asyncpg") else {}
+        ),
+        **get_pool_options(async_url, TimedAsyncAdaptedQueuePool)
+    )
+
+
+read_router = ReplicaRouter(
+    engine,
+    [_create_replica_engine(url) for url in settings.REPLICA_URLS],
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS
+)
+
+async_read_router = ReplicaRouter(
+    async_engine,
+    [_create_async_replica_engine(url) for url in settings.REPLICA_URLS],
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS
+)
+
+
+def open_read_session(use_primary: bool = False) -> Session:
+    """Sesión de solo lectura ligada a una réplica (o al primario como respaldo)"""
+    return Session(bind=read_router.connect(use_primary), autoflush=False)
+
+
+async def open_async_read_session(use_primary: bool = False) -> AsyncSession:
+    """Versión asíncrona de open_read_session"""
+    return AsyncSession(
+        bind=await async_read_router.connect_async(use_primary),
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+@contextmanager
+def read_session(use_primary: bool = False) -> Iterator[Session]:
+    """Sesión de lectura que devuelve su conexión al cerrarse"""
+    db = open_read_session(use_primary)
+    connection = db.bind
+    try:
+        yield db
+    finally:
+        db.close()
+        connection.close()
+
+
+@asynccontextmanager
+async def async_read_session(use_primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """Versión asíncrona de read_session"""
+    db = await open_async_read_session(use_primary)
+    connection = db.bind
+    try:
+        yield db
+    finally:
+        await db.close()
+        await connection.close()
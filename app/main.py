@@ -1,13 +1,55 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
+from app.db.pool_metrics import request_pool_wait
+from app.db.replicas import PRIMARY_PIN_COOKIE, PRIMARY_PIN_HEADER, primary_pin_value
+from app.services.id_worker_lease import id_worker_leaser
+from app.services.payment_events import payment_events
+from app.services.payment_expiry_service import payment_expiry_sweeper
+from app.services.pdf_render_pool import pdf_render_pool
+from app.services.pse_client import pse_client
+from app.services.statement_batch_service import statement_export_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arrienda el worker_id del generador de referencias (sin él la aplicación no arranca),
+    arranca el barrido de pagos PSE expirados y las notificaciones de estado;
+    al apagar cierra el cliente PSE y los procesos de generación y exportación de PDFs
+    """
+    lease_task = None
+    if settings.ID_GENERATOR_WORKER_ID is None:
+        await run_in_threadpool(id_worker_leaser.start)
+        lease_task = asyncio.create_task(id_worker_leaser.run_forever())
+    await payment_events.start()
+    sweeper_task = None
+    if settings.PAYMENT_EXPIRY_SWEEP_INTERVAL_SECONDS > 0:
+        sweeper_task = asyncio.create_task(
+            payment_expiry_sweeper.run_forever(settings.PAYMENT_EXPIRY_SWEEP_INTERVAL_SECONDS)
+        )
+    yield
+    if sweeper_task is not None:
+        sweeper_task.cancel()
+    await pse_client.aclose()
+    pdf_render_pool.shutdown()
+    statement_export_pool.shutdown()
+    await payment_events.stop()
+    if lease_task is not None:
+        lease_task.cancel()
+        await run_in_threadpool(id_worker_leaser.stop)
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Usar los CORS_ORIGINS desde la configuración
@@ -17,6 +59,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[PRIMARY_PIN_HEADER],
 )
 
+
+@app.middleware("http")
+async def track_db_pool_wait(request: Request, call_next):
+    """Informa cuánto esperó el request por conexiones del pool"""
+    pool_wait = [0.0]
+    token = request_pool_wait.set(pool_wait)
+    try:
+        response = await call_next(request)
+    finally:
+        request_pool_wait.reset(token)
+    response.headers["X-DB-Pool-Wait-Ms"] = f"{pool_wait[0] * 1000:.3f}"
+    return response
+
+
+@app.middleware("http")
+async def pin_reads_to_primary_after_write(request: Request, call_next):
+    """Tras una escritura, las lecturas del mismo cliente van al primario mientras las réplicas se ponen al día"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        # Clientes sin cookies reenvían el encabezado en sus siguientes lecturas
+        pin = primary_pin_value()
+        response.headers[PRIMARY_PIN_HEADER] = pin
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            pin,
+            max_age=settings.DB_PRIMARY_PIN_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
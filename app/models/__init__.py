@@ -1,6 +1,8 @@
 # app/models/__init__.py
 from .document_type import DocumentType
+from .id_worker_lease import IdWorkerLease
 from .payment import Payment
+from .payment_attempt import PaymentAttempt
 from .payment_status_log import PaymentStatusLog
 from .system_config import SystemConfig
 from .tax_period import TaxPeriod
@@ -10,7 +12,9 @@ from .vehicle import Vehicle, VehicleType
 
 __all__ = [
     "DocumentType",
+    "IdWorkerLease",
     "Payment",
+    "PaymentAttempt",
     "PaymentStatusLog",
     "SystemConfig",
     "TaxPeriod",
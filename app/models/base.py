@@ -5,9 +5,11 @@ from app.models.system_config import SystemConfig
 from app.models.user import User
 from app.models.vehicle import Vehicle
 from app.models.payment import Payment
+from app.models.payment_attempt import PaymentAttempt
 from app.models.tax_period import TaxPeriod
 from app.models.tax_rate import TaxRate
 from app.models.document_type import DocumentType
+from app.models.id_worker_lease import IdWorkerLease
 
 # Configurar las relaciones
 User.vehicles = relationship("Vehicle", back_populates="owner", cascade="all, delete-orphan")
@@ -33,6 +35,6 @@ PaymentStatusLog.payment = relationship("Payment", back_populates="status_logs")
 PaymentStatusLog.user = relationship("User", back_populates="payment_logs")
 
 __all__ = [
-    "User", "Vehicle", "Payment", "TaxPeriod", "TaxRate",
-    "DocumentType", "PaymentStatusLog", "SystemConfig", "Base"
+    "User", "Vehicle", "Payment", "PaymentAttempt", "TaxPeriod", "TaxRate",
+    "DocumentType", "IdWorkerLease", "PaymentStatusLog", "SystemConfig", "Base"
 ]
@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String
+from app.models.base_class import Base
+
+
+class IdWorkerLease(Base):
+    """Arrendamiento de un worker_id del generador de ids por un proceso"""
+    worker_id: Mapped[int] = mapped_column(unique=True, nullable=False)
+    holder: Mapped[str] = mapped_column(String, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
@@ -9,6 +9,7 @@ if TYPE_CHECKING:
     from .vehicle import Vehicle
     from .tax_period import TaxPeriod
     from .payment_status_log import PaymentStatusLog
+    from .payment_attempt import PaymentAttempt
 
 
 class PaymentProcessStatus(str, enum.Enum):
@@ -55,6 +56,8 @@ class Payment(Base):
     correction_fee: Mapped[float] = mapped_column(Float, default=0.0)
     pse_transaction_id: Mapped[str | None] = mapped_column(String)
     email_notification_sent: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Versión para control de concurrencia optimista en las transiciones de estado
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default="1")
 
     vehicle: Mapped["Vehicle"] = relationship("Vehicle", back_populates="payments")
     tax_period: Mapped["TaxPeriod"] = relationship("TaxPeriod", back_populates="payments")
@@ -63,6 +66,11 @@ class Payment(Base):
         back_populates="payment",
         cascade="all, delete-orphan"
     )
+    attempts: Mapped[list["PaymentAttempt"]] = relationship(
+        "PaymentAttempt",
+        back_populates="payment",
+        cascade="all, delete-orphan"
+    )
 
     correction_payment: Mapped[Optional["Payment"]] = relationship(
         "Payment",
@@ -74,5 +82,7 @@ class Payment(Base):
     __table_args__ = (
         Index('idx_payment_status_date', 'status', 'payment_date'),
         Index('idx_payment_vehicle_year', 'vehicle_id', 'tax_year'),
+        # Historial paginado por (payment_date, id) de un vehículo
+        Index('idx_payment_vehicle_date', 'vehicle_id', 'payment_date', 'id'),
         UniqueConstraint('vehicle_id', 'tax_period_id', name='uq_vehicle_tax_period'),
     )
@@ -0,0 +1,27 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Float, ForeignKey, String, Index, UniqueConstraint
+from app.models.base_class import Base
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .payment import Payment
+
+
+class PaymentAttempt(Base):
+    """
+    Intento de pago PSE: una fila por pago y referencia enviada al banco.
+    Un pago reintentado conserva sus referencias anteriores, de modo que un callback o una
+    liquidación tardía de una referencia reemplazada sigue encontrando todos sus pagos.
+    """
+    payment_id: Mapped[int] = mapped_column(ForeignKey("payment.id"), nullable=False)
+    reference: Mapped[str] = mapped_column(String, nullable=False)
+    bank: Mapped[str | None] = mapped_column(String)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+
+    payment: Mapped["Payment"] = relationship("Payment", back_populates="attempts")
+
+    __table_args__ = (
+        # También sirve la búsqueda de los pagos de una referencia
+        UniqueConstraint('reference', 'payment_id', name='uq_payment_attempt_reference'),
+        Index('idx_payment_attempt_payment', 'payment_id'),
+    )
@@ -40,6 +40,23 @@ class PSERedirectResponse(BaseModel):
     payment_date: Optional[str] = None
 
 
+class PSECartItem(BaseModel):
+    plate: str
+    tax_year: int
+
+
+class PSECartPaymentRequest(BaseModel):
+    document_type: str
+    document_number: str
+    items: List[PSECartItem] = Field(..., min_length=1, description="Vigencias a pagar por vehículo")
+    bank_code: str = Field(..., description="Código del banco seleccionado")
+    email: str
+
+
+class PSECartRedirectResponse(PSERedirectResponse):
+    items: List[dict] = []
+
+
 class PSEBankResponse(BaseModel):
     bank_code: str
     bank_name: str
@@ -79,9 +96,10 @@ class PaymentHistoryResponse(BaseModel):
 
 
 class PaymentCompletionResponse(BaseModel):
+    message: Optional[str] = None
     transaction_id: str
     status: str
-    payment_date: str
+    payment_date: Optional[str] = None
     amount: float
     reference_number: str
 
@@ -105,7 +123,7 @@ class VehiclePaymentHistoryResponse(BaseModel):
         "placa": "",
         "marca": ""
     }
-    ultimo_pago: dict = {
+    ultimo_pago: Optional[dict] = {
         "periodo_pagado": "",
         "fecha_pago": "",
         "valor_pagado": 0.0
@@ -116,6 +134,20 @@ class VehiclePaymentHistoryResponse(BaseModel):
         "valor": 0.0,
         "estado": ""
     }]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+
+class ReconciliationReport(BaseModel):
+    rows: int
+    completed: int
+    failed: int
+    already_processed: int
+    unmatched: int
+    duplicates: int
+    invalid: int
+    settled_not_completed: int
+    unmatched_sample: List[str]
+    settled_not_completed_sample: List[str]
@@ -52,6 +52,11 @@ class VehicleTaxResponse(BaseModel):
         from_attributes = True
 
 
+class VehicleTaxDashboardResponse(BaseModel):
+    items: list[VehicleTaxResponse]
+    next_after_id: Optional[int] = None
+
+
 class AccountStatementResponse(BaseModel):
     header: dict
     vehicle_details: dict
@@ -78,6 +83,18 @@ class ProcessDetailResponse(BaseModel):
         from_attributes = True
 
 
+class OwnerPortfolioResponse(BaseModel):
+    items: list[dict]
+    totals: Optional[dict] = None
+    next_after_id: Optional[int] = None
+
+
+class VehicleBulkConsultRequest(BaseModel):
+    document_type: str
+    document_number: str
+    plates: list[constr(pattern="^[A-Za-z0-9]{6}$")]
+
+
 class VehicleConsultResponse(BaseModel):
     vehicle_details: dict
     tax_details: dict
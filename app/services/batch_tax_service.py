@@ -0,0 +1,291 @@
+from typing import Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import Numeric, and_, case, cast, extract, func
+
+from app.models.tax_period import TaxPeriod
+from app.models.tax_rate import TaxRate
+from app.models.vehicle import Vehicle, VehicleType
+from app.services.tax_service import TaxService, TaxRateIndex
+
+
+class BatchTaxService:
+    """
+    Cálculo vectorizado del impuesto para flotas completas.
+    Replica exactamente VehicleService.calculate_total_tax_amount sobre arreglos columnares.
+    Las variantes sql_* expresan el mismo cálculo en SQL sobre las columnas de Vehicle,
+    para agregar flotas sin traer los vehículos a Python.
+    """
+
+    @staticmethod
+    def columns_from_vehicles(vehicles: Iterable[Vehicle]) -> dict[str, np.ndarray]:
+        """Convierte vehículos (ORM o filas con los mismos atributos) en columnas para el cálculo en lote"""
+        vehicles = list(vehicles)
+        return {
+            "commercial_value": np.fromiter(
+                (vehicle.commercial_value for vehicle in vehicles), dtype=np.float64, count=len(vehicles)
+            ),
+            "vehicle_type": np.array([VehicleType(vehicle.vehicle_type).value for vehicle in vehicles]),
+            "is_electric": np.fromiter(
+                (bool(vehicle.is_electric) for vehicle in vehicles), dtype=bool, count=len(vehicles)
+            ),
+            "is_hybrid": np.fromiter(
+                (bool(vehicle.is_hybrid) for vehicle in vehicles), dtype=bool, count=len(vehicles)
+            ),
+            "is_new": np.fromiter(
+                (bool(vehicle.is_new) for vehicle in vehicles), dtype=bool, count=len(vehicles)
+            ),
+            "registration_month": np.fromiter(
+                (vehicle.registration_date.month for vehicle in vehicles), dtype=np.int64, count=len(vehicles)
+            ),
+        }
+
+    @staticmethod
+    def _vehicle_type_array(vehicle_type: Sequence) -> np.ndarray:
+        """Normaliza la columna de tipos a un arreglo de texto con los valores de VehicleType"""
+        if isinstance(vehicle_type, np.ndarray) and vehicle_type.dtype.kind == "U":
+            return vehicle_type
+
+        # np.asarray convierte los miembros del enum con str(), por eso se mapean los valores únicos
+        vehicle_type = np.asarray(vehicle_type, dtype=object)
+        if vehicle_type.size == 0:
+            return vehicle_type.astype(str)
+        unique_types, inverse = np.unique(vehicle_type, return_inverse=True)
+        values = np.array([VehicleType(value).value for value in unique_types])
+        return values[inverse.reshape(vehicle_type.shape)]
+
+    @staticmethod
+    def lookup_rates(
+            commercial_value: np.ndarray,
+            vehicle_type: np.ndarray,
+            tax_rates: list[TaxRate] | TaxRateIndex
+    ) -> np.ndarray:
+        """
+        Resuelve la tasa aplicable (en porcentaje) de cada vehículo.
+        Retorna NaN donde ningún tramo aplica.
+        """
+        if not isinstance(tax_rates, TaxRateIndex):
+            tax_rates = TaxService.build_rate_index(tax_rates)
+
+        rates = np.full(commercial_value.shape, np.nan)
+        for current_type in VehicleType:
+            mask = vehicle_type == current_type.value
+            if not mask.any():
+                continue
+
+            values = commercial_value[mask]
+            brackets = tax_rates.brackets(current_type)
+            if brackets is None:
+                rates[mask] = BatchTaxService._scan_rates(values, tax_rates.rates)
+                continue
+
+            min_values = np.asarray(brackets[0], dtype=np.float64)
+            max_values = np.asarray(brackets[1], dtype=np.float64)
+            bracket_rates = np.asarray([rate.rate for rate in brackets[2]], dtype=np.float64)
+
+            position = np.searchsorted(min_values, values, side="right") - 1
+            safe_position = np.clip(position, 0, None)
+            found = (position >= 0) & (values <= max_values[safe_position])
+            rates[mask] = np.where(found, bracket_rates[safe_position], np.nan)
+
+        return rates
+
+    @staticmethod
+    def _scan_rates(values: np.ndarray, tax_rates: list[TaxRate]) -> np.ndarray:
+        """Equivalente vectorizado de TaxService.scan_tax_rates (primer tramo que contiene el valor)"""
+        rates = np.full(values.shape, np.nan)
+        for rate in tax_rates:
+            min_val = rate.min_value or float('-inf')
+            max_val = rate.max_value or float('inf')
+            pending = np.isnan(rates) & (values >= min_val) & (values <= max_val)
+            rates[pending] = rate.rate
+        return rates
+
+    @staticmethod
+    def _round_cents(amounts: np.ndarray) -> np.ndarray:
+        """
+        Redondea a centavos igual que round(x, 2) de Python.
+        np.round escala por 100 y puede diferir en valores muy cercanos al medio centavo;
+        esos casos (raros) se recalculan con round() para coincidir con el cálculo escalar.
+        """
+        rounded = np.round(amounts, 2)
+        scaled = amounts * 100
+        ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        for position in np.flatnonzero(ambiguous):
+            rounded[position] = round(float(amounts[position]), 2)
+        return rounded
+
+    @staticmethod
+    def calculate_base_tax(
+            tax_rates: list[TaxRate] | TaxRateIndex,
+            commercial_value: Sequence[float],
+            vehicle_type: Sequence,
+            is_electric: Sequence[bool],
+            is_hybrid: Sequence[bool],
+            is_new: Sequence[bool],
+            registration_month: Sequence[int]
+    ) -> np.ndarray:
+        """Versión vectorizada de VehicleService.calculate_tax_amount"""
+        commercial_value = np.asarray(commercial_value, dtype=np.float64)
+        vehicle_type = BatchTaxService._vehicle_type_array(vehicle_type)
+        is_electric = np.asarray(is_electric, dtype=bool)
+        is_hybrid = np.asarray(is_hybrid, dtype=bool)
+        is_new = np.asarray(is_new, dtype=bool)
+        registration_month = np.asarray(registration_month, dtype=np.int64)
+
+        rates = BatchTaxService.lookup_rates(commercial_value, vehicle_type, tax_rates)
+        has_rate = ~np.isnan(rates)
+
+        # Mismo orden de operaciones que el cálculo escalar para obtener resultados idénticos
+        base_tax = commercial_value * (np.where(has_rate, rates, 0.0) / 100.0)
+
+        # Eléctricos: tope del 1% del valor comercial y descuento según tipo
+        electric_tax = np.minimum(base_tax, commercial_value * 0.01)
+        electric_tax = np.where(
+            vehicle_type == VehicleType.PUBLIC.value,
+            electric_tax * 0.3,  # 70% descuento para taxis eléctricos
+            electric_tax * 0.4  # 60% descuento para eléctricos particulares
+        )
+        base_tax = np.where(is_electric, electric_tax, base_tax)
+        base_tax = np.where(~is_electric & is_hybrid, base_tax * 0.6, base_tax)
+
+        # Vehículos nuevos: prorrateo por meses restantes
+        remaining_months = 12 - registration_month + 1
+        base_tax = np.where(is_new, (base_tax / 12) * remaining_months, base_tax)
+
+        return np.where(has_rate, BatchTaxService._round_cents(base_tax), 0.0)
+
+    @staticmethod
+    def calculate_traffic_light_fee(tax_period: TaxPeriod, vehicle_type: Sequence) -> np.ndarray:
+        """Versión vectorizada de TaxService.calculate_traffic_light_fee"""
+        vehicle_type = BatchTaxService._vehicle_type_array(vehicle_type)
+        if not tax_period:
+            return np.zeros(vehicle_type.shape)
+
+        return np.where(
+            vehicle_type == VehicleType.MOTORCYCLE.value,
+            tax_period.traffic_light_fee * 0.5,  # 50% para motos
+            float(tax_period.traffic_light_fee)
+        )
+
+    @staticmethod
+    def calculate_fleet_tax(
+            tax_period: TaxPeriod,
+            tax_rates: list[TaxRate] | TaxRateIndex,
+            commercial_value: Sequence[float],
+            vehicle_type: Sequence,
+            is_electric: Sequence[bool],
+            is_hybrid: Sequence[bool],
+            is_new: Sequence[bool],
+            registration_month: Sequence[int]
+    ) -> dict[str, np.ndarray]:
+        """
+        Calcula el desglose del impuesto para una flota completa.
+        Returns: arreglos base_tax, traffic_light_fee y total_amount alineados con la entrada
+        """
+        vehicle_type = BatchTaxService._vehicle_type_array(vehicle_type)
+
+        if tax_period:
+            base_tax = BatchTaxService.calculate_base_tax(
+                tax_rates, commercial_value, vehicle_type,
+                is_electric, is_hybrid, is_new, registration_month
+            )
+        else:
+            base_tax = np.zeros(vehicle_type.shape)
+
+        traffic_light_fee = BatchTaxService.calculate_traffic_light_fee(tax_period, vehicle_type)
+
+        return {
+            "base_tax": base_tax,
+            "traffic_light_fee": traffic_light_fee,
+            "total_amount": base_tax + traffic_light_fee
+        }
+
+    @staticmethod
+    def calculate_vehicles_tax(
+            vehicles: Iterable[Vehicle],
+            tax_period: TaxPeriod,
+            tax_rates: list[TaxRate] | TaxRateIndex
+    ) -> dict[str, np.ndarray]:
+        """Atajo de calculate_fleet_tax a partir de vehículos ORM o filas equivalentes"""
+        return BatchTaxService.calculate_fleet_tax(
+            tax_period, tax_rates, **BatchTaxService.columns_from_vehicles(vehicles)
+        )
+
+    @staticmethod
+    def _sql_rate(tax_rates: TaxRateIndex):
+        """
+        Tasa aplicable como CASE sobre Vehicle, con la misma búsqueda que TaxRateIndex.lookup:
+        por tipo, el tramo de mayor mínimo <= valor (si el valor supera su máximo no hay tasa);
+        para tipos sin tramos, el primer tramo de la tabla que contiene el valor
+        """
+        value = Vehicle.commercial_value
+        whens = []
+        for vehicle_type in VehicleType:
+            is_type = Vehicle.vehicle_type == vehicle_type
+            brackets = tax_rates.brackets(vehicle_type)
+            if brackets is None:
+                for rate in tax_rates.rates:
+                    conditions = [is_type]
+                    if rate.min_value:
+                        conditions.append(value >= rate.min_value)
+                    if rate.max_value:
+                        conditions.append(value <= rate.max_value)
+                    whens.append((and_(*conditions), rate.rate))
+                continue
+
+            # bisect_right: ante mínimos iguales gana el último, por eso se recorre al revés
+            for min_value, max_value, rate in reversed(list(zip(*brackets))):
+                conditions = [is_type]
+                if min_value != float('-inf'):
+                    conditions.append(value >= min_value)
+                if max_value == float('inf'):
+                    whens.append((and_(*conditions), rate.rate))
+                else:
+                    whens.append((and_(*conditions), case((value <= max_value, rate.rate), else_=None)))
+
+        if not whens:
+            return None
+        return case(*whens, else_=None)
+
+    @staticmethod
+    def sql_base_tax(tax_rates: list[TaxRate] | TaxRateIndex):
+        """Versión SQL de calculate_base_tax: impuesto base de cada vehículo redondeado a centavos"""
+        if not isinstance(tax_rates, TaxRateIndex):
+            tax_rates = TaxService.build_rate_index(tax_rates)
+
+        rate = BatchTaxService._sql_rate(tax_rates)
+        if rate is None:
+            return cast(0.0, Numeric)
+
+        value = Vehicle.commercial_value
+        base_tax = value * (rate / 100.0)
+
+        # Eléctricos: tope del 1% del valor comercial y descuento según tipo
+        electric_tax = case((base_tax < value * 0.01, base_tax), else_=value * 0.01)
+        electric_tax = case(
+            (Vehicle.vehicle_type == VehicleType.PUBLIC, electric_tax * 0.3),
+            else_=electric_tax * 0.4
+        )
+        base_tax = case(
+            (Vehicle.is_electric, electric_tax),
+            (Vehicle.is_hybrid, base_tax * 0.6),
+            else_=base_tax
+        )
+
+        # Vehículos nuevos: prorrateo por meses restantes
+        remaining_months = 12 - extract("month", Vehicle.registration_date) + 1
+        base_tax = case((Vehicle.is_new, (base_tax / 12) * remaining_months), else_=base_tax)
+
+        # round() de PostgreSQL no admite double precision; NULL (sin tasa) equivale a 0
+        return func.coalesce(func.round(cast(base_tax, Numeric), 2), 0)
+
+    @staticmethod
+    def sql_traffic_light_fee(tax_period: TaxPeriod):
+        """Versión SQL de calculate_traffic_light_fee"""
+        if not tax_period:
+            return cast(0.0, Numeric)
+        return case(
+            (Vehicle.vehicle_type == VehicleType.MOTORCYCLE, tax_period.traffic_light_fee * 0.5),
+            else_=float(tax_period.traffic_light_fee)
+        )
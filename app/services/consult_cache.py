@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+
+class ConsultResultCache:
+    """
+    Cache LRU con TTL para los resultados de la consulta pública de vehículos.
+    Las entradas se indexan por placa para poder invalidar un vehículo puntual
+    cuando cambia su estado (pago completado, registro nuevo).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._keys_by_plate: dict[str, set] = {}
+        self._plate_by_vehicle: dict[int, str] = {}
+        self._vehicle_by_plate: dict[str, int] = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Contador de invalidaciones; se lee antes de calcular un resultado para pasarlo a set()"""
+        return self._generation
+
+    @staticmethod
+    def make_key(plate: str, document_type: str, document_number: str, version: int) -> tuple:
+        return plate.upper(), document_type, document_number, version
+
+    def get(self, key: tuple) -> Optional[Any]:
+        """Retorna el resultado cacheado o None si no existe o expiró"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+            self,
+            key: tuple,
+            value: Any,
+            vehicle_id: Optional[int] = None,
+            generation: Optional[int] = None
+    ) -> None:
+        """
+        Guarda un resultado; vehicle_id permite invalidarlo luego por id de vehículo.
+        Si se indica generation y hubo invalidaciones desde entonces, el resultado
+        pudo calcularse con datos ya obsoletos y no se guarda.
+        """
+        if not self.enabled:
+            return
+
+        plate = key[0]
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            self._keys_by_plate.setdefault(plate, set()).add(key)
+            if vehicle_id is not None:
+                self._plate_by_vehicle[vehicle_id] = plate
+                self._vehicle_by_plate[plate] = vehicle_id
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        self._entries.pop(key, None)
+        plate_keys = self._keys_by_plate.get(key[0])
+        if plate_keys is not None:
+            plate_keys.discard(key)
+            if not plate_keys:
+                del self._keys_by_plate[key[0]]
+                vehicle_id = self._vehicle_by_plate.pop(key[0], None)
+                if vehicle_id is not None:
+                    self._plate_by_vehicle.pop(vehicle_id, None)
+
+    def invalidate_vehicle(self, vehicle_id: Optional[int] = None, plate: Optional[str] = None) -> None:
+        """Descarta todos los resultados cacheados de un vehículo (por id o placa)"""
+        with self._lock:
+            self._generation += 1
+            if plate is None and vehicle_id is not None:
+                plate = self._plate_by_vehicle.get(vehicle_id)
+            if plate is None:
+                return
+
+            for key in list(self._keys_by_plate.get(plate.upper(), ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_plate.clear()
+            self._plate_by_vehicle.clear()
+            self._vehicle_by_plate.clear()
+
+    def stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+consult_cache = ConsultResultCache(
+    max_entries=settings.CONSULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CONSULT_CACHE_TTL_SECONDS,
+    enabled=settings.CONSULT_CACHE_ENABLED
+)
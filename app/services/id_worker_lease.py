@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import id_generator
+from app.core.config import settings
+from app.core.id_generator import MAX_WORKER_ID
+from app.models import IdWorkerLease
+
+logger = logging.getLogger(__name__)
+
+CLAIM_ATTEMPTS = 5
+
+
+class IdWorkerLeaser:
+    """
+    Arrienda en la base de datos un worker_id del generador de ids para este proceso.
+    Cada worker_id es una fila de IdWorkerLease; se toma una vencida o se crea la siguiente,
+    siempre con una escritura condicional, así dos procesos nunca obtienen el mismo id.
+    El arrendamiento se renueva en segundo plano. El proceso deja de emitir ids a la mitad
+    del plazo sin renovar, lo que tolera desfases de reloj entre hosts de hasta ese margen.
+    """
+
+    def __init__(self, lease_seconds: int):
+        self.lease_seconds = lease_seconds
+        self.worker_id: Optional[int] = None
+        self.holder: Optional[str] = None
+
+    def _new_holder(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _claim_expired(self, db: Session, now: datetime) -> Optional[int]:
+        candidate = db.scalar(
+            select(IdWorkerLease.worker_id)
+            .where(IdWorkerLease.expires_at < now)
+            .order_by(IdWorkerLease.worker_id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if candidate is None:
+            return None
+        return db.execute(
+            update(IdWorkerLease)
+            .where(IdWorkerLease.worker_id == candidate, IdWorkerLease.expires_at < now)
+            .values(holder=self.holder, expires_at=now + timedelta(seconds=self.lease_seconds))
+            .returning(IdWorkerLease.worker_id)
+        ).scalar()
+
+    def _claim_new(self, db: Session, now: datetime) -> Optional[int]:
+        worker_id = db.scalar(select(func.coalesce(func.max(IdWorkerLease.worker_id), -1))) + 1
+        if worker_id > MAX_WORKER_ID:
+            return None
+        db.add(IdWorkerLease(
+            worker_id=worker_id,
+            holder=self.holder,
+            expires_at=now + timedelta(seconds=self.lease_seconds)
+        ))
+        db.flush()
+        return worker_id
+
+    def acquire(self, db: Session) -> int:
+        """Arrienda un worker_id y lo asigna al generador del proceso; falla si no hay ninguno libre"""
+        self.holder = self._new_holder()
+        for _ in range(CLAIM_ATTEMPTS):
+            now = datetime.utcnow()
+            try:
+                worker_id = self._claim_expired(db, now)
+                if worker_id is None:
+                    worker_id = self._claim_new(db, now)
+                if worker_id is None:
+                    db.rollback()
+                    raise RuntimeError(f"Los {MAX_WORKER_ID + 1} worker_id del generador están arrendados")
+                db.commit()
+            except IntegrityError:
+                # Otro proceso creó el mismo worker_id a la vez: se intenta con el siguiente
+                db.rollback()
+                continue
+            self.worker_id = worker_id
+            id_generator.assign_worker(worker_id, valid_for_seconds=self.lease_seconds / 2)
+            logger.info("Worker id %s arrendado por %s", worker_id, self.holder)
+            return worker_id
+        raise RuntimeError("No fue posible arrendar un worker_id del generador")
+
+    def renew(self, db: Session) -> None:
+        """Extiende el arrendamiento; si otro proceso lo tomó, el generador deja de emitir ids"""
+        now = datetime.utcnow()
+        renewed = db.execute(
+            update(IdWorkerLease)
+            .where(IdWorkerLease.worker_id == self.worker_id, IdWorkerLease.holder == self.holder)
+            .values(expires_at=now + timedelta(seconds=self.lease_seconds))
+            .returning(IdWorkerLease.worker_id)
+        ).scalar()
+        db.commit()
+        if renewed is None:
+            id_generator.unassign_worker()
+            raise RuntimeError(f"El worker id {self.worker_id} fue arrendado por otro proceso")
+        id_generator.assign_worker(self.worker_id, valid_for_seconds=self.lease_seconds / 2)
+
+    def release(self, db: Session) -> None:
+        """Libera el arrendamiento al apagar para que otro proceso pueda usar el worker_id"""
+        if self.worker_id is None:
+            return
+        id_generator.unassign_worker()
+        db.execute(
+            update(IdWorkerLease)
+            .where(IdWorkerLease.worker_id == self.worker_id, IdWorkerLease.holder == self.holder)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.commit()
+        self.worker_id = None
+
+    def start(self) -> int:
+        """Arrienda el worker_id del proceso con una sesión propia; pensado para el arranque"""
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            return self.acquire(db)
+
+    def stop(self) -> None:
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            self.release(db)
+
+    async def run_forever(self) -> None:
+        """Renueva el arrendamiento cada tercio del plazo; si se perdió, arrienda otro worker_id"""
+        from app.db.session import SessionLocal
+
+        def renew() -> None:
+            with SessionLocal() as db:
+                try:
+                    self.renew(db)
+                except RuntimeError:
+                    logger.exception("Arrendamiento del worker id perdido")
+                    self.acquire(db)
+
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await run_in_threadpool(renew)
+            except Exception:
+                logger.exception("Error al renovar el arrendamiento del worker id")
+
+
+id_worker_leaser = IdWorkerLeaser(lease_seconds=settings.ID_GENERATOR_LEASE_SECONDS)
@@ -0,0 +1,239 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.id_generator import next_reference
+from app.models import PaymentAttempt, PaymentStatusLog, TaxPeriod, TaxRate
+from app.models.payment import Payment, PaymentStatus, PaymentProcessStatus
+from app.models.vehicle import Vehicle
+from app.services.batch_tax_service import BatchTaxService
+from app.services.document_service import DocumentService
+from app.services.payment_service import PaymentService
+from app.services.tax_service import TaxService, TaxRateIndex
+from app.services.vehicle_service import VehicleService
+
+
+class PaymentCartService:
+    """
+    Pago de varias vigencias y vehículos de un mismo propietario en una sola transacción PSE.
+    Todos los pagos del carrito comparten la referencia PSE: se crean en una transacción y el
+    callback del banco los completa o rechaza juntos (PaymentService.complete_pse_payment).
+    """
+
+    @staticmethod
+    def _periods_query(years: Iterable[int]):
+        return select(TaxPeriod).where(TaxPeriod.year.in_(years))
+
+    @staticmethod
+    def _rates_query(tax_period_ids: Iterable[int]):
+        return select(TaxRate).where(TaxRate.tax_period_id.in_(tax_period_ids))
+
+    @staticmethod
+    def _existing_payments_query(rows: list[dict]):
+        return select(Payment).where(tuple_(Payment.vehicle_id, Payment.tax_period_id).in_(
+            [(row["vehicle_id"], row["tax_period_id"]) for row in rows]
+        ))
+
+    @staticmethod
+    def _load_periods(db: Session, years: set[int]) -> dict[int, tuple[TaxPeriod, TaxRateIndex]]:
+        """Períodos fiscales de las vigencias pedidas con sus tasas compiladas, en dos consultas"""
+        periods = db.scalars(PaymentCartService._periods_query(years)).all()
+        rates_by_period = defaultdict(list)
+        if periods:
+            for rate in db.scalars(PaymentCartService._rates_query([period.id for period in periods])):
+                rates_by_period[rate.tax_period_id].append(rate)
+        return {
+            period.year: (period, TaxService.build_rate_index(rates_by_period[period.id], period.id))
+            for period in periods
+        }
+
+    @staticmethod
+    def price_items(
+            items: list[tuple[str, int]],
+            vehicles: dict[str, Vehicle],
+            periods: dict[int, tuple[TaxPeriod, TaxRateIndex]]
+    ) -> list[dict]:
+        """
+        Calcula el impuesto de cada (placa, vigencia) con el cálculo en lote, una llamada por vigencia.
+        Returns: ítems en el orden recibido con vehículo, período y desglose del impuesto
+        """
+        plates_by_year: dict[int, list[str]] = defaultdict(list)
+        for plate, year in items:
+            plates_by_year[year].append(plate)
+
+        priced = {}
+        for year, plates in plates_by_year.items():
+            tax_period, tax_rates = periods[year]
+            taxes = BatchTaxService.calculate_vehicles_tax(
+                [vehicles[plate] for plate in plates], tax_period, tax_rates
+            )
+            for position, plate in enumerate(plates):
+                priced[(plate, year)] = {
+                    "vehicle": vehicles[plate],
+                    "tax_period": tax_period,
+                    "base_tax": float(taxes["base_tax"][position]),
+                    "traffic_light_fee": float(taxes["traffic_light_fee"][position]),
+                    "amount": round(float(taxes["total_amount"][position]), 2)
+                }
+
+        return [priced[item] for item in items]
+
+    @staticmethod
+    def initiate_cart_payment(
+            db: Session,
+            document_type: str,
+            document_number: str,
+            items: list[tuple[str, int]],
+            bank_code: str,
+            email: str
+    ) -> dict:
+        """
+        Inicia un único pago PSE por varias (placa, vigencia) del mismo propietario.
+        Los pagos se insertan en bloque con ON CONFLICT sobre uq_vehicle_tax_period; las
+        vigencias que ya tenían un pago fallido, cancelado, expirado o sin iniciar se reintentan
+        con la nueva referencia mediante PaymentService._transition. Cada referencia queda
+        registrada como PaymentAttempt, así que un carrito anterior sigue cubriendo todos sus
+        pagos aunque alguno pase a este. Si alguna vigencia está pagada o en curso no se inicia nada.
+        """
+        if not DocumentService.validate_document_number(document_type, document_number):
+            raise ValueError("Número de documento inválido")
+
+        items = list(dict.fromkeys((plate.upper(), year) for plate, year in items))
+        if not items:
+            raise ValueError("El carrito está vacío")
+        if len(items) > settings.PAYMENT_CART_MAX_ITEMS:
+            raise ValueError(f"El carrito admite máximo {settings.PAYMENT_CART_MAX_ITEMS} vigencias")
+
+        plates = sorted({plate for plate, _ in items})
+        vehicles = {
+            vehicle.plate: vehicle
+            for vehicle in db.scalars(VehicleService._bulk_consult_query(plates, document_type, document_number))
+        }
+        missing_plates = [plate for plate in plates if plate not in vehicles]
+        if missing_plates:
+            raise ValueError(f"No se encontraron los vehículos: {', '.join(missing_plates)}")
+
+        periods = PaymentCartService._load_periods(db, {year for _, year in items})
+        missing_years = sorted({year for _, year in items if year not in periods})
+        if missing_years:
+            raise ValueError(f"No existe período fiscal para: {', '.join(map(str, missing_years))}")
+
+        priced = PaymentCartService.price_items(items, vehicles, periods)
+
+        now = datetime.now()
+        reference_number = next_reference("PSE")
+        attempt = {
+            "payment_method": "PSE",
+            "bank": bank_code,
+            "status": PaymentStatus.PENDING,
+            "process_message": None,
+            "payment_date": now,
+            "pse_transaction_id": reference_number,
+            "bank_reference": reference_number
+        }
+        rows = [
+            {
+                "vehicle_id": item["vehicle"].id,
+                "tax_period_id": item["tax_period"].id,
+                "tax_year": item["tax_period"].year,
+                "amount": item["amount"],
+                "due_date": item["tax_period"].due_date,
+                "invoice_number": f"INV-{reference_number}-{position:03d}"
+            }
+            for position, item in enumerate(priced, start=1)
+        ]
+
+        try:
+            cart_payments = db.execute(
+                PaymentService._insert_ignoring_period_conflicts(db)
+                .values([
+                    {**attempt, **row, "process_status": PaymentProcessStatus.PENDING_PSE}
+                    for row in rows
+                ])
+                .returning(Payment.id, Payment.vehicle_id, Payment.tax_period_id)
+            ).all()
+
+            claimed = {(payment.vehicle_id, payment.tax_period_id) for payment in cart_payments}
+            conflicts = [row for row in rows if (row["vehicle_id"], row["tax_period_id"]) not in claimed]
+            if conflicts:
+                # Las vigencias con un pago previo se reintentan con la nueva referencia; sus
+                # referencias anteriores siguen registradas como PaymentAttempt
+                existing = db.scalars(PaymentCartService._existing_payments_query(conflicts)).all()
+                # Las vigencias que no admiten reintento se calculan antes: el rollback expira los pagos
+                periods_by_id = {item["tax_period"].id: item["tax_period"].year for item in priced}
+                plates_by_id = {vehicle.id: plate for plate, vehicle in vehicles.items()}
+                blocked = [
+                    f"{plates_by_id[payment.vehicle_id]} {periods_by_id[payment.tax_period_id]}"
+                    for payment in existing
+                    if not PaymentService.can_transition(payment.process_status, PaymentProcessStatus.PENDING_PSE)
+                ]
+                if not PaymentService._transition(db, existing, PaymentProcessStatus.PENDING_PSE, **attempt):
+                    # Alguna vigencia ya está pagada o en curso, u otra solicitud la tomó: no se inicia nada
+                    db.rollback()
+                    if not blocked:
+                        raise ValueError("Otra solicitud modificó las vigencias del carrito; intente de nuevo")
+                    raise ValueError(f"Vigencias ya pagadas o con un pago en curso: {', '.join(blocked)}")
+
+                # El monto y el vencimiento del nuevo intento pueden diferir del anterior
+                existing_ids = {(payment.vehicle_id, payment.tax_period_id): payment.id for payment in existing}
+                payments = Payment.__table__
+                db.execute(
+                    update(payments)
+                    .where(payments.c.id == bindparam("b_payment_id"))
+                    .values(amount=bindparam("b_amount"), due_date=bindparam("b_due_date")),
+                    [
+                        {
+                            "b_payment_id": existing_ids[(row["vehicle_id"], row["tax_period_id"])],
+                            "b_amount": row["amount"],
+                            "b_due_date": row["due_date"]
+                        }
+                        for row in conflicts
+                    ]
+                )
+                cart_payments = [*cart_payments, *existing]
+
+            amounts = {(row["vehicle_id"], row["tax_period_id"]): row["amount"] for row in rows}
+            db.execute(insert(PaymentAttempt), [
+                {
+                    "payment_id": payment.id,
+                    "reference": reference_number,
+                    "bank": bank_code,
+                    "amount": amounts[(payment.vehicle_id, payment.tax_period_id)]
+                }
+                for payment in cart_payments
+            ])
+            db.execute(insert(PaymentStatusLog), [
+                {
+                    "payment_id": payment.id,
+                    "status": PaymentProcessStatus.PENDING_PSE,
+                    "details": f"Pago PSE de {len(rows)} vigencias iniciado banco: {bank_code}, email: {email}",
+                    "timestamp": now
+                }
+                for payment in cart_payments
+            ])
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+        return {
+            "transaction_id": reference_number,
+            "amount": round(sum(item["amount"] for item in priced), 2),
+            "status": PaymentProcessStatus.PENDING_PSE.value,
+            "reference_number": reference_number,
+            "items": [
+                {
+                    "plate": item["vehicle"].plate,
+                    "tax_year": item["tax_period"].year,
+                    "base_tax": item["base_tax"],
+                    "traffic_light_fee": item["traffic_light_fee"],
+                    "amount": item["amount"]
+                }
+                for item in priced
+            ]
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_EVENTS_CHANNEL = "payment_status"
+
+
+class PaymentEventBroker:
+    """
+    Pub/sub en proceso de cambios de estado de pagos.
+    publish() puede llamarse desde cualquier hilo (p. ej. endpoints síncronos);
+    los suscriptores esperan en su propio event loop.
+    Solo notifica a los suscriptores del mismo proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, transaction_id: str, status: str) -> None:
+        """Notifica el nuevo estado de una transacción"""
+        self.published += 1
+        self._dispatch(transaction_id, status)
+
+    def _dispatch(self, transaction_id: str, status: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(transaction_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, status)
+                self.delivered += 1
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, transaction_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Suscribe al request actual a los cambios de una transacción mientras dure el contexto"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(transaction_id, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(transaction_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[transaction_id]
+
+    @staticmethod
+    async def next_event(queue: asyncio.Queue, timeout: float) -> Optional[str]:
+        """Espera el siguiente estado publicado; None si se agota el tiempo"""
+        try:
+            return await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = sum(len(queues) for queues in self._subscribers.values())
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "delivered": self.delivered,
+            "subscribers": subscribers
+        }
+
+
+class PostgresPaymentEventBroker(PaymentEventBroker):
+    """
+    Variante para varios procesos: publica con pg_notify y cada proceso escucha el
+    canal con una conexión asyncpg dedicada, repartiendo los eventos a sus suscriptores.
+    """
+
+    def __init__(self, engine, dsn: str):
+        super().__init__()
+        self.engine = engine
+        self.dsn = dsn
+        self._connection = None
+
+    def publish(self, transaction_id: str, status: str) -> None:
+        self.published += 1
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": PAYMENT_EVENTS_CHANNEL, "payload": f"{transaction_id}:{status}"}
+                )
+        except Exception:
+            # El cambio ya está confirmado; los clientes lo verán al reconsultar
+            logger.exception("No se pudo notificar el estado del pago %s", transaction_id)
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        transaction_id, _, status = payload.rpartition(":")
+        self._dispatch(transaction_id, status)
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(PAYMENT_EVENTS_CHANNEL, self._on_notification)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+def _create_broker() -> PaymentEventBroker:
+    if settings.PAYMENT_EVENTS_BACKEND == "postgres":
+        from app.db.session import ASYNC_DATABASE_URL, engine
+
+        dsn = ASYNC_DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return PostgresPaymentEventBroker(engine, dsn)
+    return PaymentEventBroker()
+
+
+payment_events = _create_broker()
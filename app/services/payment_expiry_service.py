@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import PaymentStatusLog
+from app.models.payment import Payment, PaymentStatus, PaymentProcessStatus
+from app.services.payment_events import payment_events
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentExpirySweeper:
+    """
+    Expira los pagos PENDING_PSE abandonados por bloques.
+    Cada bloque se reclama con FOR UPDATE SKIP LOCKED, así varios workers pueden
+    barrer en paralelo sin bloquearse ni expirar dos veces el mismo pago.
+    """
+
+    def __init__(self, max_age_minutes: int, batch_size: int):
+        self.max_age_minutes = max_age_minutes
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+        self.runs = 0
+        self.total_expired = 0
+        self.last_expired = 0
+        self.last_run_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.last_run_at = None
+
+    def _claim_query(self, cutoff: datetime):
+        return (
+            select(Payment.id)
+            .where(
+                Payment.process_status == PaymentProcessStatus.PENDING_PSE,
+                Payment.status == PaymentStatus.PENDING,
+                Payment.payment_date < cutoff
+            )
+            .order_by(Payment.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+    def _expire_batch(self, db: Session, cutoff: datetime, now: datetime) -> int:
+        """Expira un bloque en una transacción; retorna cuántos pagos expiró"""
+        try:
+            expired = db.execute(
+                update(Payment)
+                .where(
+                    Payment.id.in_(self._claim_query(cutoff).scalar_subquery()),
+                    Payment.process_status == PaymentProcessStatus.PENDING_PSE
+                )
+                .values(
+                    status=PaymentStatus.FAILED,
+                    process_status=PaymentProcessStatus.EXPIRED,
+                    process_message="Pago expirado por inactividad",
+                    version=Payment.version + 1
+                )
+                .returning(Payment.id, Payment.pse_transaction_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+
+            if expired:
+                db.execute(insert(PaymentStatusLog), [
+                    {
+                        "payment_id": payment_id,
+                        "status": PaymentProcessStatus.EXPIRED,
+                        "details": f"Pago expirado tras {self.max_age_minutes} minutos sin respuesta de PSE",
+                        "timestamp": now
+                    }
+                    for payment_id, _ in expired
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        # Los pagos de un carrito comparten la referencia: un evento por referencia
+        for transaction_id in {transaction_id for _, transaction_id in expired if transaction_id}:
+            payment_events.publish(transaction_id, PaymentStatus.FAILED.value)
+        return len(expired)
+
+    def run(self, db: Session) -> dict:
+        """Ejecuta un barrido completo y retorna cuántos pagos expiró y cuánto tardó"""
+        start = time.perf_counter()
+        now = datetime.now()
+        cutoff = now - timedelta(minutes=self.max_age_minutes)
+
+        expired = 0
+        while True:
+            batch_expired = self._expire_batch(db, cutoff, now)
+            expired += batch_expired
+            if batch_expired < self.batch_size:
+                break
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.runs += 1
+            self.total_expired += expired
+            self.last_expired = expired
+            self.last_run_seconds = elapsed
+            self.total_run_seconds += elapsed
+            self.last_run_at = now
+
+        if expired:
+            logger.info("Barrido de pagos: %s pagos expirados en %.3f s", expired, elapsed)
+        return {"expired": expired, "duration_ms": round(elapsed * 1000, 3)}
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Ejecuta el barrido periódicamente; pensado para correr como tarea de fondo"""
+        from app.db.session import SessionLocal
+
+        def sweep() -> None:
+            with SessionLocal() as db:
+                self.run(db)
+
+        while True:
+            try:
+                await run_in_threadpool(sweep)
+            except Exception:
+                logger.exception("Error en el barrido de pagos expirados")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> dict:
+        """Métricas del barrido"""
+        return {
+            "runs": self.runs,
+            "total_expired": self.total_expired,
+            "last_expired": self.last_expired,
+            "last_run_ms": round(self.last_run_seconds * 1000, 3),
+            "avg_run_ms": round(self.total_run_seconds / self.runs * 1000, 3) if self.runs else 0.0,
+            "last_run_at": self.last_run_at,
+            "max_age_minutes": self.max_age_minutes,
+            "batch_size": self.batch_size
+        }
+
+
+payment_expiry_sweeper = PaymentExpirySweeper(
+    max_age_minutes=settings.PAYMENT_EXPIRY_MINUTES,
+    batch_size=settings.PAYMENT_EXPIRY_BATCH_SIZE
+)
@@ -1,13 +1,72 @@
 from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.models import PaymentStatusLog, TaxPeriod
+from app.core.id_generator import next_reference
+from app.core.pagination import before_cursor, next_cursor
+from app.models import PaymentAttempt, PaymentStatusLog
 from app.models.payment import Payment, PaymentStatus, PaymentProcessStatus
 from app.models.vehicle import Vehicle, TaxStatus
+from app.services.consult_cache import consult_cache
+from app.services.payment_events import payment_events
+from app.services.pdf_cache import pdf_cache
+from app.services.tax_period_cache import tax_period_cache
+
+# Transiciones permitidas del proceso de pago; COMPLETED es terminal
+PAYMENT_TRANSITIONS: dict[PaymentProcessStatus, frozenset[PaymentProcessStatus]] = {
+    PaymentProcessStatus.INITIATED: frozenset({
+        PaymentProcessStatus.PENDING_PSE,
+        PaymentProcessStatus.FAILED,
+        PaymentProcessStatus.CANCELLED
+    }),
+    PaymentProcessStatus.PENDING_PSE: frozenset({
+        PaymentProcessStatus.PROCESSING,
+        PaymentProcessStatus.COMPLETED,
+        PaymentProcessStatus.FAILED,
+        PaymentProcessStatus.CANCELLED,
+        PaymentProcessStatus.EXPIRED
+    }),
+    PaymentProcessStatus.PROCESSING: frozenset({
+        PaymentProcessStatus.COMPLETED,
+        PaymentProcessStatus.FAILED
+    }),
+    # Un pago fallido, cancelado o expirado puede reintentarse; si el banco aprueba tarde
+    # un pago ya expirado, el dinero fue debitado y el pago se completa igualmente
+    PaymentProcessStatus.FAILED: frozenset({PaymentProcessStatus.PENDING_PSE}),
+    PaymentProcessStatus.CANCELLED: frozenset({PaymentProcessStatus.PENDING_PSE}),
+    PaymentProcessStatus.EXPIRED: frozenset({
+        PaymentProcessStatus.PENDING_PSE,
+        PaymentProcessStatus.COMPLETED
+    }),
+    PaymentProcessStatus.COMPLETED: frozenset()
+}
+
+# INSERT con ON CONFLICT por dialecto; otros motores no tienen un equivalente con conflicto acotado
+CONFLICT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert
+}
 
 
 class PaymentService:
 
+    @staticmethod
+    def _insert_ignoring_period_conflicts(db: Session):
+        """
+        INSERT de pagos que ignora solo el conflicto sobre uq_vehicle_tax_period (vehículo y período).
+        Cualquier otra violación de unicidad, p. ej. una referencia o factura repetida, se propaga.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect not in CONFLICT_INSERTS:
+            raise NotImplementedError(f"INSERT ... ON CONFLICT no soportado para el dialecto {dialect}")
+        return CONFLICT_INSERTS[dialect](Payment).on_conflict_do_nothing(
+            index_elements=[Payment.vehicle_id, Payment.tax_period_id]
+        )
+
     @staticmethod
     def initiate_pse_payment(
             db: Session,
@@ -16,89 +75,76 @@ class PaymentService:
             bank_code: str,
             email: str
     ) -> dict:
-        """Inicia un pago PSE"""
+        """
+        Inicia un pago PSE de forma idempotente.
+        El pago se inserta con ON CONFLICT sobre uq_vehicle_tax_period, de modo que
+        reintentos y solicitudes concurrentes para el mismo vehículo y período
+        obtienen el pago original en lugar de un error de unicidad. Un pago fallido,
+        cancelado o expirado se reintenta con una nueva referencia mediante _transition;
+        cada referencia queda registrada como un PaymentAttempt y sigue siendo resoluble.
+        """
         try:
             # Obtener el período fiscal activo
-            tax_period = db.query(TaxPeriod).filter(TaxPeriod.is_active == True).first()
+            tax_period, _ = tax_period_cache.get(db)
             if not tax_period:
                 raise ValueError("No hay período fiscal activo")
 
-            # Verificar si existe un pago COMPLETADO
-            completed_payment = (
-                db.query(Payment)
-                .filter(
-                    Payment.vehicle_id == vehicle_id,
-                    Payment.tax_period_id == tax_period.id,
-                    Payment.status == PaymentStatus.COMPLETED
-                )
-                .first()
-            )
-
-            if completed_payment:
-                return {
-                    "message": "Ya existe un pago completado para este vehículo en el período actual",
-                    "transaction_id": completed_payment.pse_transaction_id,
-                    "status": PaymentStatus.COMPLETED.value,
-                    "payment_date": completed_payment.paid_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "amount": completed_payment.amount,
-                    "reference_number": completed_payment.bank_reference
-                }
-
-            # Verificar si existe un pago EN CURSO
-            pending_payment = (
-                db.query(Payment)
-                .filter(
-                    Payment.vehicle_id == vehicle_id,
-                    Payment.tax_period_id == tax_period.id,
-                    Payment.status == PaymentStatus.PENDING,
-                    Payment.process_status == PaymentProcessStatus.PENDING_PSE
+            now = datetime.now()
+            reference_number = next_reference("PSE")
+            attempt = {
+                "amount": amount,
+                "payment_method": "PSE",
+                "bank": bank_code,
+                "status": PaymentStatus.PENDING,
+                "process_message": None,
+                "payment_date": now,
+                "due_date": tax_period.due_date,
+                "pse_transaction_id": reference_number,
+                "bank_reference": reference_number
+            }
+            payment_id = db.execute(
+                PaymentService._insert_ignoring_period_conflicts(db)
+                .values(
+                    vehicle_id=vehicle_id,
+                    tax_year=now.year,
+                    tax_period_id=tax_period.id,
+                    process_status=PaymentProcessStatus.PENDING_PSE,
+                    invoice_number=f"INV-{reference_number}",
+                    **attempt
                 )
-                .first()
-            )
-
-            if pending_payment:
-                return {
-                    "message": "Ya existe un pago en curso para este vehículo",
-                    "transaction_id": pending_payment.pse_transaction_id,
-                    "status": pending_payment.process_status.value,
-                    "amount": pending_payment.amount,
-                    "reference_number": pending_payment.bank_reference,
-                }
+                .returning(Payment.id)
+            ).scalar()
 
-            reference_number = f"PSE-{datetime.now().strftime('%Y%m%d%H%M%S')}-{vehicle_id}"
-            payment = Payment(
-                vehicle_id=vehicle_id,
-                amount=amount,
-                tax_year=datetime.now().year,
-                payment_method="PSE",
-                bank=bank_code,
-                process_status=PaymentProcessStatus.PENDING_PSE,
-                status=PaymentStatus.PENDING,
-                payment_date=datetime.now(),
-                due_date=tax_period.due_date,
-                pse_transaction_id=reference_number,
-                invoice_number=f"INV-{reference_number}",
-                bank_reference=reference_number,
-                tax_period_id=tax_period.id
-            )
+            if payment_id is None:
+                # El pago del período ya existe: si la tabla de transiciones lo admite se reintenta
+                existing_payment = db.scalars(
+                    PaymentService._period_payment_query(vehicle_id, tax_period.id)
+                ).one()
+                if not PaymentService._transition(
+                        db, [existing_payment], PaymentProcessStatus.PENDING_PSE, **attempt
+                ):
+                    # Hay un pago completado o en curso, u otra solicitud lo reintentó primero
+                    db.rollback()
+                    existing_payment = db.scalars(
+                        PaymentService._period_payment_query(vehicle_id, tax_period.id)
+                    ).one()
+                    return PaymentService._format_existing_payment(existing_payment)
+                payment_id = existing_payment.id
 
+            db.add(PaymentAttempt(payment_id=payment_id, reference=reference_number, bank=bank_code, amount=amount))
             # Crear registro de estado
-            payment_log = PaymentStatusLog(
-                payment=payment,
+            db.add(PaymentStatusLog(
+                payment_id=payment_id,
                 status=PaymentProcessStatus.PENDING_PSE,
-                details=f"Pago PSE iniciado banco: {bank_code}, email: {email}",
-                timestamp=datetime.now()
-            )
-
-            db.add(payment)
-            db.add(payment_log)
+                details=f"Pago PSE iniciado referencia: {reference_number}, banco: {bank_code}, email: {email}",
+                timestamp=now
+            ))
             db.commit()
-            db.refresh(payment)
 
             return {
                 "transaction_id": reference_number,
                 "amount": amount,
-                "status": payment.process_status.value,
+                "status": PaymentProcessStatus.PENDING_PSE.value,
                 "reference_number": reference_number
             }
 
@@ -106,68 +152,181 @@ class PaymentService:
             db.rollback()
             raise e
 
+    @staticmethod
+    def _period_payment_query(vehicle_id: int, tax_period_id: int):
+        return select(Payment).where(Payment.vehicle_id == vehicle_id, Payment.tax_period_id == tax_period_id)
+
+    @staticmethod
+    def _format_existing_payment(payment: Payment) -> dict:
+        """Respuesta de initiate_pse_payment cuando el pago del período ya existe"""
+        if payment.status == PaymentStatus.COMPLETED:
+            return {
+                "message": "Ya existe un pago completado para este vehículo en el período actual",
+                "transaction_id": payment.pse_transaction_id,
+                "status": PaymentStatus.COMPLETED.value,
+                "payment_date": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "amount": payment.amount,
+                "reference_number": payment.bank_reference
+            }
+
+        if payment.status == PaymentStatus.PENDING:
+            return {
+                "message": "Ya existe un pago en curso para este vehículo",
+                "transaction_id": payment.pse_transaction_id,
+                "status": payment.process_status.value,
+                "amount": payment.amount,
+                "reference_number": payment.bank_reference,
+            }
+
+        raise ValueError("Ya existe un pago fallido para este vehículo en el período actual")
+
+    @staticmethod
+    def can_transition(current: PaymentProcessStatus, target: PaymentProcessStatus) -> bool:
+        """Indica si la tabla de transiciones permite pasar de current a target"""
+        return target in PAYMENT_TRANSITIONS.get(current, frozenset())
+
+    @staticmethod
+    def _transition(
+            db: Session,
+            payments: list[Payment],
+            target: PaymentProcessStatus,
+            **values
+    ) -> bool:
+        """
+        Aplica una transición con compare-and-set sobre la versión de los pagos.
+        Los pagos de una misma referencia PSE (carrito) cambian juntos: retorna False si alguno
+        no admite la transición o fue modificado desde que se leyó; no toma bloqueos previos.
+        Si retorna False el llamador debe hacer rollback.
+        """
+        if not all(PaymentService.can_transition(payment.process_status, target) for payment in payments):
+            return False
+
+        transitioned = db.execute(
+            update(Payment)
+            .where(tuple_(Payment.id, Payment.version).in_(
+                [(payment.id, payment.version) for payment in payments]
+            ))
+            .values(process_status=target, version=Payment.version + 1, **values)
+            .returning(Payment.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        return len(transitioned) == len(payments)
+
+    @staticmethod
+    def _format_completion(payments: list[Payment], message: Optional[str] = None) -> dict:
+        payment = payments[0]
+        response = {
+            "transaction_id": payment.pse_transaction_id,
+            "status": payment.status.value,
+            "payment_date": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S") if payment.paid_at else None,
+            "amount": round(sum(payment.amount for payment in payments), 2),
+            "reference_number": payment.bank_reference
+        }
+        if message:
+            response["message"] = message
+        return response
+
     @staticmethod
     def complete_pse_payment(
             db: Session,
             transaction_id: str,
             status: str = "SUCCESS"
     ) -> dict:
-        """Completa un pago PSE"""
-        payment = db.query(Payment).filter(
-            Payment.pse_transaction_id == transaction_id
-        ).first()
+        """
+        Completa un pago PSE, o todos los pagos de un carrito si comparten la referencia.
+        La referencia se resuelve por PaymentAttempt, así que también se atienden referencias
+        reemplazadas por un reintento: si el banco las aprueba, el dinero fue debitado y sus
+        pagos se completan; si las rechaza, el pago sigue con su intento vigente.
+        La transición se aplica con compare-and-set sobre Payment.version: si el banco
+        reintenta el callback, solo una solicitud aplica el cambio y escribe los logs;
+        las demás responden con el estado vigente sin esperar bloqueos.
+        """
+        payments = db.scalars(PaymentService._payment_by_transaction_query(transaction_id)).all()
 
-        if not payment:
+        if not payments:
             raise ValueError("Transacción no encontrada")
 
         # Verificar si el pago ya fue completado
-        if payment.status == PaymentStatus.COMPLETED:
-            return {
-                "message": "Este pago ya fue completado anteriormente",
-                "transaction_id": transaction_id,
-                "status": payment.status.value,
-                "payment_date": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "amount": payment.amount,
-                "reference_number": payment.bank_reference
-            }
+        if all(payment.status == PaymentStatus.COMPLETED for payment in payments):
+            return PaymentService._format_completion(payments, "Este pago ya fue completado anteriormente")
 
         try:
+            now = datetime.now()
+            pending = [payment for payment in payments if payment.status != PaymentStatus.COMPLETED]
             if status == "SUCCESS":
-                payment.process_status = PaymentProcessStatus.COMPLETED
-                payment.status = PaymentStatus.COMPLETED
-                payment.paid_at = datetime.now()
-
-                # Actualizar estado del vehículo
-                vehicle = db.query(Vehicle).filter(Vehicle.id == payment.vehicle_id).first()
-                vehicle.last_payment_date = datetime.now()
-                vehicle.has_pending_payments = False
-                vehicle.current_tax_status = TaxStatus.UP_TO_DATE
-
-                log_details = "Pago completado exitosamente"
+                # El pago queda con la referencia que el banco cobró
+                targets = pending
+                payment_status = PaymentStatus.COMPLETED
+                applied = PaymentService._transition(
+                    db, targets, PaymentProcessStatus.COMPLETED,
+                    status=payment_status,
+                    paid_at=now,
+                    pse_transaction_id=transaction_id,
+                    bank_reference=transaction_id
+                )
+                log_status = PaymentProcessStatus.COMPLETED
+                log_details = f"Pago completado exitosamente referencia: {transaction_id}"
             else:
-                payment.status = PaymentStatus.FAILED
-                payment.process_status = PaymentProcessStatus.FAILED
+                # Un rechazo solo afecta a los pagos cuyo intento vigente es esta referencia
+                targets = [payment for payment in pending if payment.pse_transaction_id == transaction_id]
+                if not targets:
+                    return PaymentService._format_completion(
+                        payments, "El intento fue reemplazado por otro; el pago no cambia"
+                    )
+                payment_status = PaymentStatus.FAILED
+                applied = PaymentService._transition(
+                    db, targets, PaymentProcessStatus.FAILED,
+                    status=payment_status
+                )
+                log_status = PaymentProcessStatus.FAILED
                 log_details = f"Pago fallido: {status}"
 
-            # Registrar log de completación
-            payment_log = PaymentStatusLog(
-                payment=payment,
-                status=payment.process_status,
-                details=log_details,
-                timestamp=datetime.now()
-            )
+            if not applied:
+                # Otro callback ganó la transición o el estado actual no la permite
+                db.rollback()
+                payments = db.scalars(PaymentService._payment_by_transaction_query(transaction_id)).all()
+                return PaymentService._format_completion(
+                    payments, "El pago ya fue procesado por otra solicitud"
+                )
 
-            db.add(payment_log)
+            vehicle_ids = {payment.vehicle_id for payment in targets}
+            if log_status == PaymentProcessStatus.COMPLETED:
+                # Actualizar estado de los vehículos
+                db.execute(
+                    update(Vehicle)
+                    .where(Vehicle.id.in_(vehicle_ids))
+                    .values(
+                        last_payment_date=now,
+                        has_pending_payments=False,
+                        current_tax_status=TaxStatus.UP_TO_DATE
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            # Registrar logs de completación
+            db.execute(insert(PaymentStatusLog), [
+                {
+                    "payment_id": payment.id,
+                    "status": log_status,
+                    "details": log_details,
+                    "timestamp": now
+                }
+                for payment in targets
+            ])
+            # Quien espera el intento vigente de un pago completado por otra referencia también se entera
+            notified_references = {transaction_id} | {payment.pse_transaction_id for payment in targets}
             db.commit()
-            db.refresh(payment)
+            payments = db.scalars(PaymentService._payment_by_transaction_query(transaction_id)).all()
 
-            return {
-                "transaction_id": transaction_id,
-                "status": payment.status.value,
-                "payment_date": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S") if payment.paid_at else None,
-                "amount": payment.amount,
-                "reference_number": payment.bank_reference
-            }
+            # El estado tributario de los vehículos cambió: descartar sus consultas cacheadas
+            for vehicle_id in vehicle_ids:
+                consult_cache.invalidate_vehicle(vehicle_id=vehicle_id)
+                pdf_cache.invalidate_vehicle(vehicle_id)
+            for reference in notified_references:
+                if reference:
+                    payment_events.publish(reference, payment_status.value)
+
+            return PaymentService._format_completion(payments)
 
         except Exception as e:
             db.rollback()
@@ -179,24 +338,55 @@ class PaymentService:
             transaction_id: str
     ) -> dict:
         """Obtiene el estado actual de un pago"""
-        payment = db.query(Payment).filter(
-            Payment.pse_transaction_id == transaction_id
-        ).first()
+        payments = db.scalars(PaymentService._payment_by_transaction_query(transaction_id)).all()
+        return PaymentService._format_payment_status(payments, transaction_id)
+
+    @staticmethod
+    async def get_payment_status_async(
+            db: AsyncSession,
+            transaction_id: str
+    ) -> dict:
+        """Versión asíncrona de get_payment_status"""
+        payments = (await db.scalars(PaymentService._payment_by_transaction_query(transaction_id))).all()
+        return PaymentService._format_payment_status(payments, transaction_id)
+
+    @staticmethod
+    def _payment_by_transaction_query(transaction_id: str):
+        """
+        Pagos de una referencia PSE: uno, o varios si la transacción es un carrito.
+        Se resuelve por PaymentAttempt para incluir referencias reemplazadas por un reintento, y
+        por la referencia vigente del pago para los pagos iniciados antes de registrar intentos.
+        """
+        return (
+            select(Payment)
+            .where(or_(
+                Payment.id.in_(select(PaymentAttempt.payment_id).where(PaymentAttempt.reference == transaction_id)),
+                Payment.pse_transaction_id == transaction_id
+            ))
+            .order_by(Payment.id)
+        )
 
-        if not payment:
+    @staticmethod
+    def _format_payment_status(payments: list[Payment], transaction_id: str) -> dict:
+        if not payments:
             raise ValueError("Transacción no encontrada")
+        payment = payments[0]
+        # Intento reemplazado por un reintento que aún no termina: esta referencia ya no se cobrará
+        superseded = payment.status != PaymentStatus.COMPLETED and payment.pse_transaction_id != transaction_id
 
         # Construir la respuesta base
         response = {
             "transaction_id": transaction_id,
-            "status": payment.status.value,
-            "amount": payment.amount,
-            "reference_number": payment.bank_reference,
+            "status": PaymentStatus.FAILED.value if superseded else payment.status.value,
+            "amount": round(sum(payment.amount for payment in payments), 2),
+            "reference_number": transaction_id if superseded else payment.bank_reference,
             "payment_date": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S") if payment.paid_at else None
         }
 
         # Agregar mensaje según el estado
-        if payment.status == PaymentStatus.COMPLETED:
+        if superseded:
+            response["message"] = "Intento reemplazado por un nuevo intento de pago"
+        elif payment.status == PaymentStatus.COMPLETED:
             response["message"] = "Pago completado"
         elif payment.status == PaymentStatus.PENDING:
             response["message"] = "Pago en curso"
@@ -205,15 +395,52 @@ class PaymentService:
 
         return response
 
+    @staticmethod
+    def _history_version_query(vehicle_id: int):
+        return select(func.count(Payment.id), func.coalesce(func.sum(Payment.version), 0)).where(
+            Payment.vehicle_id == vehicle_id
+        )
+
+    @staticmethod
+    async def get_history_version_async(db: AsyncSession, vehicle_id: int) -> str:
+        """
+        Versión del historial de pagos de un vehículo: cambia al crear un pago y en cada
+        transición de estado (cada una incrementa Payment.version)
+        """
+        count, versions = (await db.execute(PaymentService._history_version_query(vehicle_id))).one()
+        return f"{count}:{versions}"
+
+    @staticmethod
+    def _payment_history_query(vehicle_id: int, cursor: Optional[str], limit: int):
+        """Página del historial en orden (payment_date, id) descendente, servida por idx_payment_vehicle_date"""
+        query = select(Payment).where(Payment.vehicle_id == vehicle_id)
+        if cursor:
+            query = query.where(before_cursor(Payment.payment_date, Payment.id, cursor))
+        return query.order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(limit)
+
     @staticmethod
     def get_payment_history(
             db: Session,
-            vehicle_id: int
-    ) -> list[Payment]:
-        """Obtiene el historial de pagos de un vehículo"""
-        return (
-            db.query(Payment)
-            .filter(Payment.vehicle_id == vehicle_id)
-            .order_by(Payment.payment_date.desc())
-            .all()
-        )
+            vehicle_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> Tuple[list[Payment], Optional[str]]:
+        """
+        Obtiene una página del historial de pagos de un vehículo (keyset sobre payment_date, id).
+        Returns: (pagos, cursor de la siguiente página o None)
+        """
+        payments = list(db.scalars(PaymentService._payment_history_query(vehicle_id, cursor, limit)).all())
+        return payments, next_cursor(payments, limit)
+
+    @staticmethod
+    async def get_payment_history_async(
+            db: AsyncSession,
+            vehicle_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> Tuple[list[Payment], Optional[str]]:
+        """Versión asíncrona de get_payment_history"""
+        payments = list((await db.scalars(
+            PaymentService._payment_history_query(vehicle_id, cursor, limit)
+        )).all())
+        return payments, next_cursor(payments, limit)
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cambiar al modificar el diseño del PDF para no servir documentos con el formato anterior
+STATEMENT_LAYOUT_VERSION = 1
+
+
+class StatementPDFCache:
+    """
+    Cache en disco de estados de cuenta en PDF, direccionado por contenido.
+    La llave es un hash de los datos con los que se genera el documento (vehículo, impuesto y
+    versión del historial de pagos, además de la fecha del estado de cuenta que el documento
+    imprime): si algo cambia la llave cambia, así que nunca se sirve un PDF obsoleto. El límite es sobre el uso real del directorio, compartido por todos los procesos:
+    el índice en memoria se reconstruye desde el disco cada rescan_seconds y se expulsa por mtime,
+    que cada lectura renueva (LRU entre procesos). Entre dos escaneos el disco puede exceder
+    max_bytes a lo sumo en lo que escriban los demás procesos en ese intervalo.
+    Las entradas además expiran tras ttl_seconds sin usarse.
+    Los archivos se agrupan por vehículo ({dir}/{vehicle_id % 256}/{vehicle_id}-{hash}.pdf) para
+    que invalidar un vehículo también alcance lo que escribieron otros procesos.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            max_bytes: int,
+            ttl_seconds: float,
+            rescan_seconds: float,
+            enabled: bool = True
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.rescan_seconds = rescan_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # ruta -> (tamaño en bytes, último uso), del menos al más recientemente usado
+        self._entries: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+        self._total_bytes = 0
+        self._scanned_at: Optional[float] = None
+        self._scanning = False
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rescans = 0
+
+    @staticmethod
+    def make_key(vehicle_info: dict, tax_info: dict, history_version: str) -> str:
+        """Hash estable de las entradas del estado de cuenta"""
+        payload = json.dumps(
+            [STATEMENT_LAYOUT_VERSION, vehicle_info, tax_info, history_version],
+            sort_keys=True,
+            default=str,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _vehicle_directory(self, vehicle_id: int) -> str:
+        return os.path.join(self.directory, f"{vehicle_id % 256:02x}")
+
+    def _path(self, vehicle_id: int, key: str) -> str:
+        return os.path.join(self._vehicle_directory(vehicle_id), f"{vehicle_id}-{key}.pdf")
+
+    def _scan(self) -> list[Tuple[float, str, int]]:
+        """Lista (mtime, ruta, tamaño) de los PDFs en disco, incluidos los escritos por otros procesos"""
+        found = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            shards = []
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+        return found
+
+    def _refresh(self) -> None:
+        """
+        Reconstruye el índice desde el disco si pasó rescan_seconds. El recorrido se hace sin el lock,
+        así que get() y set() de otros hilos no lo esperan; un solo hilo escanea a la vez y lo que este
+        proceso usó durante el recorrido se conserva al reemplazar el índice
+        """
+        with self._lock:
+            if self._scanning or (
+                    self._scanned_at is not None and time.monotonic() - self._scanned_at < self.rescan_seconds
+            ):
+                return
+            self._scanning = True
+            self._scanned_at = time.monotonic()
+        started_at = time.time()
+        try:
+            found = self._scan()
+        except OSError:
+            logger.exception("No se pudo recorrer el cache de PDFs")
+            with self._lock:
+                self._scanning = False
+            return
+
+        with self._lock:
+            recent = [(path, entry) for path, entry in self._entries.items() if entry[1] >= started_at]
+            self._entries.clear()
+            self._total_bytes = 0
+            for used_at, path, size in sorted(found):
+                self._entries[path] = (size, used_at)
+                self._total_bytes += size
+            for path, entry in recent:
+                self._forget(path)
+                self._entries[path] = entry
+                self._total_bytes += entry[0]
+            self.rescans += 1
+            self._scanning = False
+
+    def get(self, vehicle_id: int, key: str) -> Optional[bytes]:
+        """Retorna el PDF cacheado o None si no existe o expiró; lo escrito por otros procesos también cuenta"""
+        if not self.enabled:
+            return None
+
+        path = self._path(vehicle_id, key)
+        try:
+            used_at = os.stat(path).st_mtime
+            if time.time() - used_at >= self.ttl_seconds:
+                with self._lock:
+                    self._remove(path)
+                    self.expirations += 1
+                    self.misses += 1
+                return None
+            with open(path, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            # No existe, u otro proceso lo expulsó o invalidó
+            with self._lock:
+                self._forget(path)
+                self.misses += 1
+            return None
+
+        try:
+            # Renovar el mtime hace visible el uso a la expulsión de los demás procesos
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = (len(content), time.time())
+            self._total_bytes += len(content)
+            self.hits += 1
+        return content
+
+    def set(self, vehicle_id: int, key: str, content: bytes) -> None:
+        """Guarda el PDF; la escritura es atómica para que un lector nunca vea un archivo a medias"""
+        if not self.enabled:
+            return
+
+        path = self._path(vehicle_id, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(content)
+            os.replace(temporary_path, path)
+        except OSError:
+            # El cache es opcional: un disco lleno o sin permisos no debe romper la descarga
+            logger.exception("No se pudo guardar el PDF en cache")
+            return
+
+        self._refresh()
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = (len(content), time.time())
+            self._total_bytes += len(content)
+            self.writes += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest_path = next(iter(self._entries))
+            self._remove(oldest_path)
+            self.evictions += 1
+
+    def _forget(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._total_bytes -= entry[0]
+
+    def _remove(self, path: str) -> None:
+        self._forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def invalidate_vehicle(self, vehicle_id: int) -> None:
+        """Descarta los PDFs de un vehículo, incluidos los escritos por otros procesos"""
+        if not self.enabled:
+            return
+
+        directory = self._vehicle_directory(vehicle_id)
+        prefix = f"{vehicle_id}-"
+        with self._lock:
+            try:
+                entries = [entry.path for entry in os.scandir(directory) if entry.name.startswith(prefix)]
+            except FileNotFoundError:
+                return
+            for path in entries:
+                self._remove(path)
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "rescans": self.rescans,
+            "rescan_seconds": self.rescan_seconds,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+pdf_cache = StatementPDFCache(
+    directory=settings.PDF_CACHE_DIR,
+    max_bytes=settings.PDF_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.PDF_CACHE_TTL_SECONDS,
+    rescan_seconds=settings.PDF_CACHE_RESCAN_SECONDS,
+    enabled=settings.PDF_CACHE_ENABLED
+)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services.pdf_service import PDFService
+
+logger = logging.getLogger(__name__)
+
+
+class PDFRenderBusy(Exception):
+    """La cola de generación de PDFs está llena"""
+
+
+class PDFRenderPool:
+    """
+    Genera PDFs en un ProcessPoolExecutor para no ocupar el event loop ni los hilos de la API.
+    A lo sumo max_pending solicitudes esperan o se procesan a la vez; las siguientes esperan
+    un cupo hasta queue_timeout_seconds y luego se rechazan con PDFRenderBusy.
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout_seconds: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.rendered = 0
+        self.rejected = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.total_render_seconds = 0.0
+        self.total_queue_wait_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: los workers no heredan hilos ni conexiones del proceso de la API
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _acquire_slot(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PDFRenderBusy("El servicio de generación de PDFs está ocupado, intente más tarde")
+        self.total_queue_wait_seconds += time.perf_counter() - start
+
+    async def render_account_statement(self, vehicle_info: Dict, tax_info: Dict) -> bytes:
+        """Genera el estado de cuenta en un proceso del pool y retorna su contenido"""
+        await self._acquire_slot()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), PDFService.render_account_statement, vehicle_info, tax_info
+            )
+        except BrokenProcessPool:
+            # Un worker murió: se descarta el pool y el siguiente request crea uno nuevo
+            self.failures += 1
+            logger.exception("El pool de generación de PDFs se rompió; se recreará")
+            self._reset_executor()
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self.rendered += 1
+        self.total_render_seconds += time.perf_counter() - start
+        return content
+
+    def _reset_executor(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+    def stats(self) -> dict:
+        """Métricas del pool"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "avg_render_ms": round(self.total_render_seconds / self.rendered * 1000, 3) if self.rendered else 0.0,
+            "avg_queue_wait_ms": round(self.total_queue_wait_seconds / self.rendered * 1000, 3)
+            if self.rendered else 0.0
+        }
+
+
+pdf_render_pool = PDFRenderPool(
+    workers=settings.PDF_RENDER_WORKERS,
+    max_pending=settings.PDF_RENDER_MAX_PENDING,
+    queue_timeout_seconds=settings.PDF_RENDER_QUEUE_TIMEOUT_SECONDS
+)
@@ -1,93 +1,132 @@
-from datetime import datetime
+import copy
+from functools import lru_cache
 from fpdf import FPDF
 from typing import Dict
 import os
 
 
-class PDFService:
-    @staticmethod
-    def generate_account_statement(
-            vehicle_info: Dict,
-            tax_info: Dict,
-            filename: str = None
-    ) -> str:
-        """
-        Genera el PDF del estado de cuenta
-        Returns: path del archivo generado
-        """
+LOGO_PATH = os.path.join("app", "static", "logo.png")
+FONT_FAMILY = "Arial"
+LINE_HEIGHT = 10
+TABLE_COL_WIDTH = 47
+
+
+class AccountStatementTemplate:
+    """
+    Plantilla del estado de cuenta.
+    Al construirla se decodifica el logo y se diagrama la parte fija de la página (encabezado,
+    títulos, etiquetas y bordes de la tabla), guardando la posición de cada campo variable.
+    Cada estado de cuenta parte de una copia de esa página y solo escribe los campos variables.
+    La página base no se modifica después de construida, así que puede compartirse entre hilos.
+    """
+
+    def __init__(self, logo_path: str = LOGO_PATH):
+        self._fields: Dict[str, Dict] = {}
+
         pdf = FPDF()
         pdf.add_page()
 
         # Configuración de la página
         pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_font("Arial", size=12)
+        pdf.set_font(FONT_FAMILY, size=12)
 
         # Encabezado
-        pdf.image("app/static/logo.png", x=10, y=10, w=60)  # Ajusta la ruta y dimensiones
-        pdf.cell(0, 10, "GOBERNACIÓN DEL VALLE", align="C", ln=True)
-        pdf.cell(0, 10, "ESTADO DE CUENTA - VEHÍCULO " + vehicle_info["plate"], align="C", ln=True)
+        pdf.image(logo_path, x=10, y=10, w=60)
+        pdf.cell(0, LINE_HEIGHT, "GOBERNACIÓN DEL VALLE", align="C", ln=True)
+        self._add_field(pdf, "title", 0, align="C", ln=True)
 
         # Información General
         pdf.ln(10)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "INFORMACIÓN GENERAL", ln=True)
-        pdf.set_font("Arial", "", 12)
-
-        info = [
-            ["Placa", vehicle_info["plate"]],
-            ["Marca", vehicle_info["brand"]],
-            ["Modelo", vehicle_info["model"]],
-            ["Año", str(vehicle_info["year"])]
-        ]
-
-        for item in info:
-            pdf.cell(50, 10, item[0] + ":", ln=0)
-            pdf.cell(0, 10, item[1], ln=True)
+        pdf.set_font(FONT_FAMILY, "B", 12)
+        pdf.cell(0, LINE_HEIGHT, "INFORMACIÓN GENERAL", ln=True)
+        pdf.set_font(FONT_FAMILY, "", 12)
+        for name, label in (("plate", "Placa"), ("brand", "Marca"), ("model", "Modelo"), ("year", "Año")):
+            pdf.cell(50, LINE_HEIGHT, label + ":", ln=0)
+            self._add_field(pdf, name, 0, ln=True)
 
         # Información de Pagos
         pdf.ln(10)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "PAGOS", ln=True)
-        pdf.set_font("Arial", "", 12)
-
-        headers = ["Vigencia", "Monto", "Estado", "Fecha Límite"]
-        col_width = 47
-
-        # Encabezados de la tabla
-        for header in headers:
-            pdf.cell(col_width, 10, header, 1, 0, "C")
+        pdf.set_font(FONT_FAMILY, "B", 12)
+        pdf.cell(0, LINE_HEIGHT, "PAGOS", ln=True)
+        pdf.set_font(FONT_FAMILY, "", 12)
+        for header in ("Vigencia", "Monto", "Estado", "Fecha Límite"):
+            pdf.cell(TABLE_COL_WIDTH, LINE_HEIGHT, header, 1, 0, "C")
         pdf.ln()
-
-        # Datos de pagos
-        payment_data = [
-            tax_info["tax_year"],
-            f"${tax_info['total_amount']:,.2f}",
-            tax_info["tax_status"],
-            tax_info["due_date"].strftime("%d/%m/%Y")
-        ]
-
-        for item in payment_data:
-            pdf.cell(col_width, 10, str(item), 1, 0, "C")
+        # Los bordes de la fila de datos son fijos; el texto se escribe por estado de cuenta
+        for name in ("tax_year", "total_amount", "tax_status", "due_date"):
+            pdf.cell(TABLE_COL_WIDTH, LINE_HEIGHT, "", 1, 0, "C")
+            pdf.set_x(pdf.get_x() - TABLE_COL_WIDTH)
+            self._add_field(pdf, name, TABLE_COL_WIDTH, align="C")
         pdf.ln()
 
-        # Fecha de generación
+        # Fecha del estado de cuenta
         pdf.ln(10)
-        pdf.set_font("Arial", "I", 10)
-        pdf.cell(0, 10, f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True)
-
-        # Generar nombre de archivo si no se proporciona
-        if not filename:
-            filename = f"estado_cuenta_{vehicle_info['plate']}_{datetime.now().strftime('%Y%m%d%H%M')}.pdf"
+        self._add_field(pdf, "statement_date", 0, style="I", size=10, ln=True)
+
+        self._page = pdf
+
+    def _add_field(self, pdf: FPDF, name: str, width: float, align: str = "", style: str = "",
+                   size: int = 12, ln: bool = False) -> None:
+        """Registra la posición de un campo variable y avanza el cursor como lo haría la celda"""
+        self._fields[name] = {
+            "x": pdf.get_x(), "y": pdf.get_y(), "w": width, "align": align, "style": style, "size": size
+        }
+        if ln:
+            pdf.ln(LINE_HEIGHT)
+        else:
+            pdf.set_x(pdf.get_x() + width)
+
+    def _new_document(self) -> FPDF:
+        """Copia de la página base; output() modifica estos contenedores, así que cada documento lleva los suyos"""
+        pdf = copy.copy(self._page)
+        pdf.pages = dict(self._page.pages)
+        pdf.offsets = {}
+        pdf.fonts = {key: dict(font) for key, font in self._page.fonts.items()}
+        pdf.current_font = pdf.fonts[pdf.font_family + pdf.font_style]
+        # El logo ya decodificado se comparte; solo se copia el diccionario que output() modifica
+        pdf.images = {name: dict(info) for name, info in self._page.images.items()}
+        return pdf
+
+    def render(self, vehicle_info: Dict, tax_info: Dict) -> bytes:
+        """Escribe los campos variables sobre una copia de la página base. Returns: contenido del PDF"""
+        values = {
+            "title": "ESTADO DE CUENTA - VEHÍCULO " + vehicle_info["plate"],
+            "plate": vehicle_info["plate"],
+            "brand": vehicle_info["brand"],
+            "model": vehicle_info["model"],
+            "year": str(vehicle_info["year"]),
+            "tax_year": str(tax_info["tax_year"]),
+            "total_amount": f"${tax_info['total_amount']:,.2f}",
+            "tax_status": str(tax_info["tax_status"]),
+            "due_date": tax_info["due_date"].strftime("%d/%m/%Y"),
+            "statement_date": f"Generado el: {tax_info['statement_date'].strftime('%d/%m/%Y')}"
+        }
+
+        pdf = self._new_document()
+        for name, field in self._fields.items():
+            pdf.set_font(FONT_FAMILY, field["style"], field["size"])
+            pdf.set_xy(field["x"], field["y"])
+            pdf.cell(field["w"], LINE_HEIGHT, values[name], 0, 0, field["align"])
+
+        # FPDF 1.7 retorna el documento como str latin-1
+        return pdf.output(dest="S").encode("latin-1")
+
+
+@lru_cache()
+def get_statement_template() -> AccountStatementTemplate:
+    """Plantilla del proceso actual; se construye en el primer uso (en cada worker del pool)"""
+    return AccountStatementTemplate()
 
-        # Crear directorio para PDFs si no existe
-        os_path = os.path.join("app", "static", "pdfs")
-        if not os.path.exists(os_path):
-            os.makedirs(os_path)
 
-        filepath = os.path.join(os_path, filename)
-        pdf.output(filepath)
-
-        return filepath
+class PDFService:
+    @staticmethod
+    def render_account_statement(vehicle_info: Dict, tax_info: Dict) -> bytes:
+        """
+        Genera el PDF del estado de cuenta en memoria a partir de la plantilla del proceso.
+        No depende de estado compartido entre procesos, así que puede ejecutarse en un ProcessPoolExecutor.
+        Returns: contenido del PDF
+        """
+        return get_statement_template().render(vehicle_info, tax_info)
 
     # from datetime import datetime
     # from typing import Dict, List
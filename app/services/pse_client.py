@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PSEGatewayError(Exception):
+    """La pasarela PSE no respondió correctamente tras los reintentos"""
+
+
+class PSEClient:
+    """
+    Cliente de la pasarela PSE sobre un httpx.AsyncClient compartido.
+    Reutiliza conexiones (keep-alive), limita las llamadas concurrentes y reintenta
+    errores transitorios con backoff exponencial y jitter.
+    """
+
+    def __init__(
+            self,
+            base_url: Optional[str],
+            api_key: Optional[str] = None,
+            timeout_seconds: float = 10.0,
+            connect_timeout_seconds: float = 3.0,
+            max_connections: int = 100,
+            max_concurrency: int = 50,
+            max_retries: int = 3,
+            retry_backoff_seconds: float = 0.2
+    ):
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.base_url is not None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers=headers
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: evita que los reintentos de muchos clientes lleguen sincronizados
+        return random.uniform(0, self.retry_backoff_seconds * (2 ** attempt))
+
+    async def _request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> dict:
+        if not self.enabled:
+            raise PSEGatewayError("La pasarela PSE no está configurada")
+
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=self.timeout.connect)
+
+        client = self._get_client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    response = await client.request(method, path, **kwargs)
+            except httpx.TransportError as error:
+                last_error = error
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                last_error = PSEGatewayError(f"PSE respondió {response.status_code}")
+                continue
+            if response.status_code >= 400:
+                self.failures += 1
+                raise PSEGatewayError(f"PSE rechazó la solicitud ({response.status_code}): {response.text}")
+            return response.json()
+
+        self.failures += 1
+        logger.warning("PSE %s %s falló tras %s intentos: %s", method, path, self.max_retries + 1, last_error)
+        raise PSEGatewayError("No fue posible comunicarse con PSE") from last_error
+
+    async def get_banks(self) -> list[dict]:
+        """Lista de bancos disponibles en PSE"""
+        return await self._request("GET", "/banks")
+
+    async def create_transaction(
+            self,
+            reference: str,
+            amount: float,
+            bank_code: str,
+            email: str,
+            callback_url: Optional[str] = None
+    ) -> dict:
+        """
+        Registra la transacción en PSE y retorna la URL de redirección al banco.
+        La referencia viaja como llave de idempotencia, así los reintentos no duplican la transacción.
+        """
+        return await self._request(
+            "POST",
+            "/transactions",
+            json={
+                "reference": reference,
+                "amount": amount,
+                "bank_code": bank_code,
+                "email": email,
+                "callback_url": callback_url
+            },
+            headers={"Idempotency-Key": reference}
+        )
+
+    async def get_transaction(self, reference: str) -> dict:
+        """Estado de la transacción en PSE"""
+        return await self._request("GET", f"/transactions/{reference}")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        """Métricas del cliente"""
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures
+        }
+
+
+pse_client = PSEClient(
+    base_url=settings.PSE_GATEWAY_URL,
+    api_key=settings.PSE_API_KEY,
+    timeout_seconds=settings.PSE_TIMEOUT_SECONDS,
+    connect_timeout_seconds=settings.PSE_CONNECT_TIMEOUT_SECONDS,
+    max_connections=settings.PSE_MAX_CONNECTIONS,
+    max_concurrency=settings.PSE_MAX_CONCURRENCY,
+    max_retries=settings.PSE_MAX_RETRIES,
+    retry_backoff_seconds=settings.PSE_RETRY_BACKOFF_SECONDS
+)
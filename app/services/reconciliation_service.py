@@ -0,0 +1,260 @@
+import csv
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+from typing import Iterator, Optional, TextIO
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import PaymentAttempt, PaymentStatusLog
+from app.models.payment import Payment, PaymentStatus, PaymentProcessStatus
+from app.models.vehicle import Vehicle, TaxStatus
+from app.services.consult_cache import consult_cache
+from app.services.payment_events import payment_events
+from app.services.payment_service import PaymentService
+from app.services.pdf_cache import pdf_cache
+
+SUCCESS_STATUSES = {"SUCCESS", "APPROVED", "OK"}
+MAX_UNMATCHED_SAMPLE = 100
+
+
+class ReconciliationService:
+    """
+    Conciliación de archivos de liquidación PSE.
+    El archivo se lee por bloques; cada bloque se cruza con los pagos en memoria (hash join)
+    y se aplica con actualizaciones e inserciones masivas en una sola transacción.
+    Columnas esperadas: transaction_id, bank_reference, status y opcionalmente paid_at (ISO 8601).
+    """
+
+    @staticmethod
+    def _iter_chunks(rows: Iterator[dict], chunk_size: int) -> Iterator[list[dict]]:
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+
+    @staticmethod
+    def _row_key(row: dict) -> Optional[str]:
+        return (row.get("transaction_id") or "").strip() or (row.get("bank_reference") or "").strip() or None
+
+    @staticmethod
+    def _parse_paid_at(value: Optional[str], default: datetime) -> datetime:
+        if not value:
+            return default
+        try:
+            return datetime.fromisoformat(value.strip())
+        except ValueError:
+            return default
+
+    @staticmethod
+    def _matching_payments_query(references: list[str]):
+        """Pagos de las referencias del bloque, incluidas las reemplazadas por un reintento"""
+        return (
+            select(
+                Payment.id,
+                Payment.vehicle_id,
+                Payment.process_status,
+                Payment.pse_transaction_id,
+                PaymentAttempt.reference
+            )
+            .join(PaymentAttempt, PaymentAttempt.payment_id == Payment.id)
+            .where(PaymentAttempt.reference.in_(references))
+            .with_for_update(of=Payment)
+        )
+
+    @staticmethod
+    def _current_reference_query(references: list[str]):
+        """Pagos cuya referencia vigente está en el bloque, aunque no tengan PaymentAttempt (pagos previos)"""
+        return (
+            select(
+                Payment.id,
+                Payment.vehicle_id,
+                Payment.process_status,
+                Payment.pse_transaction_id,
+                Payment.pse_transaction_id.label("reference")
+            )
+            .where(Payment.pse_transaction_id.in_(references))
+            .with_for_update(of=Payment)
+        )
+
+    @staticmethod
+    def _payment_update(status: PaymentStatus, process_status: PaymentProcessStatus):
+        """UPDATE por id (executemany) que incrementa la versión del pago"""
+        payments = Payment.__table__
+        return (
+            update(payments)
+            .where(payments.c.id == bindparam("payment_id"))
+            .values(status=status, process_status=process_status, version=payments.c.version + 1)
+        )
+
+    @staticmethod
+    def reconcile_file(db: Session, file: TextIO, chunk_size: int = 5000) -> dict:
+        """
+        Concilia un archivo CSV de liquidación PSE.
+        Returns: resumen con filas leídas, pagos completados, fallidos, ya completados,
+        no encontrados, duplicados y cobrados por el banco que no pueden completarse
+        """
+        report = {
+            "rows": 0,
+            "completed": 0,
+            "failed": 0,
+            "already_processed": 0,
+            "unmatched": 0,
+            "duplicates": 0,
+            "invalid": 0,
+            "settled_not_completed": 0,
+            "unmatched_sample": [],
+            "settled_not_completed_sample": []
+        }
+        seen_keys = set()
+        # Pagos ya cruzados en el archivo, para detectar liquidaciones repetidas entre bloques
+        processed_payment_ids = set()
+
+        reader = csv.DictReader(file)
+        for chunk in ReconciliationService._iter_chunks(iter(reader), chunk_size):
+            report["rows"] += len(chunk)
+
+            # Descartar filas sin identificador y duplicadas dentro del archivo
+            rows = []
+            for row in chunk:
+                key = ReconciliationService._row_key(row)
+                if key is None:
+                    report["invalid"] += 1
+                elif key in seen_keys:
+                    report["duplicates"] += 1
+                else:
+                    seen_keys.add(key)
+                    rows.append(row)
+            if rows:
+                ReconciliationService._apply_chunk(db, rows, report, processed_payment_ids)
+
+        return report
+
+    @staticmethod
+    def _apply_chunk(db: Session, rows: list[dict], report: dict, processed_payment_ids: set[int]) -> None:
+        """Cruza un bloque con los pagos y aplica los cambios con sentencias masivas"""
+        transaction_ids = [row["transaction_id"].strip() for row in rows if (row.get("transaction_id") or "").strip()]
+        bank_references = [row["bank_reference"].strip() for row in rows if (row.get("bank_reference") or "").strip()]
+
+        try:
+            references = list({*transaction_ids, *bank_references})
+            payments = [
+                *db.execute(ReconciliationService._matching_payments_query(references)),
+                *db.execute(ReconciliationService._current_reference_query(references))
+            ]
+            # Una referencia puede agrupar varios pagos (carrito de vigencias); un pago con intento
+            # registrado aparece en ambas consultas y se cuenta una vez
+            by_reference = defaultdict(list)
+            matched_pairs = set()
+            for payment in payments:
+                if (payment.id, payment.reference) not in matched_pairs:
+                    matched_pairs.add((payment.id, payment.reference))
+                    by_reference[payment.reference].append(payment)
+
+            now = datetime.now()
+            completed_updates = []
+            failed_updates = []
+            status_logs = []
+            paid_vehicle_ids = set()
+            status_events = {}
+
+            for row in rows:
+                matched = by_reference.get((row.get("transaction_id") or "").strip()) or \
+                    by_reference.get((row.get("bank_reference") or "").strip())
+                if not matched:
+                    report["unmatched"] += 1
+                    if len(report["unmatched_sample"]) < MAX_UNMATCHED_SAMPLE:
+                        report["unmatched_sample"].append(ReconciliationService._row_key(row))
+                    continue
+
+                # La misma liquidación puede llegar por transaction_id en una fila y por bank_reference en otra
+                if all(payment.id in processed_payment_ids for payment in matched):
+                    report["duplicates"] += 1
+                    continue
+
+                bank_status = (row.get("status") or "").strip().upper()
+                for payment in matched:
+                    if payment.id in processed_payment_ids:
+                        continue
+                    processed_payment_ids.add(payment.id)
+
+                    if bank_status in SUCCESS_STATUSES:
+                        # El banco cobró la referencia: aplica aunque el pago haya expirado o se haya reintentado
+                        if payment.process_status == PaymentProcessStatus.COMPLETED:
+                            report["already_processed"] += 1
+                            continue
+                        if not PaymentService.can_transition(payment.process_status, PaymentProcessStatus.COMPLETED):
+                            # Cobrado por el banco pero fallido o cancelado localmente: requiere revisión manual
+                            report["settled_not_completed"] += 1
+                            if len(report["settled_not_completed_sample"]) < MAX_UNMATCHED_SAMPLE:
+                                report["settled_not_completed_sample"].append(payment.reference)
+                            continue
+                        completed_updates.append({
+                            "payment_id": payment.id,
+                            "settled_at": ReconciliationService._parse_paid_at(row.get("paid_at"), now),
+                            "settled_reference": payment.reference
+                        })
+                        status_logs.append({
+                            "payment_id": payment.id,
+                            "status": PaymentProcessStatus.COMPLETED,
+                            "details": f"Pago completado por conciliación bancaria referencia: {payment.reference}",
+                            "timestamp": now
+                        })
+                        paid_vehicle_ids.add(payment.vehicle_id)
+                        status_events[payment.reference] = PaymentStatus.COMPLETED.value
+                        status_events[payment.pse_transaction_id] = PaymentStatus.COMPLETED.value
+                        report["completed"] += 1
+                    else:
+                        # Un rechazo solo afecta a los pagos cuyo intento vigente es esta referencia
+                        if payment.pse_transaction_id != payment.reference or \
+                                not PaymentService.can_transition(payment.process_status, PaymentProcessStatus.FAILED):
+                            report["already_processed"] += 1
+                            continue
+                        failed_updates.append({"payment_id": payment.id})
+                        status_logs.append({
+                            "payment_id": payment.id,
+                            "status": PaymentProcessStatus.FAILED,
+                            "details": f"Pago fallido por conciliación bancaria: {bank_status or 'SIN ESTADO'}",
+                            "timestamp": now
+                        })
+                        status_events[payment.reference] = PaymentStatus.FAILED.value
+                        report["failed"] += 1
+
+            if completed_updates:
+                db.execute(
+                    ReconciliationService._payment_update(
+                        PaymentStatus.COMPLETED, PaymentProcessStatus.COMPLETED
+                    ).values(
+                        paid_at=bindparam("settled_at"),
+                        pse_transaction_id=bindparam("settled_reference"),
+                        bank_reference=bindparam("settled_reference")
+                    ),
+                    completed_updates
+                )
+            if failed_updates:
+                db.execute(
+                    ReconciliationService._payment_update(PaymentStatus.FAILED, PaymentProcessStatus.FAILED),
+                    failed_updates
+                )
+            if status_logs:
+                db.execute(insert(PaymentStatusLog), status_logs)
+            if paid_vehicle_ids:
+                db.execute(
+                    update(Vehicle)
+                    .where(Vehicle.id.in_(paid_vehicle_ids))
+                    .values(
+                        last_payment_date=now,
+                        has_pending_payments=False,
+                        current_tax_status=TaxStatus.UP_TO_DATE
+                    )
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for vehicle_id in paid_vehicle_ids:
+            consult_cache.invalidate_vehicle(vehicle_id=vehicle_id)
+            pdf_cache.invalidate_vehicle(vehicle_id)
+        for transaction_id, status in status_events.items():
+            if transaction_id:
+                payment_events.publish(transaction_id, status)
@@ -0,0 +1,400 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import User
+from app.models.tax_period import TaxPeriod
+from app.models.vehicle import Vehicle, VehicleType
+from app.services.batch_tax_service import BatchTaxService
+from app.services.pdf_service import PDFService
+from app.services.tax_service import TaxRateIndex
+
+logger = logging.getLogger(__name__)
+
+# Un bloque renderizado: (id del último vehículo del bloque, [(nombre del archivo, contenido)])
+RenderedChunk = tuple[int, list[tuple[str, bytes]]]
+
+
+class _ZipStream:
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que el generador lo entrega"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class StatementBatchService:
+    """
+    Generación masiva de estados de cuenta en PDF empaquetados en ZIP.
+    Los vehículos se leen por bloques (keyset sobre el id), el impuesto se calcula en lote,
+    cada bloque se renderiza en un proceso del pool y los PDFs se escriben directo en el ZIP,
+    sin archivos intermedios. La memoria depende del tamaño de bloque y de los workers.
+    """
+
+    @staticmethod
+    def _statement_query(vehicle_type: Optional[VehicleType] = None, city: Optional[str] = None):
+        """Proyección por columnas con lo necesario para el estado de cuenta"""
+        query = (
+            select(
+                Vehicle.id,
+                Vehicle.plate,
+                Vehicle.brand,
+                Vehicle.model,
+                Vehicle.year,
+                Vehicle.vehicle_type,
+                Vehicle.commercial_value,
+                Vehicle.is_electric,
+                Vehicle.is_hybrid,
+                Vehicle.is_new,
+                Vehicle.registration_date,
+                Vehicle.current_tax_status
+            )
+            .join(User, Vehicle.owner_id == User.id)
+        )
+        # Filtros de igualdad sobre (vehicle_type, city) para aprovechar idx_vehicle_type_city
+        if vehicle_type is not None:
+            query = query.where(Vehicle.vehicle_type == vehicle_type)
+        if city is not None:
+            query = query.where(Vehicle.city == city)
+        return query
+
+    @staticmethod
+    def iter_statement_chunks(
+            db: Session,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex,
+            vehicle_type: Optional[VehicleType] = None,
+            city: Optional[str] = None,
+            after_id: Optional[int] = None,
+            chunk_size: int = 500
+    ) -> Iterator[tuple[int, list[tuple[dict, dict]]]]:
+        """
+        Recorre los vehículos por bloques desde after_id.
+        Cada bloque es una consulta corta, de modo que el recorrido puede retomarse desde
+        el último id procesado. Returns: (id del último vehículo, [(vehicle_info, tax_info)])
+        """
+        query = StatementBatchService._statement_query(vehicle_type, city).order_by(Vehicle.id).limit(chunk_size)
+        statement_date = date.today()
+        while True:
+            page_query = query if after_id is None else query.where(Vehicle.id > after_id)
+            rows = db.execute(page_query).all()
+            if not rows:
+                return
+
+            total_amounts = BatchTaxService.calculate_vehicles_tax(rows, tax_period, tax_rates)["total_amount"].tolist()
+            statements = [
+                (
+                    {"plate": row.plate, "brand": row.brand, "model": row.model, "year": row.year},
+                    {
+                        "tax_year": tax_period.year,
+                        "total_amount": total_amounts[position],
+                        "tax_status": row.current_tax_status.value,
+                        "due_date": tax_period.due_date,
+                        "statement_date": statement_date
+                    }
+                )
+                for position, row in enumerate(rows)
+            ]
+            after_id = rows[-1].id
+            yield after_id, statements
+
+            if len(rows) < chunk_size:
+                return
+
+    @staticmethod
+    def render_chunk(statements: list[tuple[dict, dict]]) -> list[tuple[str, bytes]]:
+        """Renderiza un bloque completo; se ejecuta en un proceso del pool"""
+        return [
+            (f"estado_cuenta_{vehicle_info['plate']}.pdf",
+             PDFService.render_account_statement(vehicle_info, tax_info))
+            for vehicle_info, tax_info in statements
+        ]
+
+    @staticmethod
+    def render_chunks(
+            chunks: Iterator[tuple[int, list[tuple[dict, dict]]]],
+            workers: Optional[int] = None
+    ) -> Iterator[RenderedChunk]:
+        """Renderiza los bloques en un pool propio de workers procesos (por defecto uno por CPU)"""
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            yield from StatementBatchService.render_chunks_with(executor, workers, chunks)
+
+    @staticmethod
+    def render_chunks_with(
+            executor: ProcessPoolExecutor,
+            workers: int,
+            chunks: Iterator[tuple[int, list[tuple[dict, dict]]]]
+    ) -> Iterator[RenderedChunk]:
+        """
+        Renderiza los bloques en paralelo en executor conservando el orden.
+        Solo hay 2 bloques por worker en vuelo, así la lectura de la base de datos no se
+        adelanta a la generación y la memoria queda acotada.
+        """
+        pending = deque()
+        try:
+            for last_id, statements in chunks:
+                pending.append((last_id, executor.submit(StatementBatchService.render_chunk, statements)))
+                if len(pending) >= workers * 2:
+                    last_id, future = pending.popleft()
+                    yield last_id, future.result()
+            while pending:
+                last_id, future = pending.popleft()
+                yield last_id, future.result()
+        finally:
+            # Si el consumidor abandona (p. ej. el cliente cortó la descarga) no se sigue renderizando
+            for _, future in pending:
+                future.cancel()
+
+    @staticmethod
+    def stream_zip(rendered_chunks: Iterator[RenderedChunk]) -> Iterator[bytes]:
+        """
+        Escribe los PDFs en un ZIP y entrega los bytes a medida que se producen.
+        Los PDFs ya vienen comprimidos, por eso se almacenan sin volver a comprimir.
+        """
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            for _, files in rendered_chunks:
+                for filename, content in files:
+                    archive.writestr(filename, content)
+                yield stream.drain()
+        yield stream.drain()
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: str, filters: dict) -> dict:
+        if not os.path.exists(checkpoint_path):
+            return {"filters": filters, "after_id": None, "parts": 0, "statements": 0}
+
+        with open(checkpoint_path, encoding="utf-8") as file:
+            checkpoint = json.load(file)
+        if checkpoint["filters"] != filters:
+            raise ValueError("El checkpoint corresponde a otros filtros; use otro directorio de salida")
+        return checkpoint
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: str, checkpoint: dict) -> None:
+        """Escritura atómica: un corte a mitad de escritura conserva el checkpoint anterior"""
+        temporary_path = f"{checkpoint_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, checkpoint_path)
+
+    @staticmethod
+    def write_zip_parts(
+            db: Session,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex,
+            output_dir: str,
+            vehicle_type: Optional[VehicleType] = None,
+            city: Optional[str] = None,
+            chunk_size: int = 500,
+            part_size: int = 20000,
+            workers: Optional[int] = None
+    ) -> dict:
+        """
+        Genera los estados de cuenta en archivos ZIP dentro de output_dir; cada parte se cierra
+        con el bloque que alcanza part_size PDFs.
+        Al cerrar cada parte se guarda un checkpoint con el último vehículo incluido; si el proceso
+        se interrumpe, volver a ejecutar con el mismo output_dir descarta la parte incompleta y
+        continúa desde ese vehículo.
+        Returns: resumen con partes, estados de cuenta generados y duración
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint_path = os.path.join(output_dir, "checkpoint.json")
+        filters = {
+            "vehicle_type": vehicle_type.value if vehicle_type else None,
+            "city": city,
+            "tax_year": tax_period.year
+        }
+        checkpoint = StatementBatchService._load_checkpoint(checkpoint_path, filters)
+        if checkpoint["after_id"] is not None:
+            logger.info(
+                "Retomando desde el vehículo %s (%s partes, %s estados de cuenta)",
+                checkpoint["after_id"], checkpoint["parts"], checkpoint["statements"]
+            )
+
+        start = time.perf_counter()
+        generated = 0
+        rendered_chunks = StatementBatchService.render_chunks(
+            StatementBatchService.iter_statement_chunks(
+                db, tax_period, tax_rates, vehicle_type, city,
+                after_id=checkpoint["after_id"], chunk_size=chunk_size
+            ),
+            workers=workers
+        )
+
+        archive = None
+        part_statements = 0
+        try:
+            for last_id, files in rendered_chunks:
+                if archive is None:
+                    part_path = os.path.join(output_dir, f"estados_cuenta_{checkpoint['parts'] + 1:04d}.zip")
+                    archive = zipfile.ZipFile(part_path, mode="w", compression=zipfile.ZIP_STORED)
+                for filename, content in files:
+                    archive.writestr(filename, content)
+                part_statements += len(files)
+                generated += len(files)
+                checkpoint["after_id"] = last_id
+
+                if part_statements >= part_size:
+                    archive.close()
+                    archive = None
+                    checkpoint["parts"] += 1
+                    checkpoint["statements"] += part_statements
+                    part_statements = 0
+                    StatementBatchService._save_checkpoint(checkpoint_path, checkpoint)
+
+            if archive is not None:
+                archive.close()
+                archive = None
+                checkpoint["parts"] += 1
+                checkpoint["statements"] += part_statements
+                StatementBatchService._save_checkpoint(checkpoint_path, checkpoint)
+        finally:
+            if archive is not None:
+                # Parte incompleta: no se registra en el checkpoint y se reescribe al retomar
+                archive.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "output_dir": output_dir,
+            "parts": checkpoint["parts"],
+            "statements": checkpoint["statements"],
+            "generated_this_run": generated,
+            "seconds": round(elapsed, 2),
+            "pdfs_per_second": round(generated / elapsed, 1) if elapsed else 0.0
+        }
+
+
+class StatementExportBusy(Exception):
+    """Ya hay una exportación de estados de cuenta en curso en este proceso"""
+
+
+class _ReservedExport:
+    """Iterador que libera el cupo de exportación una sola vez, aunque nunca llegue a recorrerse"""
+
+    def __init__(self, rendered_chunks: Iterator[RenderedChunk], release):
+        self._rendered_chunks = rendered_chunks
+        self._release = release
+        self._closed = False
+
+    def __iter__(self) -> "_ReservedExport":
+        return self
+
+    def __next__(self) -> RenderedChunk:
+        try:
+            return next(self._rendered_chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._rendered_chunks.close()
+            self._release()
+
+    def __del__(self):
+        self.close()
+
+
+class StatementExportPool:
+    """
+    Pool de procesos fijo para exportar estados de cuenta desde la API.
+    Se crea una vez por proceso (sin pagar el arranque de procesos en cada solicitud), está
+    separado del pool de PDFs individuales y admite una sola exportación a la vez: una segunda
+    solicitud se rechaza con StatementExportBusy en lugar de duplicar los procesos del host.
+    Las exportaciones grandes deben hacerse con app.db.generate_statements.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._running = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.exports = 0
+        self.rejected = 0
+        self.statements = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def reserve(self, chunks: Iterator[tuple[int, list[tuple[dict, dict]]]]) -> "_ReservedExport":
+        """
+        Toma el cupo de exportación y retorna el iterador de bloques renderizados.
+        El cupo se libera al agotar o cerrar el iterador, o al descartarlo sin recorrerlo.
+        """
+        if not self._running.acquire(blocking=False):
+            self.rejected += 1
+            raise StatementExportBusy("Ya hay una exportación de estados de cuenta en curso, intente más tarde")
+        self.exports += 1
+        return _ReservedExport(self._render(chunks), self._running.release)
+
+    def _render(self, chunks: Iterator[tuple[int, list[tuple[dict, dict]]]]) -> Iterator[RenderedChunk]:
+        try:
+            for rendered_chunk in StatementBatchService.render_chunks_with(
+                    self._get_executor(), self.workers, chunks
+            ):
+                self.statements += len(rendered_chunk[1])
+                yield rendered_chunk
+        except BrokenProcessPool:
+            logger.exception("El pool de exportación de estados de cuenta se rompió; se recreará")
+            self._reset_executor()
+            raise
+
+    def _reset_executor(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+    def stats(self) -> dict:
+        """Métricas de la exportación"""
+        return {
+            "workers": self.workers,
+            "running": self._running.locked(),
+            "exports": self.exports,
+            "rejected": self.rejected,
+            "statements": self.statements
+        }
+
+
+statement_export_pool = StatementExportPool(workers=settings.STATEMENT_EXPORT_WORKERS)
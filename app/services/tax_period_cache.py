@@ -0,0 +1,176 @@
+import threading
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.tax_period import TaxPeriod
+from app.models.tax_rate import TaxRate
+from app.services.tax_service import TaxService, TaxRateIndex
+
+_SESSION_DIRTY_KEY = "tax_period_cache_dirty"
+
+
+class TaxPeriodCache:
+    """
+    Cache en proceso del período fiscal activo y su tabla de tasas compilada.
+    Se invalida explícitamente al confirmar escrituras sobre TaxPeriod/TaxRate
+    y, como respaldo, expira tras TTL segundos.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (período, tasas, instante de carga) se reemplaza como una unidad para lecturas sin lock
+        self._entry: Optional[Tuple[Optional[TaxPeriod], Optional[TaxRateIndex], float]] = None
+        self._version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.reload_count = 0
+        self.reload_total_seconds = 0.0
+        self.last_reload_seconds = 0.0
+
+    @property
+    def version(self) -> int:
+        """Versión de los datos cacheados; cambia en cada recarga o invalidación"""
+        return self._version
+
+    def _fresh_entry(self) -> Optional[Tuple[Optional[TaxPeriod], Optional[TaxRateIndex], float]]:
+        entry = self._entry
+        if entry is not None and time.monotonic() - entry[2] < self.ttl_seconds:
+            return entry
+        return None
+
+    def get(self, db: Session) -> Tuple[Optional[TaxPeriod], Optional[TaxRateIndex]]:
+        """
+        Obtiene el período fiscal activo y sus tasas compiladas
+        Returns: (período activo o None, índice de tasas o None)
+        """
+        entry = self._fresh_entry()
+        if entry is None:
+            with self._lock:
+                # Otro hilo pudo haber recargado mientras se esperaba el lock
+                entry = self._fresh_entry()
+                if entry is None:
+                    self.misses += 1
+                    entry = self._reload(db)
+                    return entry[0], entry[1]
+
+        self.hits += 1
+        return entry[0], entry[1]
+
+    async def get_async(self, db: AsyncSession) -> Tuple[Optional[TaxPeriod], Optional[TaxRateIndex]]:
+        """Versión asíncrona de get; la recarga no retiene el lock mientras espera la base de datos"""
+        entry = self._fresh_entry()
+        if entry is None:
+            self.misses += 1
+            start = time.perf_counter()
+            version = self._version
+            tax_period = (await db.scalars(self._active_period_query())).first()
+            rates = []
+            if tax_period:
+                rates = (await db.scalars(self._rates_query(tax_period.id))).all()
+            with self._lock:
+                entry = self._store(db, tax_period, rates, start, expected_version=version)
+            return entry[0], entry[1]
+
+        self.hits += 1
+        return entry[0], entry[1]
+
+    @staticmethod
+    def _active_period_query():
+        return select(TaxPeriod).where(TaxPeriod.is_active == True).limit(1)
+
+    @staticmethod
+    def _rates_query(tax_period_id: int):
+        return select(TaxRate).where(TaxRate.tax_period_id == tax_period_id)
+
+    def _reload(self, db: Session) -> Tuple[Optional[TaxPeriod], Optional[TaxRateIndex], float]:
+        start = time.perf_counter()
+
+        tax_period = db.scalars(self._active_period_query()).first()
+        rates = []
+        if tax_period:
+            rates = db.scalars(self._rates_query(tax_period.id)).all()
+
+        return self._store(db, tax_period, rates, start)
+
+    def _store(
+            self,
+            db: Session | AsyncSession,
+            tax_period: Optional[TaxPeriod],
+            rates: list[TaxRate],
+            start: float,
+            expected_version: Optional[int] = None
+    ) -> Tuple[Optional[TaxPeriod], Optional[TaxRateIndex], float]:
+        tax_rates = None
+        if tax_period:
+            # Se desvinculan de la sesión para que sus commits no expiren los objetos compartidos
+            for rate in rates:
+                db.expunge(rate)
+            db.expunge(tax_period)
+            tax_rates = TaxService.build_rate_index(rates, tax_period.id)
+
+        entry = (tax_period, tax_rates, time.monotonic())
+        if expected_version is not None and expected_version != self._version:
+            # Hubo una invalidación durante la carga: el resultado se usa pero no se cachea
+            return entry
+
+        self._entry = entry
+        self._version += 1
+
+        self.last_reload_seconds = time.perf_counter() - start
+        self.reload_total_seconds += self.last_reload_seconds
+        self.reload_count += 1
+        return self._entry
+
+    def invalidate(self) -> None:
+        """Descarta los datos cacheados; la siguiente consulta recarga desde la base de datos"""
+        with self._lock:
+            self._entry = None
+            self._version += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "reload_count": self.reload_count,
+            "last_reload_ms": round(self.last_reload_seconds * 1000, 3),
+            "avg_reload_ms": round(self.reload_total_seconds / self.reload_count * 1000, 3)
+            if self.reload_count else 0.0,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+tax_period_cache = TaxPeriodCache(ttl_seconds=settings.TAX_PERIOD_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_tax_period_writes(session: Session, flush_context) -> None:
+    """Marca la sesión si el flush escribió períodos fiscales o tasas"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (TaxPeriod, TaxRate)):
+            session.info[_SESSION_DIRTY_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_SESSION_DIRTY_KEY, False):
+        tax_period_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
@@ -1,14 +1,70 @@
+from bisect import bisect_right
+from typing import Iterable
+
 from app.models.tax_rate import TaxRate
 from app.models.tax_period import TaxPeriod
+from app.models.vehicle import VehicleType
+
+
+class TaxRateIndex:
+    """
+    Índice compilado de tramos de tarifa de un período fiscal.
+    Mantiene un arreglo ordenado por valor mínimo para cada tipo de vehículo,
+    de modo que la búsqueda del tramo aplicable es O(log n) con bisect.
+    Se asume que los tramos de un mismo tipo de vehículo no se solapan.
+    """
+
+    def __init__(self, tax_rates: Iterable[TaxRate], tax_period_id: int | None = None):
+        self.tax_period_id = tax_period_id
+        self.rates: list[TaxRate] = list(tax_rates)
+        self._brackets: dict[VehicleType, tuple[list[float], list[float], list[TaxRate]]] = {}
+
+        grouped: dict[VehicleType, list[tuple[float, float, TaxRate]]] = {}
+        for rate in self.rates:
+            min_val = rate.min_value or float('-inf')
+            max_val = rate.max_value or float('inf')
+            grouped.setdefault(rate.vehicle_type, []).append((min_val, max_val, rate))
+
+        for vehicle_type, brackets in grouped.items():
+            # sort estable: ante mínimos iguales se conserva el orden original
+            brackets.sort(key=lambda bracket: bracket[0])
+            self._brackets[vehicle_type] = (
+                [bracket[0] for bracket in brackets],
+                [bracket[1] for bracket in brackets],
+                [bracket[2] for bracket in brackets],
+            )
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+    def brackets(self, vehicle_type: VehicleType) -> tuple[list[float], list[float], list[TaxRate]] | None:
+        """Retorna (mínimos, máximos, tasas) ordenados del tipo de vehículo, o None si no tiene tramos"""
+        return self._brackets.get(vehicle_type)
+
+    def lookup(self, value: float, vehicle_type: VehicleType | None = None) -> TaxRate | None:
+        """Busca el tramo aplicable para el valor y tipo de vehículo"""
+        brackets = self._brackets.get(vehicle_type) if vehicle_type is not None else None
+        if brackets is None:
+            # Sin tramos para el tipo: se conserva el comportamiento histórico
+            return TaxService.scan_tax_rates(value, self.rates)
+
+        min_values, max_values, rates = brackets
+        position = bisect_right(min_values, value) - 1
+        if position < 0 or value > max_values[position]:
+            return None
+
+        return rates[position]
 
 
 class TaxService:
     @staticmethod
-    def get_applicable_tax_rate(value: float, tax_rates: list[TaxRate]) -> TaxRate | None:
-        """Determina la tasa de impuesto aplicable según el valor del vehículo"""
-        if not tax_rates:
-            return None
+    def build_rate_index(tax_rates: Iterable[TaxRate], tax_period_id: int | None = None) -> TaxRateIndex:
+        """Compila las tasas de un período en un índice de búsqueda por tramos"""
+        return TaxRateIndex(tax_rates, tax_period_id)
 
+    @staticmethod
+    def scan_tax_rates(value: float, tax_rates: list[TaxRate]) -> TaxRate | None:
+        """Recorre linealmente las tasas y retorna la primera cuyo rango contiene el valor"""
         for rate in tax_rates:
             min_val = rate.min_value or float('-inf')
             max_val = rate.max_value or float('inf')
@@ -18,6 +74,23 @@ class TaxService:
 
         return None
 
+    @staticmethod
+    def get_applicable_tax_rate(
+            value: float,
+            tax_rates: list[TaxRate] | TaxRateIndex,
+            vehicle_type: VehicleType | None = None
+    ) -> TaxRate | None:
+        """Determina la tasa de impuesto aplicable según el valor y tipo del vehículo"""
+        if not tax_rates:
+            return None
+
+        if not isinstance(tax_rates, TaxRateIndex):
+            if vehicle_type is None:
+                return TaxService.scan_tax_rates(value, tax_rates)
+            tax_rates = TaxService.build_rate_index(tax_rates)
+
+        return tax_rates.lookup(value, vehicle_type)
+
     @staticmethod
     def calculate_traffic_light_fee(tax_period: TaxPeriod, is_motorcycle: bool) -> float:
         """Calcula la tarifa de semaforización"""
@@ -1,14 +1,19 @@
 from datetime import date, timedelta, datetime
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, Iterator
 
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.pagination import before_cursor, next_cursor
 from app.models import TaxPeriod, User, Payment
 from app.models.payment import PaymentStatus
 from app.models.vehicle import Vehicle, VehicleType
 from app.models.tax_rate import TaxRate
+from app.services.batch_tax_service import BatchTaxService
 from app.services.document_service import DocumentService
-from app.services.tax_service import TaxService
+from app.services.tax_period_cache import tax_period_cache
+from app.services.tax_service import TaxService, TaxRateIndex
 
 
 class VehicleService:
@@ -53,13 +58,19 @@ class VehicleService:
         return len(errors) == 0, errors
 
     @staticmethod
-    def calculate_tax_amount(vehicle: Vehicle, tax_period: TaxPeriod, tax_rates: list[TaxRate]) -> float:
+    def calculate_tax_amount(
+            vehicle: Vehicle,
+            tax_period: TaxPeriod,
+            tax_rates: list[TaxRate] | TaxRateIndex
+    ) -> float:
         """Calcula el monto total del impuesto"""
         if not vehicle or not tax_period:
             return 0.0
 
         # Obtener tasa base según avalúo
-        applicable_rate = TaxService.get_applicable_tax_rate(vehicle.commercial_value, tax_rates)
+        applicable_rate = TaxService.get_applicable_tax_rate(
+            vehicle.commercial_value, tax_rates, vehicle.vehicle_type
+        )
         if not applicable_rate:
             return 0.0
 
@@ -90,7 +101,11 @@ class VehicleService:
         return round(base_tax, 2)
 
     @staticmethod
-    def calculate_total_tax_amount(vehicle: Vehicle, tax_period: TaxPeriod, tax_rates: list[TaxRate]) -> dict:
+    def calculate_total_tax_amount(
+            vehicle: Vehicle,
+            tax_period: TaxPeriod,
+            tax_rates: list[TaxRate] | TaxRateIndex
+    ) -> dict:
         """Calcula el desglose completo del impuesto"""
         base_tax = VehicleService.calculate_tax_amount(vehicle, tax_period, tax_rates)
         traffic_light_fee = TaxService.calculate_traffic_light_fee(tax_period,
@@ -102,45 +117,143 @@ class VehicleService:
             "total_amount": base_tax + traffic_light_fee
         }
 
+    @staticmethod
+    def _consult_query(plate: str, document_type: str, document_number: str, include_payments: bool):
+        """Vehículo filtrado por placa y documento del propietario, con sus pagos si se solicitan"""
+        query = (
+            select(Vehicle, Payment) if include_payments else select(Vehicle)
+        ).join(User, Vehicle.owner_id == User.id)
+        if include_payments:
+            query = query.outerjoin(Payment, Payment.vehicle_id == Vehicle.id).order_by(Payment.payment_date.desc())
+        else:
+            query = query.limit(1)
+        return query.where(
+            Vehicle.plate == plate.upper(),
+            User.document_type_id == document_type,
+            User.document_number == document_number
+        )
+
     @staticmethod
     def get_vehicle_tax_details(
             db: Session,
             plate: str,
             document_type: str,
-            document_number: str
+            document_number: str,
+            include_payments: bool = False
     ) -> Tuple[Optional[dict], Optional[str]]:
         """
-        Obtiene los detalles del vehículo y su impuesto si los datos coinciden
+        Obtiene los detalles del vehículo y su impuesto si los datos coinciden.
+        Vehículo, propietario y (si include_payments) sus pagos se leen en una sola consulta;
+        el período fiscal y las tasas salen del cache en proceso.
         Returns: (datos del vehículo y tax, mensaje de error)
         """
         # Validar documento
         if not DocumentService.validate_document_number(document_type, document_number):
             return None, "Número de documento inválido"
 
-        # Buscar vehículo y propietario
-        vehicle = (
-            db.query(Vehicle)
-            .join(User)
-            .filter(
-                Vehicle.plate == plate.upper(),
-                User.document_type_id == document_type,
-                User.document_number == document_number
-            )
-            .first()
-        )
+        # Buscar vehículo y propietario, junto con sus pagos si se solicitan
+        rows = db.execute(
+            VehicleService._consult_query(plate, document_type, document_number, include_payments)
+        ).all()
+        if not rows:
+            return None, "No se encontró el vehículo con los datos proporcionados"
 
-        if not vehicle:
+        # Obtener período fiscal activo y tasas compiladas (cacheados en el proceso)
+        tax_period, tax_rates = tax_period_cache.get(db)
+        if not tax_period:
+            return None, "No hay período fiscal activo"
+
+        return VehicleService._build_tax_details(rows, tax_period, tax_rates, include_payments), None
+
+    @staticmethod
+    async def get_vehicle_tax_details_async(
+            db: AsyncSession,
+            plate: str,
+            document_type: str,
+            document_number: str,
+            include_payments: bool = False
+    ) -> Tuple[Optional[dict], Optional[str]]:
+        """Versión asíncrona de get_vehicle_tax_details"""
+        if not DocumentService.validate_document_number(document_type, document_number):
+            return None, "Número de documento inválido"
+
+        rows = (await db.execute(
+            VehicleService._consult_query(plate, document_type, document_number, include_payments)
+        )).all()
+        if not rows:
             return None, "No se encontró el vehículo con los datos proporcionados"
 
-        # Obtener período fiscal activo y tasas
-        tax_period = db.query(TaxPeriod).filter(TaxPeriod.is_active == True).first()
+        tax_period, tax_rates = await tax_period_cache.get_async(db)
+        if not tax_period:
+            return None, "No hay período fiscal activo"
+
+        return VehicleService._build_tax_details(rows, tax_period, tax_rates, include_payments), None
+
+    @staticmethod
+    def _bulk_consult_query(plates: list[str], document_type: str, document_number: str):
+        """Vehículos de un mismo propietario filtrados por un conjunto de placas"""
+        return select(Vehicle).join(User, Vehicle.owner_id == User.id).where(
+            Vehicle.plate.in_(plates),
+            User.document_type_id == document_type,
+            User.document_number == document_number
+        )
+
+    @staticmethod
+    async def get_vehicles_tax_details_async(
+            db: AsyncSession,
+            plates: list[str],
+            document_type: str,
+            document_number: str
+    ) -> Tuple[Optional[Dict[str, dict]], Optional[str]]:
+        """
+        Consulta masiva: resuelve todas las placas de un propietario en una sola consulta
+        y calcula su impuesto en una pasada vectorizada sobre la tabla de tasas.
+        Returns: (detalles por placa encontrada, mensaje de error)
+        """
+        if not DocumentService.validate_document_number(document_type, document_number):
+            return None, "Número de documento inválido"
+
+        plates = list(dict.fromkeys(plate.upper() for plate in plates))
+        vehicles = (await db.scalars(
+            VehicleService._bulk_consult_query(plates, document_type, document_number)
+        )).all()
+        if not vehicles:
+            return {}, None
+
+        tax_period, tax_rates = await tax_period_cache.get_async(db)
         if not tax_period:
             return None, "No hay período fiscal activo"
 
-        tax_rates = db.query(TaxRate).filter(TaxRate.tax_period_id == tax_period.id).all()
+        fleet_tax = BatchTaxService.calculate_vehicles_tax(vehicles, tax_period, tax_rates)
+        details = {}
+        for position, vehicle in enumerate(vehicles):
+            tax_details = {
+                "base_tax": float(fleet_tax["base_tax"][position]),
+                "traffic_light_fee": float(fleet_tax["traffic_light_fee"][position]),
+                "total_amount": float(fleet_tax["total_amount"][position])
+            }
+            details[vehicle.plate] = VehicleService._build_tax_details(
+                [(vehicle,)], tax_period, tax_rates, include_payments=False, tax_details=tax_details
+            )
+        return details, None
+
+    @staticmethod
+    def _build_tax_details(
+            rows: list,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex,
+            include_payments: bool,
+            tax_details: Optional[dict] = None
+    ) -> dict:
+        """
+        Arma la respuesta de la consulta a partir de las filas (vehículo[, pago]).
+        tax_details permite reutilizar un desglose ya calculado en lote.
+        """
+        vehicle = rows[0][0]
 
         # Calcular impuestos e información de descuentos
-        tax_details = VehicleService.calculate_total_tax_amount(vehicle, tax_period, tax_rates)
+        if tax_details is None:
+            tax_details = VehicleService.calculate_total_tax_amount(vehicle, tax_period, tax_rates)
 
         # Calcular información de descuentos
         discount_info = None
@@ -195,18 +308,353 @@ class VehicleService:
             "discounts": discount_info
         }
 
-        return response, None
+        if include_payments:
+            payments = [payment for _, payment in rows if payment is not None]
+            response["payment_history"] = VehicleService._format_payment_history(payments)
+            response["pending_payments"] = VehicleService._format_pending_payments(
+                sorted(
+                    (payment for payment in payments if payment.status == PaymentStatus.PENDING),
+                    key=lambda payment: payment.due_date
+                )
+            )
+
+        return response
+
+    @staticmethod
+    def _dashboard_query(vehicle_type: Optional[VehicleType] = None, city: Optional[str] = None):
+        """Proyección por columnas de vehículo y propietario usada por el tablero y su exportación"""
+        query = (
+            select(
+                Vehicle.id,
+                Vehicle.plate,
+                Vehicle.vehicle_type,
+                Vehicle.city,
+                Vehicle.commercial_value,
+                Vehicle.is_electric,
+                Vehicle.is_hybrid,
+                Vehicle.is_new,
+                Vehicle.registration_date,
+                Vehicle.current_tax_status,
+                User.full_name.label("owner_name")
+            )
+            .join(User, Vehicle.owner_id == User.id)
+        )
+        # Filtros de igualdad sobre (vehicle_type, city) para aprovechar idx_vehicle_type_city
+        if vehicle_type is not None:
+            query = query.where(Vehicle.vehicle_type == vehicle_type)
+        if city is not None:
+            query = query.where(Vehicle.city == city)
+        return query
+
+    @staticmethod
+    def _dashboard_items(
+            rows: list,
+            last_payment_dates: dict,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex
+    ) -> list[dict]:
+        """Calcula en lote el impuesto de las filas y arma las entradas del tablero"""
+        taxes = BatchTaxService.calculate_vehicles_tax(rows, tax_period, tax_rates)
+        base_taxes = taxes["base_tax"].tolist()
+        traffic_light_fees = taxes["traffic_light_fee"].tolist()
+        total_amounts = taxes["total_amount"].tolist()
+
+        return [
+            {
+                "vehicle_id": row.id,
+                "plate": row.plate,
+                "owner_name": row.owner_name,
+                "vehicle_type": row.vehicle_type.value,
+                "city": row.city,
+                "base_tax": base_taxes[position],
+                "traffic_light_fee": traffic_light_fees[position],
+                "total_amount": total_amounts[position],
+                "tax_status": row.current_tax_status.value,
+                "due_date": tax_period.due_date,
+                "last_payment_date": last_payment_dates.get(row.id)
+            }
+            for position, row in enumerate(rows)
+        ]
+
+    @staticmethod
+    def get_tax_dashboard(
+            db: Session,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex,
+            vehicle_type: Optional[VehicleType] = None,
+            city: Optional[str] = None,
+            after_id: Optional[int] = None,
+            limit: int = 100
+    ) -> dict:
+        """
+        Obtiene una página del tablero de impuestos paginada por id de vehículo (keyset).
+        Vehículos, propietario y fecha del último pago se resuelven en una sola consulta
+        y el impuesto se calcula en lote para toda la página.
+        Returns: {"items": [...], "next_after_id": id para la siguiente página o None}
+        """
+        page_query = VehicleService._dashboard_query(vehicle_type, city)
+        if after_id is not None:
+            page_query = page_query.where(Vehicle.id > after_id)
+        page = page_query.order_by(Vehicle.id).limit(limit).cte("dashboard_page")
+
+        last_payments = (
+            select(
+                Payment.vehicle_id,
+                func.max(Payment.payment_date).label("last_payment_date")
+            )
+            .where(Payment.vehicle_id.in_(select(page.c.id)))
+            .group_by(Payment.vehicle_id)
+            .subquery()
+        )
+
+        rows = db.execute(
+            select(page, last_payments.c.last_payment_date)
+            .outerjoin(last_payments, last_payments.c.vehicle_id == page.c.id)
+            .order_by(page.c.id)
+        ).all()
+
+        if not rows:
+            return {"items": [], "next_after_id": None}
+
+        last_payment_dates = {row.id: row.last_payment_date for row in rows}
+        return {
+            "items": VehicleService._dashboard_items(rows, last_payment_dates, tax_period, tax_rates),
+            "next_after_id": rows[-1].id if len(rows) == limit else None
+        }
+
+    @staticmethod
+    def iter_tax_dashboard(
+            db: Session,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex,
+            vehicle_type: Optional[VehicleType] = None,
+            city: Optional[str] = None,
+            chunk_size: int = 1000
+    ) -> Iterator[list[dict]]:
+        """
+        Recorre el tablero completo por bloques usando un cursor del lado del servidor.
+        La memoria usada depende de chunk_size y no del tamaño de la flota.
+        """
+        result = db.execute(
+            VehicleService._dashboard_query(vehicle_type, city)
+            .order_by(Vehicle.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        for rows in result.partitions():
+            vehicle_ids = [row.id for row in rows]
+            last_payment_dates = dict(
+                db.execute(
+                    select(Payment.vehicle_id, func.max(Payment.payment_date))
+                    .where(Payment.vehicle_id.in_(vehicle_ids))
+                    .group_by(Payment.vehicle_id)
+                ).all()
+            )
+            yield VehicleService._dashboard_items(rows, last_payment_dates, tax_period, tax_rates)
+
+    @staticmethod
+    def _owner_filter(document_type: str, document_number: str) -> tuple:
+        """Condiciones sobre (document_type_id, document_number), cubiertas por idx_user_document"""
+        return User.document_type_id == document_type, User.document_number == document_number
 
     @staticmethod
-    def get_payment_history(db: Session, vehicle_id: int) -> list[dict]:
-        """Obtiene el historial de pagos"""
-        payments = (
-            db.query(Payment)
-            .filter(Payment.vehicle_id == vehicle_id)
-            .order_by(Payment.payment_date.desc())
-            .all()
+    def _portfolio_vehicles_query(document_type: str, document_number: str):
+        """Proyección por columnas de los vehículos de un propietario"""
+        return (
+            select(
+                Vehicle.id,
+                Vehicle.plate,
+                Vehicle.brand,
+                Vehicle.model,
+                Vehicle.year,
+                Vehicle.vehicle_type,
+                Vehicle.city,
+                Vehicle.commercial_value,
+                Vehicle.is_electric,
+                Vehicle.is_hybrid,
+                Vehicle.is_new,
+                Vehicle.registration_date,
+                Vehicle.current_tax_status
+            )
+            .join(User, Vehicle.owner_id == User.id)
+            .where(*VehicleService._owner_filter(document_type, document_number))
+        )
+
+    @staticmethod
+    def _portfolio_totals_query(
+            document_type: str,
+            document_number: str,
+            tax_period: TaxPeriod,
+            tax_rates: TaxRateIndex
+    ):
+        """
+        Totales de toda la flota del propietario en una sola sentencia: el impuesto de cada
+        vehículo se calcula y se suma en la base de datos, junto al agregado de pagos pendientes
+        """
+        fleet = (
+            select(
+                func.count(Vehicle.id).label("vehicles"),
+                func.coalesce(func.sum(BatchTaxService.sql_base_tax(tax_rates)), 0).label("base_tax"),
+                func.coalesce(func.sum(BatchTaxService.sql_traffic_light_fee(tax_period)), 0).label(
+                    "traffic_light_fee"
+                )
+            )
+            .join(User, Vehicle.owner_id == User.id)
+            .where(*VehicleService._owner_filter(document_type, document_number))
+            .subquery("fleet")
+        )
+        pending = (
+            select(
+                func.count(Payment.id).label("pending_payments"),
+                func.coalesce(func.sum(Payment.amount), 0.0).label("pending_amount")
+            )
+            .join(Vehicle, Payment.vehicle_id == Vehicle.id)
+            .join(User, Vehicle.owner_id == User.id)
+            .where(
+                Payment.status == PaymentStatus.PENDING,
+                *VehicleService._owner_filter(document_type, document_number)
+            )
+            .subquery("pending")
         )
+        # Ambas subconsultas devuelven una sola fila
+        return select(fleet, pending).select_from(fleet.join(pending, true()))
+
+    @staticmethod
+    async def get_owner_portfolio_async(
+            db: AsyncSession,
+            document_type: str,
+            document_number: str,
+            after_id: Optional[int] = None,
+            limit: int = 100
+    ) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        Obtiene todos los vehículos de un propietario con su impuesto y pagos pendientes,
+        paginados por id de vehículo (keyset). Cada página se resuelve en una sola consulta
+        y el impuesto se calcula en lote; los totales de toda la flota se agregan en la base
+        de datos y se incluyen solo en la primera página.
+        Returns: ({"items", "totals", "next_after_id"}, mensaje de error)
+        """
+        if not DocumentService.validate_document_number(document_type, document_number):
+            return None, "Número de documento inválido"
+
+        page_query = VehicleService._portfolio_vehicles_query(document_type, document_number)
+        if after_id is not None:
+            page_query = page_query.where(Vehicle.id > after_id)
+        page = page_query.order_by(Vehicle.id).limit(limit).cte("portfolio_page")
+
+        rows = (await db.execute(
+            select(page, Payment)
+            .outerjoin(
+                Payment,
+                (Payment.vehicle_id == page.c.id) & (Payment.status == PaymentStatus.PENDING)
+            )
+            .order_by(page.c.id, Payment.due_date)
+        )).all()
+        if not rows and after_id is None:
+            return None, "No se encontraron vehículos para el documento proporcionado"
+
+        tax_period, tax_rates = await tax_period_cache.get_async(db)
+        if not tax_period:
+            return None, "No hay período fiscal activo"
+
+        # Agrupar las filas (vehículo, pago pendiente) por vehículo conservando el orden
+        vehicles = {}
+        pending_by_vehicle: dict[int, list[Payment]] = {}
+        for row in rows:
+            vehicles.setdefault(row.id, row)
+            pending = pending_by_vehicle.setdefault(row.id, [])
+            if row.Payment is not None:
+                pending.append(row.Payment)
+        vehicles = list(vehicles.values())
+
+        items = []
+        if vehicles:
+            taxes = BatchTaxService.calculate_vehicles_tax(vehicles, tax_period, tax_rates)
+            base_taxes = taxes["base_tax"].tolist()
+            traffic_light_fees = taxes["traffic_light_fee"].tolist()
+            total_amounts = taxes["total_amount"].tolist()
+            for position, vehicle in enumerate(vehicles):
+                pending = pending_by_vehicle[vehicle.id]
+                items.append({
+                    "vehicle_id": vehicle.id,
+                    "plate": vehicle.plate,
+                    "brand": vehicle.brand,
+                    "model": vehicle.model,
+                    "year": vehicle.year,
+                    "vehicle_type": vehicle.vehicle_type.value,
+                    "city": vehicle.city,
+                    "base_tax": base_taxes[position],
+                    "traffic_light_fee": traffic_light_fees[position],
+                    "total_amount": total_amounts[position],
+                    "tax_status": vehicle.current_tax_status.value,
+                    "due_date": tax_period.due_date,
+                    "pending_amount": round(sum(payment.amount for payment in pending), 2),
+                    "pending_payments": VehicleService._format_pending_payments(pending)
+                })
+
+        totals = None
+        if after_id is None:
+            fleet = (await db.execute(VehicleService._portfolio_totals_query(
+                document_type, document_number, tax_period, tax_rates
+            ))).one()
+            base_tax = round(float(fleet.base_tax), 2)
+            traffic_light_fee = round(float(fleet.traffic_light_fee), 2)
+            totals = {
+                "vehicles": fleet.vehicles,
+                "base_tax": base_tax,
+                "traffic_light_fee": traffic_light_fee,
+                "total_amount": round(base_tax + traffic_light_fee, 2),
+                "pending_payments": fleet.pending_payments,
+                "pending_amount": round(float(fleet.pending_amount), 2)
+            }
+
+        return {
+            "items": items,
+            "totals": totals,
+            "next_after_id": vehicles[-1].id if len(vehicles) == limit else None
+        }, None
 
+    @staticmethod
+    def _payment_history_query(vehicle_id: int, cursor: Optional[str] = None, limit: int = 50):
+        """Página del historial en orden (payment_date, id) descendente, servida por idx_payment_vehicle_date"""
+        query = select(Payment).where(Payment.vehicle_id == vehicle_id)
+        if cursor:
+            query = query.where(before_cursor(Payment.payment_date, Payment.id, cursor))
+        return query.order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(limit)
+
+    @staticmethod
+    def get_payment_history(
+            db: Session,
+            vehicle_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> dict:
+        """
+        Obtiene una página del historial de pagos (keyset sobre payment_date, id)
+        Returns: {"items": [...], "next_cursor": cursor opaco de la siguiente página o None}
+        """
+        payments = db.scalars(VehicleService._payment_history_query(vehicle_id, cursor, limit)).all()
+        return {
+            "items": VehicleService._format_payment_history(payments),
+            "next_cursor": next_cursor(payments, limit)
+        }
+
+    @staticmethod
+    async def get_payment_history_async(
+            db: AsyncSession,
+            vehicle_id: int,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> dict:
+        """Versión asíncrona de get_payment_history"""
+        payments = (await db.scalars(VehicleService._payment_history_query(vehicle_id, cursor, limit))).all()
+        return {
+            "items": VehicleService._format_payment_history(payments),
+            "next_cursor": next_cursor(payments, limit)
+        }
+
+    @staticmethod
+    def _format_payment_history(payments: list[Payment]) -> list[dict]:
         return [
             {
                 "payment_date": payment.payment_date,
@@ -219,18 +667,30 @@ class VehicleService:
         ]
 
     @staticmethod
-    def get_pending_payments(db: Session, vehicle_id: int) -> list[dict]:
-        """Obtiene los pagos pendientes"""
-        payments = (
-            db.query(Payment)
-            .filter(
+    def _pending_payments_query(vehicle_id: int):
+        return (
+            select(Payment)
+            .where(
                 Payment.vehicle_id == vehicle_id,
                 Payment.status == PaymentStatus.PENDING
             )
             .order_by(Payment.due_date.asc())
-            .all()
         )
 
+    @staticmethod
+    def get_pending_payments(db: Session, vehicle_id: int) -> list[dict]:
+        """Obtiene los pagos pendientes"""
+        payments = db.scalars(VehicleService._pending_payments_query(vehicle_id)).all()
+        return VehicleService._format_pending_payments(payments)
+
+    @staticmethod
+    async def get_pending_payments_async(db: AsyncSession, vehicle_id: int) -> list[dict]:
+        """Versión asíncrona de get_pending_payments"""
+        payments = (await db.scalars(VehicleService._pending_payments_query(vehicle_id))).all()
+        return VehicleService._format_pending_payments(payments)
+
+    @staticmethod
+    def _format_pending_payments(payments: list[Payment]) -> list[dict]:
         return [
             {
                 "vigencia": payment.tax_year,
@@ -243,46 +703,104 @@ class VehicleService:
         ]
 
     @staticmethod
-    def get_vehicle_payment_history(
-            db: Session,
-            plate: str,
-            document_type: str,
-            document_number: str
-    ) -> Dict:
-        """Obtiene el historial completo de pagos de un vehículo"""
-        vehicle = (
-            db.query(Vehicle)
-            .join(User)
-            .filter(
+    def _vehicle_by_owner_query(plate: str, document_type: str, document_number: str):
+        return (
+            select(Vehicle)
+            .join(User, Vehicle.owner_id == User.id)
+            .where(
                 Vehicle.plate == plate.upper(),
                 User.document_type_id == document_type,
                 User.document_number == document_number
             )
-            .first()
+            .limit(1)
         )
 
-        if not vehicle:
-            raise ValueError("Vehículo no encontrado")
-
-        # Obtener el último pago completado
-        ultimo_pago = (
-            db.query(Payment)
-            .filter(
-                Payment.vehicle_id == vehicle.id,
+    @staticmethod
+    def _last_completed_payment_query(vehicle_id: int):
+        return (
+            select(Payment)
+            .where(
+                Payment.vehicle_id == vehicle_id,
                 Payment.status == PaymentStatus.COMPLETED
             )
-            .order_by(Payment.payment_date.desc())
-            .first()
+            .order_by(Payment.payment_date.desc(), Payment.id.desc())
+            .limit(1)
         )
 
-        # Obtener historial de pagos
-        pagos = (
-            db.query(Payment)
-            .filter(Payment.vehicle_id == vehicle.id)
-            .order_by(Payment.tax_year.desc(), Payment.payment_date.desc())
-            .all()
-        )
+    @staticmethod
+    def _last_completed_from_page(pagos: list[Payment], limit: int) -> Tuple[Optional[Payment], bool]:
+        """
+        El último pago completado sale de la misma página (ya ordenada por fecha descendente).
+        Returns: (pago, True si hay que buscarlo aparte porque la página llena no lo contiene)
+        """
+        ultimo_pago = next((pago for pago in pagos if pago.status == PaymentStatus.COMPLETED), None)
+        return ultimo_pago, ultimo_pago is None and len(pagos) == limit
+
+    @staticmethod
+    def get_vehicle_payment_history(
+            db: Session,
+            plate: str,
+            document_type: str,
+            document_number: str,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> Dict:
+        """
+        Obtiene el historial de pagos de un vehículo paginado por (payment_date, id).
+        El último pago completado se incluye solo en la primera página.
+        """
+        vehicle = db.scalars(
+            VehicleService._vehicle_by_owner_query(plate, document_type, document_number)
+        ).first()
+
+        if not vehicle:
+            raise ValueError("Vehículo no encontrado")
+
+        pagos = db.scalars(VehicleService._payment_history_query(vehicle.id, cursor, limit)).all()
+
+        ultimo_pago = None
+        if not cursor:
+            ultimo_pago, search_further = VehicleService._last_completed_from_page(pagos, limit)
+            if search_further:
+                ultimo_pago = db.scalars(VehicleService._last_completed_payment_query(vehicle.id)).first()
+
+        return VehicleService._format_vehicle_payment_history(vehicle, ultimo_pago, pagos, cursor, limit)
+
+    @staticmethod
+    async def get_vehicle_payment_history_async(
+            db: AsyncSession,
+            plate: str,
+            document_type: str,
+            document_number: str,
+            cursor: Optional[str] = None,
+            limit: int = 50
+    ) -> Dict:
+        """Versión asíncrona de get_vehicle_payment_history"""
+        vehicle = (await db.scalars(
+            VehicleService._vehicle_by_owner_query(plate, document_type, document_number)
+        )).first()
+
+        if not vehicle:
+            raise ValueError("Vehículo no encontrado")
 
+        pagos = (await db.scalars(VehicleService._payment_history_query(vehicle.id, cursor, limit))).all()
+
+        ultimo_pago = None
+        if not cursor:
+            ultimo_pago, search_further = VehicleService._last_completed_from_page(pagos, limit)
+            if search_further:
+                ultimo_pago = (await db.scalars(VehicleService._last_completed_payment_query(vehicle.id))).first()
+
+        return VehicleService._format_vehicle_payment_history(vehicle, ultimo_pago, pagos, cursor, limit)
+
+    @staticmethod
+    def _format_vehicle_payment_history(
+            vehicle: Vehicle,
+            ultimo_pago: Optional[Payment],
+            pagos: list[Payment],
+            cursor: Optional[str],
+            limit: int
+    ) -> Dict:
         return {
             "vehicle_info": {
                 "periodo_certificacion": datetime.now().year,
@@ -290,7 +808,7 @@ class VehicleService:
                 "placa": vehicle.plate,
                 "marca": vehicle.brand
             },
-            "ultimo_pago": {
+            "ultimo_pago": None if cursor else {
                 "periodo_pagado": ultimo_pago.tax_year if ultimo_pago else None,
                 "fecha_pago": ultimo_pago.payment_date.strftime("%Y-%m-%d") if ultimo_pago else None,
                 "valor_pagado": ultimo_pago.amount if ultimo_pago else 0.0
@@ -303,5 +821,6 @@ class VehicleService:
                     "estado": "Pagado" if pago.status == PaymentStatus.COMPLETED else "Pendiente"
                 }
                 for pago in pagos
-            ]
+            ],
+            "next_cursor": next_cursor(pagos, limit)
         }
@@ -0,0 +1,119 @@
+"""
+Prueba de carga: cientos de inicios de pago PSE concurrentes para el mismo vehículo.
+Verifica que se cree un único pago y que ningún reintento termine en error.
+
+Uso:
+    python -m benchmarks.concurrent_payment_initiation [DATABASE_URL] [SOLICITUDES]
+
+Sin DATABASE_URL se usa una base SQLite temporal. Contra PostgreSQL se recomienda
+una base desechable: el script crea las tablas y datos de prueba.
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base, DocumentType, Payment, TaxPeriod, User, Vehicle
+from app.models.vehicle import VehicleType
+from app.services.id_worker_lease import id_worker_leaser
+from app.services.payment_service import PaymentService
+
+REQUESTS = 300
+WORKERS = 32
+
+
+def seed(session_factory) -> int:
+    """Crea propietario, vehículo y período activo; retorna el id del vehículo"""
+    with session_factory() as db:
+        document_type = DocumentType(code="CC", name="Cédula de ciudadanía")
+        db.add(document_type)
+        db.flush()
+        owner = User(
+            email="carga@example.com",
+            full_name="Prueba de carga",
+            hashed_password="-",
+            document_type_id=document_type.id,
+            document_number="1000000001"
+        )
+        year = date.today().year
+        db.add_all([owner, TaxPeriod(
+            year=year,
+            start_date=date(year, 1, 1),
+            end_date=date(year, 12, 31),
+            due_date=date(year, 6, 30),
+            traffic_light_fee=87000.0,
+            min_penalty_uvt=7,
+            uvt_value=47000.0,
+            is_active=True
+        )])
+        db.flush()
+        vehicle = Vehicle(
+            plate="CRG001",
+            brand="Marca",
+            model="Modelo",
+            year=2020,
+            vehicle_type=VehicleType.PARTICULAR,
+            commercial_value=50_000_000,
+            registration_date=date(2020, 1, 1),
+            city="Cali",
+            owner_id=owner.id,
+            current_appraisal=50_000_000,
+            appraisal_year=2020
+        )
+        db.add(vehicle)
+        db.commit()
+        return vehicle.id
+
+
+def main() -> None:
+    database_url = sys.argv[1] if len(sys.argv) > 1 else None
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else REQUESTS
+
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(), "carga.db")
+        database_url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False, "timeout": 30} if database_url.startswith("sqlite") else {}
+
+    engine = create_engine(database_url, connect_args=connect_args, pool_size=WORKERS, max_overflow=0)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    vehicle_id = seed(session_factory)
+    with session_factory() as db:
+        id_worker_leaser.acquire(db)
+
+    def initiate(attempt: int) -> str:
+        with session_factory() as db:
+            try:
+                result = PaymentService.initiate_pse_payment(
+                    db, vehicle_id, 247000.0, "1007", f"intento{attempt}@example.com"
+                )
+            except Exception as e:
+                return f"error: {type(e).__name__}"
+            return result.get("message", "creado")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        outcomes = Counter(executor.map(initiate, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    with session_factory() as db:
+        payments = db.scalar(select(func.count(Payment.id)).where(Payment.vehicle_id == vehicle_id))
+
+    print(f"Solicitudes: {requests:,}  Hilos: {WORKERS}  Tiempo: {elapsed:.2f} s")
+    for outcome, count in outcomes.most_common():
+        print(f"  {count:>5}  {outcome}")
+    print(f"Pagos creados: {payments}")
+
+    errors = sum(count for outcome, count in outcomes.items() if outcome.startswith("error"))
+    if payments != 1 or errors:
+        raise SystemExit("Falló: se esperaba un único pago y ningún error")
+
+
+if __name__ == "__main__":
+    main()
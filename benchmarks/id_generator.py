@@ -0,0 +1,61 @@
+"""
+Benchmark: throughput del generador de ids y verificación de unicidad y orden.
+
+Uso:
+    python -m benchmarks.id_generator
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.id_generator import IdGenerator, MAX_WORKER_ID
+
+IDS = 1_000_000
+THREADS = 8
+PROCESSES = 4
+
+
+def generate(worker_id: int, count: int) -> list[int]:
+    generator = IdGenerator(worker_id)
+    return [generator.next_id() for _ in range(count)]
+
+
+def main() -> None:
+    # Un hilo: throughput bruto y orden estrictamente creciente
+    generator = IdGenerator(worker_id=1)
+    start = time.perf_counter()
+    ids = [generator.next_id() for _ in range(IDS)]
+    single_time = time.perf_counter() - start
+    assert all(previous < current for previous, current in zip(ids, ids[1:])), "ids no monotónicos"
+
+    # Varios hilos compartiendo el generador del proceso
+    shared = IdGenerator(worker_id=2)
+    per_thread = IDS // THREADS
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        batches = list(executor.map(
+            lambda _: [shared.next_id() for _ in range(per_thread)], range(THREADS)
+        ))
+    threaded_time = time.perf_counter() - start
+    threaded_ids = [value for batch in batches for value in batch]
+    assert len(set(threaded_ids)) == len(threaded_ids), "ids repetidos entre hilos"
+
+    # Varios procesos, cada uno con su worker_id
+    per_process = IDS // PROCESSES
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=PROCESSES) as executor:
+        batches = list(executor.map(
+            generate, [MAX_WORKER_ID - worker for worker in range(PROCESSES)], [per_process] * PROCESSES
+        ))
+    process_time = time.perf_counter() - start
+    process_ids = [value for batch in batches for value in batch]
+    assert len(set(process_ids)) == len(process_ids), "ids repetidos entre procesos"
+
+    print(f"Ids por escenario: {IDS:,}")
+    print(f"1 hilo:            {single_time:.3f} s  ({IDS / single_time:,.0f} ids/s)")
+    print(f"{THREADS} hilos:           {threaded_time:.3f} s  ({IDS / threaded_time:,.0f} ids/s)")
+    print(f"{PROCESSES} procesos:        {process_time:.3f} s  ({IDS / process_time:,.0f} ids/s, incluye arranque)")
+    print(f"Ejemplo de referencia: {generator.next_reference('PSE')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Pasarela PSE simulada para pruebas de carga locales.
+
+Simula latencia, errores transitorios y el callback asíncrono del banco hacia
+PSE_CALLBACK_URL/{referencia}?status=SUCCESS|REJECTED.
+
+Uso:
+    MOCK_PSE_LATENCY_MS=80 MOCK_PSE_FAILURE_RATE=0.05 \\
+        uvicorn benchmarks.mock_pse_gateway:app --port 9000
+
+Y en la API:
+    PSE_GATEWAY_URL=http://localhost:9000
+    PSE_CALLBACK_URL=http://localhost:8000/api/v1/vehicles/complete-payment
+
+Variables:
+    MOCK_PSE_LATENCY_MS          latencia media por solicitud (default 50)
+    MOCK_PSE_LATENCY_JITTER_MS   variación uniforme de la latencia (default 25)
+    MOCK_PSE_FAILURE_RATE        fracción de solicitudes que responden 503 (default 0.02)
+    MOCK_PSE_APPROVAL_RATE       fracción de pagos aprobados por el banco (default 0.9)
+    MOCK_PSE_CALLBACK_DELAY_MS   tiempo que "tarda" el ciudadano en el banco (default 1000)
+"""
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+LATENCY_MS = float(os.getenv("MOCK_PSE_LATENCY_MS", "50"))
+LATENCY_JITTER_MS = float(os.getenv("MOCK_PSE_LATENCY_JITTER_MS", "25"))
+FAILURE_RATE = float(os.getenv("MOCK_PSE_FAILURE_RATE", "0.02"))
+APPROVAL_RATE = float(os.getenv("MOCK_PSE_APPROVAL_RATE", "0.9"))
+CALLBACK_DELAY_MS = float(os.getenv("MOCK_PSE_CALLBACK_DELAY_MS", "1000"))
+
+BANKS = [
+    {"bank_code": "1001", "bank_name": "Bancolombia", "status": "active"},
+    {"bank_code": "1002", "bank_name": "Banco de Bogotá", "status": "active"},
+    {"bank_code": "1003", "bank_name": "Davivienda", "status": "active"},
+    {"bank_code": "1004", "bank_name": "BBVA", "status": "active"},
+    {"bank_code": "1007", "bank_name": "Banco de Occidente", "status": "active"}
+]
+
+transactions: dict[str, dict] = {}
+stats = {"requests": 0, "injected_failures": 0, "callbacks_sent": 0, "callbacks_failed": 0}
+
+
+class TransactionRequest(BaseModel):
+    reference: str
+    amount: float
+    bank_code: str
+    email: str
+    callback_url: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=200))
+    yield
+    await app.state.http.aclose()
+
+
+app = FastAPI(title="Mock PSE Gateway", lifespan=lifespan)
+
+
+async def simulate_network() -> Optional[JSONResponse]:
+    """Aplica la latencia configurada y, con la probabilidad indicada, un error transitorio"""
+    stats["requests"] += 1
+    latency = max(0.0, LATENCY_MS + random.uniform(-LATENCY_JITTER_MS, LATENCY_JITTER_MS))
+    await asyncio.sleep(latency / 1000)
+    if random.random() < FAILURE_RATE:
+        stats["injected_failures"] += 1
+        return JSONResponse(status_code=503, content={"detail": "PSE no disponible"})
+    return None
+
+
+async def send_callback(transaction: dict) -> None:
+    """Simula al ciudadano terminando en el banco y al banco notificando el resultado"""
+    await asyncio.sleep(CALLBACK_DELAY_MS / 1000 * random.uniform(0.5, 1.5))
+    transaction["status"] = "SUCCESS" if random.random() < APPROVAL_RATE else "REJECTED"
+    if not transaction["callback_url"]:
+        return
+
+    url = f"{transaction['callback_url'].rstrip('/')}/{transaction['reference']}"
+    for attempt in range(3):
+        try:
+            response = await app.state.http.post(url, params={"status": transaction["status"]})
+            if response.status_code < 500:
+                stats["callbacks_sent"] += 1
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5 * (attempt + 1))
+    stats["callbacks_failed"] += 1
+
+
+@app.get("/banks")
+async def list_banks():
+    failure = await simulate_network()
+    return failure or BANKS
+
+
+@app.post("/transactions")
+async def create_transaction(request: TransactionRequest):
+    failure = await simulate_network()
+    if failure:
+        return failure
+
+    # Idempotente por referencia: un reintento recibe la misma transacción
+    transaction = transactions.get(request.reference)
+    if transaction is None:
+        transaction = {
+            **request.model_dump(),
+            "status": "PENDING",
+            "bank_redirect_url": f"https://banco.example.com/pse/{request.bank_code}/{request.reference}"
+        }
+        transactions[request.reference] = transaction
+        asyncio.create_task(send_callback(transaction))
+    return {key: transaction[key] for key in ("reference", "status", "bank_redirect_url")}
+
+
+@app.get("/transactions/{reference}")
+async def get_transaction(reference: str):
+    failure = await simulate_network()
+    if failure:
+        return failure
+    transaction = transactions.get(reference)
+    if transaction is None:
+        raise HTTPException(status_code=404, detail="Transacción no encontrada")
+    return {key: transaction[key] for key in ("reference", "status", "bank_redirect_url")}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "transactions": len(transactions)}
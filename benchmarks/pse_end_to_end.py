@@ -0,0 +1,103 @@
+"""
+Prueba de carga de punta a punta: initiate → callback del banco → complete.
+
+Requiere la API y la pasarela simulada en ejecución (ver benchmarks/mock_pse_gateway.py)
+y una base de datos con vehículos cargados; toma los vehículos desde DATABASE_URL.
+
+Uso:
+    python -m benchmarks.pse_end_to_end [API_URL] [PAGOS] [CONCURRENCIA]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.models.vehicle import Vehicle
+
+API_URL = "http://localhost:8000/api/v1"
+PAYMENTS = 500
+CONCURRENCY = 50
+COMPLETION_TIMEOUT_SECONDS = 60
+
+
+def load_vehicles(limit: int) -> list[dict]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Vehicle.plate, User.document_type_id, User.document_number)
+            .join(User, Vehicle.owner_id == User.id)
+            .order_by(Vehicle.id)
+            .limit(limit)
+        ).all()
+    return [
+        {"plate": row.plate, "document_type": str(row.document_type_id), "document_number": row.document_number}
+        for row in rows
+    ]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main() -> None:
+    api_url = sys.argv[1] if len(sys.argv) > 1 else API_URL
+    payments = int(sys.argv[2]) if len(sys.argv) > 2 else PAYMENTS
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else CONCURRENCY
+
+    vehicles = load_vehicles(payments)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transaction_ids = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=30.0,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def initiate(vehicle: dict) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/vehicles/initiate-payment", json={
+                    **vehicle, "bank_code": "1007", "email": "carga@example.com"
+                })
+                latencies.append(time.perf_counter() - start)
+            if response.status_code == 200:
+                transaction_ids.append(response.json()["transaction_id"])
+            else:
+                errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(initiate(vehicle) for vehicle in vehicles))
+        initiate_time = time.perf_counter() - start
+
+        # Esperar a que los callbacks del banco cierren todos los pagos
+        pending = set(transaction_ids)
+        statuses = {}
+        deadline = time.monotonic() + COMPLETION_TIMEOUT_SECONDS
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            for transaction_id in list(pending):
+                async with semaphore:
+                    response = await client.get(f"/vehicles/payment-status/{transaction_id}")
+                status = response.json().get("status") if response.status_code == 200 else None
+                if status in ("completed", "failed"):
+                    statuses[transaction_id] = status
+                    pending.discard(transaction_id)
+        total_time = time.perf_counter() - start
+
+    print(f"Pagos: {len(vehicles):,}  Concurrencia: {concurrency}")
+    print(f"Inicio: {initiate_time:.2f} s ({len(vehicles) / initiate_time:,.1f} pagos/s), errores: {errors}")
+    if latencies:
+        print(f"Latencia initiate: p50 {statistics.median(latencies) * 1000:.1f} ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+    completed = sum(1 for status in statuses.values() if status == "completed")
+    print(f"Cerrados: {len(statuses):,} (completados {completed:,}), sin cerrar: {len(pending):,}")
+    print(f"Tiempo total de punta a punta: {total_time:.2f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Benchmark: throughput de la generación masiva de estados de cuenta (render en procesos + ZIP en streaming).
+Usa estados de cuenta sintéticos, así mide solo el renderizado y el empaquetado.
+Requiere app/static/logo.png. Objetivo de referencia: 500 PDFs/s con 16 workers.
+
+Uso:
+    python -m benchmarks.statement_batch [PDFS] [WORKERS] [CHUNK_SIZE]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+from app.services.pdf_service import PDFService
+from app.services.statement_batch_service import StatementBatchService
+
+PDFS = 5000
+CHUNK_SIZE = 250
+
+
+def synthetic_chunks(count: int, chunk_size: int):
+    statements = [
+        (
+            {"plate": f"BEN{position:06d}", "brand": "Renault", "model": "Logan", "year": 2018},
+            {"tax_year": 2025, "total_amount": 350000.0 + position, "tax_status": "pending",
+             "due_date": date(2025, 6, 30), "statement_date": date(2025, 1, 15)}
+        )
+        for position in range(count)
+    ]
+    for start in range(0, count, chunk_size):
+        yield start + chunk_size, statements[start:start + chunk_size]
+
+
+def main() -> None:
+    pdfs = int(sys.argv[1]) if len(sys.argv) > 1 else PDFS
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else CHUNK_SIZE
+
+    # Referencia: un PDF en el proceso actual
+    vehicle_info, tax_info = next(synthetic_chunks(1, 1))[1][0]
+    start = time.perf_counter()
+    for _ in range(50):
+        PDFService.render_account_statement(vehicle_info, tax_info)
+    single_ms = (time.perf_counter() - start) / 50 * 1000
+
+    start = time.perf_counter()
+    zip_bytes = 0
+    for data in StatementBatchService.stream_zip(
+            StatementBatchService.render_chunks(synthetic_chunks(pdfs, chunk_size), workers=workers)
+    ):
+        zip_bytes += len(data)
+    elapsed = time.perf_counter() - start
+
+    print(f"PDFs: {pdfs:,}  Workers: {workers}  Bloque: {chunk_size}")
+    print(f"Un PDF en proceso: {single_ms:.2f} ms ({1000 / single_ms:,.0f} PDFs/s por núcleo)")
+    print(f"Lote: {elapsed:.2f} s  ({pdfs / elapsed:,.1f} PDFs/s, incluye arranque de procesos)")
+    print(f"ZIP: {zip_bytes / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
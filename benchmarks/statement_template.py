@@ -0,0 +1,93 @@
+"""
+Benchmark: latencia y memoria por PDF del estado de cuenta, con y sin la plantilla del proceso.
+"Sin plantilla" construye AccountStatementTemplate en cada PDF: abre y decodifica el logo y
+diagrama la página completa, como hacía cada llamada antes de la plantilla.
+"Con plantilla" reutiliza get_statement_template() y solo escribe los campos variables.
+La memoria es el pico asignado durante un PDF, medido con tracemalloc en una pasada aparte;
+incluye el estado interno de zlib al comprimir la página, común a ambas variantes.
+Requiere app/static/logo.png.
+
+Uso:
+    python -m benchmarks.statement_template [PDFS]
+"""
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from app.services.pdf_service import AccountStatementTemplate, get_statement_template
+
+PDFS = 2000
+ALLOCATION_SAMPLES = 200
+ROUND_SIZE = 100
+
+VEHICLE_INFO = {"plate": "BEN001", "brand": "Renault", "model": "Logan", "year": 2018}
+TAX_INFO = {"tax_year": 2025, "total_amount": 350000.0, "tax_status": "pending", "due_date": date(2025, 6, 30),
+            "statement_date": date(2025, 1, 15)}
+
+
+def render_without_template() -> bytes:
+    return AccountStatementTemplate().render(VEHICLE_INFO, TAX_INFO)
+
+
+def render_with_template() -> bytes:
+    return get_statement_template().render(VEHICLE_INFO, TAX_INFO)
+
+
+def measure_latencies(renders: list, pdfs: int) -> list[list[float]]:
+    """Latencia por PDF en ms; las variantes se alternan por rondas para repartir el ruido de la máquina"""
+    latencies = [[] for _ in renders]
+    for _ in range(max(pdfs // ROUND_SIZE, 1)):
+        for position, render in enumerate(renders):
+            for _ in range(ROUND_SIZE):
+                start = time.perf_counter()
+                render()
+                latencies[position].append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def measure_peak_kib(render) -> float:
+    peaks = []
+    tracemalloc.start()
+    for _ in range(ALLOCATION_SAMPLES):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        render()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return statistics.mean(peaks) / 1024
+
+
+def summarize(latencies: list[float], peak_kib: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "pdfs_per_second": len(latencies) / (sum(latencies) / 1000),
+        "peak_kib": peak_kib
+    }
+
+
+def main() -> None:
+    pdfs = int(sys.argv[1]) if len(sys.argv) > 1 else PDFS
+
+    # Calentamiento: carga de métricas de fuentes y construcción de la plantilla del proceso
+    render_without_template()
+    render_with_template()
+
+    latencies = measure_latencies([render_without_template, render_with_template], pdfs)
+    before = summarize(latencies[0], measure_peak_kib(render_without_template))
+    after = summarize(latencies[1], measure_peak_kib(render_with_template))
+
+    print(f"PDFs: {pdfs:,}  Muestras de memoria: {ALLOCATION_SAMPLES}")
+    for label, result in (("Sin plantilla", before), ("Con plantilla", after)):
+        print(
+            f"{label}: mediana {result['median_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms  "
+            f"({result['pdfs_per_second']:,.0f} PDFs/s)  pico {result['peak_kib']:.1f} KiB"
+        )
+    print(f"Aceleración (mediana): {before['median_ms'] / after['median_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: búsqueda de tramo de tarifa lineal vs índice compilado (bisect).
+
+Uso:
+    python -m benchmarks.tax_rate_lookup
+"""
+import random
+import time
+
+from app.models.tax_rate import TaxRate
+from app.models.vehicle import VehicleType
+from app.services.tax_service import TaxService
+
+BRACKETS = 10_000
+LOOKUPS = 1_000_000
+BRACKET_WIDTH = 10_000_000
+
+
+def build_tax_rates() -> list[TaxRate]:
+    """Genera tramos contiguos repartidos entre los tipos de vehículo"""
+    vehicle_types = list(VehicleType)
+    tax_rates = []
+    for i in range(BRACKETS):
+        position = i // len(vehicle_types)
+        tax_rates.append(TaxRate(
+            vehicle_type=vehicle_types[i % len(vehicle_types)],
+            min_value=position * BRACKET_WIDTH + 1,
+            max_value=(position + 1) * BRACKET_WIDTH,
+            rate=1.0 + (position % 30) / 10,
+            year=2024
+        ))
+    return tax_rates
+
+
+def main() -> None:
+    random.seed(42)
+    tax_rates = build_tax_rates()
+    max_value = (BRACKETS // len(VehicleType)) * BRACKET_WIDTH
+    queries = [
+        (random.uniform(1, max_value), random.choice(list(VehicleType)))
+        for _ in range(LOOKUPS)
+    ]
+
+    start = time.perf_counter()
+    index = TaxService.build_rate_index(tax_rates)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value, vehicle_type in queries:
+        index.lookup(value, vehicle_type)
+    indexed_time = time.perf_counter() - start
+
+    # El recorrido lineal es demasiado lento para 1M búsquedas: se mide una muestra y se extrapola
+    sample = queries[:2_000]
+    start = time.perf_counter()
+    for value, _ in sample:
+        TaxService.scan_tax_rates(value, tax_rates)
+    linear_time = (time.perf_counter() - start) * (LOOKUPS / len(sample))
+
+    print(f"Tramos: {len(tax_rates):,}  Búsquedas: {LOOKUPS:,}")
+    print(f"Compilación del índice: {build_time * 1000:.1f} ms")
+    print(f"Índice (bisect):        {indexed_time:.2f} s")
+    print(f"Recorrido lineal (est): {linear_time:.2f} s")
+    print(f"Aceleración:            {linear_time / indexed_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+
+# Settings exige estas variables; las pruebas usan SQLite y nunca se conectan al motor configurado
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-enough-length-for-hs256")
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+# Las pruebas no arrancan la aplicación: el generador de referencias usa un worker fijo
+os.environ.setdefault("ID_GENERATOR_WORKER_ID", "1")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.models.base import Base
+from app.services.consult_cache import consult_cache
+from app.services.tax_period_cache import tax_period_cache
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(engine) -> list[str]:
+    """Sentencias SQL ejecutadas sobre el motor de pruebas, en orden"""
+    executed = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    return executed
+
+
+@pytest.fixture
+def async_session_factory(engine, statements):
+    """Sesiones aiosqlite sobre la misma base de datos; sin pool porque cada prueba corre su propio event loop"""
+    async_engine = create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine, autoflush=False) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    # Los caches del proceso sobreviven entre pruebas; cada prueba usa una base de datos nueva
+    tax_period_cache.invalidate()
+    consult_cache.clear()
+    yield
+    tax_period_cache.invalidate()
+    consult_cache.clear()
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session
+
+from app.models import DocumentType, Payment, TaxPeriod, TaxRate, User, Vehicle
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.models.vehicle import VehicleType
+
+YEAR = 2025
+
+
+DEFAULT_BRACKETS = [(VehicleType.PARTICULAR, 0, None, 1.5), (VehicleType.PUBLIC, 0, None, 0.5),
+                    (VehicleType.MOTORCYCLE, 0, None, 1.0)]
+
+
+def create_tax_period(db: Session, year: int = YEAR, is_active: bool = True, brackets=DEFAULT_BRACKETS) -> TaxPeriod:
+    """Período fiscal con sus tramos (tipo, mínimo, máximo, tasa); por defecto uno abierto por tipo"""
+    tax_period = TaxPeriod(
+        year=year, start_date=date(year, 1, 1), end_date=date(year, 12, 31), due_date=date(year, 6, 30),
+        traffic_light_fee=87000.0, min_penalty_uvt=7, uvt_value=47065.0, is_active=is_active
+    )
+    db.add(tax_period)
+    db.flush()
+    for vehicle_type, min_value, max_value, rate in brackets:
+        db.add(TaxRate(vehicle_type=vehicle_type, min_value=min_value, max_value=max_value, rate=rate, year=year,
+                       tax_period_id=tax_period.id))
+    db.flush()
+    return tax_period
+
+
+def create_owner(db: Session, document_number: str = "1010101010") -> User:
+    document_type = db.get(DocumentType, 1)
+    if document_type is None:
+        document_type = DocumentType(id=1, code="CC", name="Cédula de ciudadanía")
+        db.add(document_type)
+        db.flush()
+    owner = User(email=f"{document_number}@example.com", full_name=f"Propietario {document_number}",
+                 hashed_password="x", document_type_id=document_type.id, document_number=document_number)
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+def create_vehicle(db: Session, owner: User, plate: str, **values) -> Vehicle:
+    vehicle = Vehicle(**{
+        "plate": plate, "brand": "Renault", "model": "Logan", "year": 2020,
+        "vehicle_type": VehicleType.PARTICULAR, "commercial_value": 45_000_000.0,
+        "registration_date": date(2020, 3, 1), "city": "Cali", "owner_id": owner.id,
+        "current_appraisal": 45_000_000.0, "appraisal_year": YEAR, **values
+    })
+    db.add(vehicle)
+    db.flush()
+    return vehicle
+
+
+def create_payment(db: Session, vehicle: Vehicle, tax_period: TaxPeriod, **values) -> Payment:
+    payment = Payment(**{
+        "vehicle_id": vehicle.id, "tax_period_id": tax_period.id, "tax_year": tax_period.year,
+        "amount": 762_000.0, "due_date": datetime.combine(tax_period.due_date, datetime.min.time()),
+        "status": PaymentStatus.PENDING, "process_status": PaymentProcessStatus.INITIATED, **values
+    })
+    db.add(payment)
+    db.flush()
+    return payment
@@ -0,0 +1,82 @@
+import random
+from datetime import date
+
+import pytest
+
+from app.models.tax_period import TaxPeriod
+from app.models.tax_rate import TaxRate
+from app.models.vehicle import Vehicle, VehicleType
+from app.services.batch_tax_service import BatchTaxService
+from app.services.tax_service import TaxService
+from app.services.vehicle_service import VehicleService
+
+YEAR = 2025
+
+
+def build_tax_period() -> TaxPeriod:
+    return TaxPeriod(
+        id=1, year=YEAR, start_date=date(YEAR, 1, 1), end_date=date(YEAR, 12, 31), due_date=date(YEAR, 6, 30),
+        traffic_light_fee=87000.0, min_penalty_uvt=7, uvt_value=47065.0, is_active=True
+    )
+
+
+def build_tax_rates() -> list[TaxRate]:
+    """Tramos contiguos por tipo, con un hueco entre tramos y un último tramo abierto"""
+    brackets = {
+        VehicleType.PARTICULAR: [(0, 54_000_000, 1.5), (54_000_001, 121_000_000, 2.5), (121_000_001, None, 3.5)],
+        VehicleType.PUBLIC: [(0, 80_000_000, 0.5), (80_000_101, None, 1.0)],
+        VehicleType.MOTORCYCLE: [(None, 10_000_000, 1.0), (10_000_001, None, 1.5)]
+    }
+    return [
+        TaxRate(vehicle_type=vehicle_type, min_value=min_value, max_value=max_value, rate=rate,
+                year=YEAR, tax_period_id=1, additional_rate=0.0)
+        for vehicle_type, ranges in brackets.items()
+        for min_value, max_value, rate in ranges
+    ]
+
+
+def build_vehicles(count: int) -> list[Vehicle]:
+    random.seed(7)
+    # Valores en los bordes de los tramos y dentro del hueco sin tarifa, más valores al azar con centavos
+    edges = [0, 1, 54_000_000, 54_000_001, 80_000_000, 80_000_050, 80_000_101, 121_000_000, 121_000_001,
+             10_000_000, 10_000_001, 999_999_999.99]
+    vehicles = []
+    for position in range(count):
+        is_electric = position % 7 == 0
+        value = edges[position] if position < len(edges) else round(random.uniform(1_000_000, 400_000_000), 2)
+        vehicles.append(Vehicle(
+            plate=f"TST{position:03d}",
+            vehicle_type=list(VehicleType)[position % len(VehicleType)],
+            commercial_value=value,
+            is_electric=is_electric,
+            is_hybrid=not is_electric and position % 3 == 0,
+            is_new=position % 5 == 0,
+            registration_date=date(2024, position % 12 + 1, 1)
+        ))
+    return vehicles
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_batch_matches_scalar_calculation_to_the_cent(compiled):
+    tax_period = build_tax_period()
+    tax_rates = build_tax_rates()
+    if compiled:
+        tax_rates = TaxService.build_rate_index(tax_rates, tax_period.id)
+    vehicles = build_vehicles(2000)
+
+    batch = BatchTaxService.calculate_vehicles_tax(vehicles, tax_period, tax_rates)
+
+    for position, vehicle in enumerate(vehicles):
+        expected = VehicleService.calculate_total_tax_amount(vehicle, tax_period, tax_rates)
+        for column in ("base_tax", "traffic_light_fee", "total_amount"):
+            assert round(float(batch[column][position]) * 100) == round(expected[column] * 100), (
+                vehicle.plate, vehicle.commercial_value, column
+            )
+
+
+def test_batch_without_tax_period_only_returns_zeros():
+    vehicles = build_vehicles(10)
+
+    batch = BatchTaxService.calculate_vehicles_tax(vehicles, None, build_tax_rates())
+
+    assert batch["total_amount"].tolist() == [0.0] * len(vehicles)
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import update
+
+from app.core import id_generator
+from app.core.id_generator import WorkerNotAssignedError, next_reference
+from app.models import IdWorkerLease
+from app.services.id_worker_lease import IdWorkerLeaser
+
+
+@pytest.fixture(autouse=True)
+def restore_worker():
+    yield
+    id_generator._configured_worker()
+
+
+def test_each_process_leases_a_distinct_worker_id(db):
+    first = IdWorkerLeaser(lease_seconds=300)
+    second = IdWorkerLeaser(lease_seconds=300)
+
+    assert first.acquire(db) == 0
+    assert second.acquire(db) == 1
+    assert id_generator.id_generator.worker_id == 1
+
+    first.release(db)
+    assert IdWorkerLeaser(lease_seconds=300).acquire(db) == 0
+
+
+def test_references_fail_without_a_worker():
+    id_generator.unassign_worker()
+
+    with pytest.raises(WorkerNotAssignedError):
+        next_reference("PSE")
+
+
+def test_references_fail_once_the_lease_lapses():
+    id_generator.assign_worker(3, valid_for_seconds=-1)
+
+    with pytest.raises(WorkerNotAssignedError):
+        next_reference("PSE")
+
+
+def test_lost_lease_stops_the_generator(db):
+    leaser = IdWorkerLeaser(lease_seconds=300)
+    leaser.acquire(db)
+    db.execute(update(IdWorkerLease).values(holder="otro-proceso"))
+    db.commit()
+
+    with pytest.raises(RuntimeError):
+        leaser.renew(db)
+    with pytest.raises(WorkerNotAssignedError):
+        next_reference("PSE")
@@ -0,0 +1,94 @@
+import asyncio
+import random
+from datetime import date
+
+from sqlalchemy import select
+
+from app.models.vehicle import Vehicle, VehicleType
+from app.services.batch_tax_service import BatchTaxService
+from app.services.tax_period_cache import tax_period_cache
+from app.services.vehicle_service import VehicleService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+BRACKETS = [
+    (VehicleType.PARTICULAR, 0, 54_000_000, 1.5),
+    (VehicleType.PARTICULAR, 54_000_001, 121_000_000, 2.5),
+    (VehicleType.PARTICULAR, 121_000_001, None, 3.5),
+    (VehicleType.PUBLIC, 0, 80_000_000, 0.5),
+    (VehicleType.PUBLIC, 80_000_101, None, 1.0),
+    (VehicleType.MOTORCYCLE, None, 10_000_000, 1.0),
+    (VehicleType.MOTORCYCLE, 10_000_001, None, 1.5)
+]
+
+
+def seed_fleet(db, count: int = 120):
+    random.seed(11)
+    tax_period = create_tax_period(db, brackets=BRACKETS)
+    owner = create_owner(db)
+    other_owner = create_owner(db, document_number="2020202020")
+    for position in range(count):
+        is_electric = position % 7 == 0
+        vehicle = create_vehicle(
+            db, owner, f"FLT{position:03d}",
+            vehicle_type=list(VehicleType)[position % len(VehicleType)],
+            commercial_value=80_000_050.0 if position == 1 else round(random.uniform(1_000_000, 300_000_000), 2),
+            is_electric=is_electric,
+            is_hybrid=not is_electric and position % 3 == 0,
+            is_new=position % 5 == 0,
+            registration_date=date(2024, position % 12 + 1, 1)
+        )
+        if position % 4 == 0:
+            create_payment(db, vehicle, tax_period, amount=1000.0 + position)
+    create_payment(db, create_vehicle(db, other_owner, "OTR001"), tax_period)
+    db.commit()
+    return owner, tax_period
+
+
+def test_sql_base_tax_matches_batch_calculation(db):
+    seed_fleet(db)
+    tax_period, tax_rates = tax_period_cache.get(db)
+
+    rows = db.execute(select(
+        Vehicle.vehicle_type, Vehicle.commercial_value, Vehicle.is_electric, Vehicle.is_hybrid,
+        Vehicle.is_new, Vehicle.registration_date,
+        BatchTaxService.sql_base_tax(tax_rates).label("sql_base_tax"),
+        BatchTaxService.sql_traffic_light_fee(tax_period).label("sql_traffic_light_fee")
+    ).order_by(Vehicle.id)).all()
+    batch = BatchTaxService.calculate_vehicles_tax(rows, tax_period, tax_rates)
+
+    assert [round(float(row.sql_base_tax) * 100) for row in rows] == \
+        [round(value * 100) for value in batch["base_tax"].tolist()]
+    assert [float(row.sql_traffic_light_fee) for row in rows] == batch["traffic_light_fee"].tolist()
+
+
+def test_portfolio_totals_are_aggregated_in_one_statement(db, async_session_factory, statements):
+    owner, _ = seed_fleet(db)
+    document_number = owner.document_number
+    tax_period_cache.get(db)
+    statements.clear()
+
+    async def fetch_all_pages():
+        async with async_session_factory() as session:
+            pages, after_id = [], None
+            while True:
+                page, error = await VehicleService.get_owner_portfolio_async(
+                    session, "1", document_number, after_id=after_id, limit=50
+                )
+                assert error is None
+                pages.append(page)
+                after_id = page["next_after_id"]
+                if after_id is None:
+                    return pages
+
+    pages = asyncio.run(fetch_all_pages())
+    items = [item for page in pages for item in page["items"]]
+    totals = pages[0]["totals"]
+
+    assert [page["totals"] is None for page in pages] == [False, True, True]
+    assert totals["vehicles"] == len(items) == 120
+    assert round(totals["base_tax"], 2) == round(sum(item["base_tax"] for item in items), 2)
+    assert round(totals["total_amount"], 2) == round(sum(item["total_amount"] for item in items), 2)
+    assert totals["pending_payments"] == 30
+    assert totals["pending_amount"] == round(sum(item["pending_amount"] for item in items), 2)
+    # Por página: la página con sus pendientes y, solo en la primera, los totales
+    assert len(statements) == 4
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.models import Payment
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.services.payment_cart_service import PaymentCartService
+from app.services.payment_service import PaymentService
+from tests.factories import YEAR, create_owner, create_tax_period, create_vehicle
+
+PREVIOUS_YEAR = YEAR - 1
+
+
+@pytest.fixture
+def owner(db):
+    create_tax_period(db, year=PREVIOUS_YEAR, is_active=False)
+    create_tax_period(db)
+    owner = create_owner(db)
+    create_vehicle(db, owner, "ABC123")
+    db.commit()
+    return owner
+
+
+def initiate_cart(db, owner, years: list[int]) -> str:
+    return PaymentCartService.initiate_cart_payment(
+        db, "1", owner.document_number, [("ABC123", year) for year in years], "1007", "titular@example.com"
+    )["transaction_id"]
+
+
+def expire(db, transaction_id: str) -> None:
+    db.execute(
+        update(Payment)
+        .where(Payment.pse_transaction_id == transaction_id)
+        .values(status=PaymentStatus.FAILED, process_status=PaymentProcessStatus.EXPIRED, version=Payment.version + 1)
+    )
+    db.commit()
+
+
+def test_late_approval_of_an_earlier_cart_completes_all_its_payments(db, owner):
+    first = initiate_cart(db, owner, [PREVIOUS_YEAR, YEAR])
+    expire(db, first)
+    # El nuevo carrito toma solo una de las vigencias del anterior
+    second = initiate_cart(db, owner, [YEAR])
+
+    PaymentService.complete_pse_payment(db, first, "SUCCESS")
+
+    payments = db.scalars(select(Payment).order_by(Payment.tax_year)).all()
+    assert [payment.status for payment in payments] == [PaymentStatus.COMPLETED, PaymentStatus.COMPLETED]
+    assert {payment.pse_transaction_id for payment in payments} == {first}
+    assert PaymentService.get_payment_status(db, second)["status"] == PaymentStatus.COMPLETED.value
+
+
+def test_rejection_of_an_earlier_cart_leaves_the_moved_payment_pending(db, owner):
+    first = initiate_cart(db, owner, [PREVIOUS_YEAR, YEAR])
+    expire(db, first)
+    second = initiate_cart(db, owner, [YEAR])
+
+    PaymentService.complete_pse_payment(db, first, "REJECTED")
+
+    moved = db.scalars(select(Payment).where(Payment.tax_year == YEAR)).one()
+    assert moved.process_status == PaymentProcessStatus.PENDING_PSE
+    assert moved.pse_transaction_id == second
+
+
+def test_cart_with_a_payment_in_progress_is_rejected_whole(db, owner):
+    first = initiate_cart(db, owner, [YEAR])
+
+    with pytest.raises(ValueError, match=f"ABC123 {YEAR}"):
+        initiate_cart(db, owner, [PREVIOUS_YEAR, YEAR])
+
+    payments = db.scalars(select(Payment)).all()
+    assert [(payment.tax_year, payment.pse_transaction_id) for payment in payments] == [(YEAR, first)]
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Payment, PaymentStatusLog
+from app.services import payment_service
+from app.services.payment_service import PaymentService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+INITIATIONS = 16
+
+
+def test_concurrent_initiations_create_a_single_payment(engine, db):
+    create_tax_period(db)
+    vehicle = create_vehicle(db, create_owner(db), "ABC123")
+    db.commit()
+    vehicle_id = vehicle.id
+
+    concurrent_engine = create_engine(engine.url, connect_args={"check_same_thread": False, "timeout": 30})
+    session_factory = sessionmaker(bind=concurrent_engine, autoflush=False)
+    # Todas las solicitudes arrancan a la vez para que compitan por el mismo vehículo y período
+    barrier = threading.Barrier(INITIATIONS)
+
+    def initiate(attempt: int) -> dict:
+        with session_factory() as session:
+            barrier.wait()
+            return PaymentService.initiate_pse_payment(
+                session, vehicle_id, 762_000.0, "1007", f"intento{attempt}@example.com"
+            )
+
+    try:
+        with ThreadPoolExecutor(max_workers=INITIATIONS) as executor:
+            results = list(executor.map(initiate, range(INITIATIONS)))
+    finally:
+        concurrent_engine.dispose()
+
+    assert db.scalar(select(func.count(Payment.id))) == 1
+    assert db.scalar(select(func.count(PaymentStatusLog.id))) == 1
+    assert len({result["transaction_id"] for result in results}) == 1
+    assert sum("message" not in result for result in results) == 1
+
+
+def test_other_unique_violations_are_not_taken_as_an_existing_payment(db, monkeypatch):
+    tax_period = create_tax_period(db)
+    owner = create_owner(db)
+    create_payment(db, create_vehicle(db, owner, "ABC123"), tax_period, invoice_number="INV-PSE-1")
+    vehicle = create_vehicle(db, owner, "XYZ789")
+    db.commit()
+    vehicle_id = vehicle.id
+    monkeypatch.setattr(payment_service, "next_reference", lambda prefix: f"{prefix}-1")
+
+    with pytest.raises(IntegrityError):
+        PaymentService.initiate_pse_payment(db, vehicle_id, 762_000.0, "1007", "titular@example.com")
+
+    assert db.scalar(select(func.count(Payment.id)).where(Payment.vehicle_id == vehicle_id)) == 0
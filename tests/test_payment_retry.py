@@ -0,0 +1,106 @@
+from sqlalchemy import select, update
+
+from app.models import Payment, PaymentAttempt
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.services.payment_service import PaymentService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+
+def expire(db, transaction_id: str) -> None:
+    """Marca el pago como lo hace el barrido de expiración"""
+    db.execute(
+        update(Payment)
+        .where(Payment.pse_transaction_id == transaction_id)
+        .values(status=PaymentStatus.FAILED, process_status=PaymentProcessStatus.EXPIRED, version=Payment.version + 1)
+    )
+    db.commit()
+
+
+def initiate(db, vehicle_id: int) -> str:
+    return PaymentService.initiate_pse_payment(db, vehicle_id, 762_000.0, "1007", "titular@example.com")[
+        "transaction_id"
+    ]
+
+
+def setup_vehicle(db) -> int:
+    create_tax_period(db)
+    vehicle = create_vehicle(db, create_owner(db), "ABC123")
+    db.commit()
+    return vehicle.id
+
+
+def test_retry_keeps_the_superseded_reference_resolvable(db):
+    vehicle_id = setup_vehicle(db)
+    first = initiate(db, vehicle_id)
+    expire(db, first)
+
+    second = initiate(db, vehicle_id)
+
+    assert second != first
+    payment = db.scalars(select(Payment)).one()
+    assert payment.pse_transaction_id == second
+    assert payment.process_status == PaymentProcessStatus.PENDING_PSE
+    assert sorted(db.scalars(select(PaymentAttempt.reference))) == sorted([first, second])
+    assert PaymentService.get_payment_status(db, first)["status"] == PaymentStatus.FAILED.value
+    assert PaymentService.get_payment_status(db, second)["status"] == PaymentStatus.PENDING.value
+
+
+def test_late_approval_of_a_superseded_reference_completes_the_payment(db):
+    vehicle_id = setup_vehicle(db)
+    first = initiate(db, vehicle_id)
+    expire(db, first)
+    second = initiate(db, vehicle_id)
+
+    result = PaymentService.complete_pse_payment(db, first, "SUCCESS")
+
+    assert result["status"] == PaymentStatus.COMPLETED.value
+    payment = db.scalars(select(Payment)).one()
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.pse_transaction_id == first
+    assert PaymentService.get_payment_status(db, second)["status"] == PaymentStatus.COMPLETED.value
+
+
+def test_late_approval_of_an_expired_payment_completes_it(db):
+    vehicle_id = setup_vehicle(db)
+    reference = initiate(db, vehicle_id)
+    expire(db, reference)
+
+    PaymentService.complete_pse_payment(db, reference, "SUCCESS")
+
+    assert db.scalars(select(Payment)).one().process_status == PaymentProcessStatus.COMPLETED
+
+
+def test_rejection_of_a_superseded_reference_leaves_the_current_attempt_pending(db):
+    vehicle_id = setup_vehicle(db)
+    first = initiate(db, vehicle_id)
+    expire(db, first)
+    second = initiate(db, vehicle_id)
+
+    PaymentService.complete_pse_payment(db, first, "REJECTED")
+
+    payment = db.scalars(select(Payment)).one()
+    assert payment.process_status == PaymentProcessStatus.PENDING_PSE
+    assert payment.pse_transaction_id == second
+
+
+def test_payment_in_progress_is_not_retried(db):
+    vehicle_id = setup_vehicle(db)
+    reference = initiate(db, vehicle_id)
+
+    result = PaymentService.initiate_pse_payment(db, vehicle_id, 762_000.0, "1007", "titular@example.com")
+
+    assert result["transaction_id"] == reference
+    assert result["message"] == "Ya existe un pago en curso para este vehículo"
+    assert len(db.scalars(select(PaymentAttempt)).all()) == 1
+
+
+def test_payment_started_before_attempts_were_recorded_is_still_resolved(db):
+    tax_period = create_tax_period(db)
+    vehicle = create_vehicle(db, create_owner(db), "ABC123")
+    create_payment(db, vehicle, tax_period, process_status=PaymentProcessStatus.PENDING_PSE,
+                   pse_transaction_id="PSE-LEGACY", bank_reference="PSE-LEGACY")
+    db.commit()
+
+    result = PaymentService.complete_pse_payment(db, "PSE-LEGACY", "SUCCESS")
+
+    assert result["status"] == PaymentStatus.COMPLETED.value
@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import date
+
+from app.services.pdf_cache import StatementPDFCache
+
+CONTENT = b"%PDF-" + b"x" * 995
+
+
+def worker_cache(directory, entries: int = 4, rescan_seconds: float = 0) -> StatementPDFCache:
+    """Cache de un worker de la API sobre el directorio compartido"""
+    return StatementPDFCache(
+        str(directory), max_bytes=entries * len(CONTENT), ttl_seconds=3600, rescan_seconds=rescan_seconds
+    )
+
+
+def disk_usage(directory) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names
+    )
+
+
+def test_cap_holds_for_the_shared_directory(tmp_path):
+    workers = [worker_cache(tmp_path) for _ in range(3)]
+
+    for position in range(12):
+        workers[position % 3].set(position, f"k{position}", CONTENT)
+
+    assert disk_usage(tmp_path) <= 4 * len(CONTENT)
+
+
+def test_entries_written_by_another_worker_are_served(tmp_path):
+    writer, reader = worker_cache(tmp_path), worker_cache(tmp_path)
+    writer.set(1, "k1", CONTENT)
+
+    assert reader.get(1, "k1") == CONTENT
+    assert reader.stats()["hits"] == 1
+
+
+def test_eviction_follows_use_across_workers(tmp_path):
+    writer, reader = worker_cache(tmp_path, entries=2), worker_cache(tmp_path, entries=2)
+    writer.set(1, "k1", CONTENT)
+    writer.set(2, "k2", CONTENT)
+    stale = time.time() - 60
+    for vehicle_id, key in ((1, "k1"), (2, "k2")):
+        os.utime(writer._path(vehicle_id, key), (stale, stale))
+
+    # Otro worker usa k1: su mtime se renueva y la expulsión recae sobre k2
+    assert reader.get(1, "k1") == CONTENT
+    writer.set(3, "k3", CONTENT)
+
+    assert os.path.exists(writer._path(1, "k1"))
+    assert not os.path.exists(writer._path(2, "k2"))
+
+
+def test_statement_date_is_part_of_the_key():
+    vehicle_info = {"id": 1, "plate": "ABC123"}
+    tax_info = {"tax_year": 2025, "total_amount": 350000.0, "due_date": date(2025, 6, 30)}
+
+    today = StatementPDFCache.make_key(vehicle_info, {**tax_info, "statement_date": date(2025, 1, 15)}, "v1")
+    tomorrow = StatementPDFCache.make_key(vehicle_info, {**tax_info, "statement_date": date(2025, 1, 16)}, "v1")
+
+    assert today != tomorrow
+
+
+def test_rescan_walks_the_directory_without_holding_the_lock(tmp_path):
+    cache = worker_cache(tmp_path)
+    scan = cache._scan
+    lock_held = []
+
+    def observed_scan():
+        lock_held.append(cache._lock.locked())
+        return scan()
+
+    cache._scan = observed_scan
+    cache.set(1, "k1", CONTENT)
+
+    assert lock_held == [False]
+    assert cache.stats()["entries"] == 1
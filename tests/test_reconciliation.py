@@ -0,0 +1,95 @@
+import io
+
+from sqlalchemy import select, update
+
+from app.models import Payment
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.services.payment_service import PaymentService
+from app.services.reconciliation_service import ReconciliationService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+
+def settlement(*rows: str) -> io.StringIO:
+    return io.StringIO("\n".join(["transaction_id,bank_reference,status", *rows]) + "\n")
+
+
+def initiate(db) -> str:
+    create_tax_period(db)
+    vehicle = create_vehicle(db, create_owner(db), "ABC123")
+    db.commit()
+    return PaymentService.initiate_pse_payment(db, vehicle.id, 762_000.0, "1007", "titular@example.com")[
+        "transaction_id"
+    ]
+
+
+def expire(db, transaction_id: str) -> None:
+    db.execute(
+        update(Payment)
+        .where(Payment.pse_transaction_id == transaction_id)
+        .values(status=PaymentStatus.FAILED, process_status=PaymentProcessStatus.EXPIRED, version=Payment.version + 1)
+    )
+    db.commit()
+
+
+def test_settled_expired_payment_is_completed(db):
+    reference = initiate(db)
+    expire(db, reference)
+
+    report = ReconciliationService.reconcile_file(db, settlement(f"{reference},{reference},SUCCESS"))
+
+    assert report["completed"] == 1
+    assert report["already_processed"] == 0
+    assert db.scalars(select(Payment)).one().process_status == PaymentProcessStatus.COMPLETED
+
+
+def test_payment_matched_by_transaction_id_and_bank_reference_is_a_duplicate(db):
+    reference = initiate(db)
+
+    report = ReconciliationService.reconcile_file(
+        db, settlement(f"{reference},,SUCCESS", f"LIQ-0001,{reference},SUCCESS"), chunk_size=1
+    )
+
+    assert report["completed"] == 1
+    assert report["duplicates"] == 1
+    assert report["already_processed"] == 0
+
+
+def test_rejected_superseded_reference_does_not_fail_the_retry(db):
+    first = initiate(db)
+    expire(db, first)
+    vehicle_id = db.scalars(select(Payment.vehicle_id)).one()
+    second = PaymentService.initiate_pse_payment(db, vehicle_id, 762_000.0, "1007", "titular@example.com")[
+        "transaction_id"
+    ]
+
+    report = ReconciliationService.reconcile_file(db, settlement(f"{first},{first},REJECTED"))
+
+    assert report["failed"] == 0
+    payment = db.scalars(select(Payment)).one()
+    assert payment.process_status == PaymentProcessStatus.PENDING_PSE
+    assert payment.pse_transaction_id == second
+
+
+def test_payment_started_before_attempts_were_recorded_is_matched(db):
+    tax_period = create_tax_period(db)
+    vehicle = create_vehicle(db, create_owner(db), "ABC123")
+    create_payment(db, vehicle, tax_period, process_status=PaymentProcessStatus.PENDING_PSE,
+                   pse_transaction_id="PSE-LEGACY", bank_reference="PSE-LEGACY")
+    db.commit()
+
+    report = ReconciliationService.reconcile_file(db, settlement("PSE-LEGACY,PSE-LEGACY,SUCCESS"))
+
+    assert report["completed"] == 1
+    assert report["unmatched"] == 0
+
+
+def test_settled_payment_failed_locally_is_reported_apart_from_duplicates(db):
+    reference = initiate(db)
+    PaymentService.complete_pse_payment(db, reference, "REJECTED")
+
+    report = ReconciliationService.reconcile_file(db, settlement(f"{reference},{reference},SUCCESS"))
+
+    assert report["settled_not_completed"] == 1
+    assert report["settled_not_completed_sample"] == [reference]
+    assert report["already_processed"] == 0
+    assert db.scalars(select(Payment)).one().process_status == PaymentProcessStatus.FAILED
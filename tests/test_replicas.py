@@ -0,0 +1,120 @@
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.config import settings
+from app.db.replicas import PRIMARY_PIN_HEADER, ReplicaRouter, is_pin_active
+from app.main import app, pin_reads_to_primary_after_write
+from app.services.tax_period_cache import tax_period_cache
+from tests.factories import create_owner, create_tax_period, create_vehicle
+
+
+def create_source(path, name: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE source (name TEXT)"))
+        connection.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+    return engine
+
+
+def read_source(router: ReplicaRouter, use_primary: bool = False) -> str:
+    connection = router.connect(use_primary)
+    try:
+        with Session(bind=connection) as db:
+            return db.execute(text("SELECT name FROM source")).scalar_one()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def router(tmp_path):
+    primary = create_source(tmp_path / "primary.db", "primary")
+    replica = create_source(tmp_path / "replica.db", "replica")
+    yield ReplicaRouter(primary, [replica], retry_seconds=30)
+    primary.dispose()
+    replica.dispose()
+
+
+def test_reads_go_to_the_replica_unless_pinned(router):
+    assert read_source(router) == "replica"
+    assert read_source(router, use_primary=True) == "primary"
+    assert router.stats()["replica_reads"] == 1
+    assert router.stats()["primary_reads"] == 1
+
+
+def test_unreachable_replica_fails_over_to_primary(tmp_path):
+    primary = create_source(tmp_path / "primary.db", "primary")
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router = ReplicaRouter(primary, [unreachable], retry_seconds=30)
+
+    assert read_source(router) == "primary"
+    assert read_source(router) == "primary"
+    # La réplica caída se omite durante retry_seconds: solo el primer intento falla
+    assert router.stats()["failovers"] == 1
+    assert router.stats()["replicas_down"] == 1
+
+
+def test_pin_value_is_bounded_to_the_pin_window():
+    now = int(time.time())
+
+    assert is_pin_active(str(now + settings.DB_PRIMARY_PIN_SECONDS))
+    assert not is_pin_active(str(now - 1))
+    assert not is_pin_active(str(now + 3600))
+    assert not is_pin_active("1")
+    assert not is_pin_active(None)
+
+
+def test_clients_without_cookies_stay_on_primary_by_echoing_the_header():
+    pin_app = FastAPI()
+    pin_app.middleware("http")(pin_reads_to_primary_after_write)
+
+    @pin_app.post("/write")
+    def write():
+        return {}
+
+    @pin_app.get("/read")
+    def read(pinned: bool = Depends(deps.is_pinned_to_primary)):
+        return {"pinned": pinned}
+
+    client = TestClient(pin_app)
+    pin = client.post("/write").headers[PRIMARY_PIN_HEADER]
+    client.cookies.clear()
+
+    assert client.get("/read").json() == {"pinned": False}
+    assert client.get("/read", headers={PRIMARY_PIN_HEADER: pin}).json() == {"pinned": True}
+
+
+def test_cached_consult_does_not_take_a_read_connection(db, async_session_factory):
+    create_tax_period(db)
+    owner = create_owner(db)
+    create_vehicle(db, owner, "ABC123")
+    db.commit()
+    # La versión del período fiscal forma parte de la llave del cache: se carga antes de consultar
+    tax_period_cache.get(db)
+
+    opened = []
+
+    @asynccontextmanager
+    async def read_session():
+        opened.append(True)
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[deps.get_async_read_session_factory] = lambda: read_session
+    try:
+        client = TestClient(app)
+        params = {"plate": "ABC123", "document_type": "1", "document_number": owner.document_number}
+        first = client.get("/api/v1/vehicles/consult", params=params)
+        second = client.get("/api/v1/vehicles/consult", params=params)
+    finally:
+        app.dependency_overrides.pop(deps.get_async_read_session_factory)
+
+    assert first.status_code == 200
+    assert second.json() == first.json()
+    assert len(opened) == 1
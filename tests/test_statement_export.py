@@ -0,0 +1,38 @@
+import gc
+from datetime import date
+
+import pytest
+
+from app.services.statement_batch_service import StatementExportBusy, StatementExportPool
+
+
+def statement_chunks(plates: list[str]):
+    tax_info = {"tax_year": 2025, "total_amount": 350000.0, "tax_status": "pending", "due_date": date(2025, 6, 30),
+                "statement_date": date(2025, 1, 15)}
+    yield 1, [({"plate": plate, "brand": "Renault", "model": "Logan", "year": 2018}, tax_info) for plate in plates]
+
+
+@pytest.fixture
+def export_pool():
+    pool = StatementExportPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_only_one_export_runs_at_a_time(export_pool):
+    running = export_pool.reserve(statement_chunks([]))
+
+    with pytest.raises(StatementExportBusy):
+        export_pool.reserve(statement_chunks([]))
+    running.close()
+
+    export_pool.reserve(statement_chunks([])).close()
+    assert export_pool.stats()["rejected"] == 1
+
+
+def test_discarded_export_releases_its_slot(export_pool):
+    export_pool.reserve(statement_chunks([]))
+    gc.collect()
+
+    export_pool.reserve(statement_chunks([])).close()
+
@@ -0,0 +1,41 @@
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.services.vehicle_service import VehicleService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+
+def test_consult_with_payments_is_a_single_statement(db, statements):
+    tax_period = create_tax_period(db)
+    previous_period = create_tax_period(db, year=2024, is_active=False)
+    owner = create_owner(db)
+    vehicle = create_vehicle(db, owner, "ABC123")
+    create_vehicle(db, owner, "XYZ987")
+    create_payment(db, vehicle, previous_period, status=PaymentStatus.COMPLETED,
+                   process_status=PaymentProcessStatus.COMPLETED)
+    create_payment(db, vehicle, tax_period)
+    db.commit()
+
+    # El período fiscal y las tasas salen del cache del proceso: se calienta antes de medir
+    VehicleService.get_vehicle_tax_details(db, "ABC123", "1", owner.document_number)
+    statements.clear()
+
+    details, error = VehicleService.get_vehicle_tax_details(
+        db, "abc123", "1", owner.document_number, include_payments=True
+    )
+
+    assert error is None
+    assert len(statements) == 1
+    assert details["vehicle_details"]["plate"] == "ABC123"
+    assert sorted(payment["tax_year"] for payment in details["payment_history"]) == [2024, 2025]
+    assert len(details["pending_payments"]) == 1
+
+
+def test_consult_without_payments_for_another_owner_finds_nothing(db):
+    create_tax_period(db)
+    owner = create_owner(db)
+    create_vehicle(db, owner, "ABC123")
+    db.commit()
+
+    details, error = VehicleService.get_vehicle_tax_details(db, "ABC123", "1", "999")
+
+    assert details is None
+    assert error == "No se encontró el vehículo con los datos proporcionados"
@@ -0,0 +1,64 @@
+import asyncio
+
+from app.models.payment import PaymentProcessStatus, PaymentStatus
+from app.models.vehicle import VehicleType
+from app.services.vehicle_service import VehicleService
+from tests.factories import create_owner, create_payment, create_tax_period, create_vehicle
+
+
+def seed_fleet(db):
+    tax_period = create_tax_period(db)
+    previous_period = create_tax_period(db, year=2024, is_active=False)
+    owner = create_owner(db)
+    vehicle = create_vehicle(db, owner, "ABC123", is_hybrid=True)
+    create_vehicle(db, owner, "MOT001", vehicle_type=VehicleType.MOTORCYCLE, commercial_value=8_000_000.0)
+    create_payment(db, vehicle, previous_period, status=PaymentStatus.COMPLETED,
+                   process_status=PaymentProcessStatus.COMPLETED)
+    create_payment(db, vehicle, tax_period)
+    db.commit()
+    return owner
+
+
+def run(async_session_factory, call):
+    async def main():
+        async with async_session_factory() as session:
+            return await call(session)
+    return asyncio.run(main())
+
+
+def test_async_consult_matches_sync(db, async_session_factory):
+    owner = seed_fleet(db)
+
+    expected = VehicleService.get_vehicle_tax_details(db, "ABC123", "1", owner.document_number, include_payments=True)
+    result = run(async_session_factory, lambda session: VehicleService.get_vehicle_tax_details_async(
+        session, "ABC123", "1", owner.document_number, include_payments=True
+    ))
+
+    assert result == expected
+    assert result[1] is None
+
+
+def test_async_bulk_consult_matches_single_consults(db, async_session_factory):
+    owner = seed_fleet(db)
+
+    details, error = run(async_session_factory, lambda session: VehicleService.get_vehicles_tax_details_async(
+        session, ["abc123", "MOT001", "NOP000"], "1", owner.document_number
+    ))
+
+    assert error is None
+    assert sorted(details) == ["ABC123", "MOT001"]
+    for plate, vehicle_details in details.items():
+        expected, _ = VehicleService.get_vehicle_tax_details(db, plate, "1", owner.document_number)
+        assert vehicle_details["tax_details"] == expected["tax_details"]
+
+
+def test_async_payment_history_matches_sync(db, async_session_factory):
+    owner = seed_fleet(db)
+
+    expected = VehicleService.get_vehicle_payment_history(db, "ABC123", "1", owner.document_number, limit=1)
+    result = run(async_session_factory, lambda session: VehicleService.get_vehicle_payment_history_async(
+        session, "ABC123", "1", owner.document_number, limit=1
+    ))
+
+    assert result == expected
+    assert result["next_cursor"] is not None